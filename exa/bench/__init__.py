@@ -0,0 +1,20 @@
+import importlib
+
+# Imported on first use, so `python -m exa.bench.<module>` does not
+# find its own module already loaded by the package
+_EXPORTS = {
+    "run_benchmarks": "exa.bench.collectives",
+    "launch": "exa.bench.collectives",
+    "compare_results": "exa.bench.collectives",
+    "run_transport_benchmark": "exa.bench.transport",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(
+            f"module {__name__!r} has no attribute {name!r}"
+        )
+    return getattr(importlib.import_module(_EXPORTS[name]), name)
@@ -0,0 +1,529 @@
+"""
+Micro-benchmarks for the fused collectives against the built-in
+torch.distributed ops, on N local ranks.
+
+    python -m exa.bench.collectives --world-size 4 --output results.json
+    python -m exa.bench.collectives --baseline results.json
+
+Every implementation is timed per iteration, the slowest rank's time
+counts, and latency percentiles are reported with algorithm bandwidth
+(bytes / time) and bus bandwidth (algorithm bandwidth scaled by the
+collective's traffic factor, as in nccl-tests), so numbers are
+comparable across world sizes and with the hardware's link speed.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from loguru import logger
+
+from exa.utils.all_reduce import (
+    ALL_REDUCE_ALGORITHMS,
+    fused_all_reduce,
+)
+from exa.utils.all_to_all import all_to_all_v
+from exa.utils.fused_all_gather import (
+    ALL_GATHER_ALGORITHMS,
+    fused_all_gather,
+    fused_all_gather_into,
+)
+from exa.utils.fused_reduce_scatter import fused_reduce_scatter
+
+# Message sizes swept by default, 1 KiB to 16 MiB
+DEFAULT_BENCH_SIZES = [2**i for i in range(10, 25, 2)]
+
+COLLECTIVES = (
+    "all_reduce",
+    "all_gather",
+    "reduce_scatter",
+    "all_to_all",
+)
+
+_OPS = {
+    "sum": dist.ReduceOp.SUM,
+    "product": dist.ReduceOp.PRODUCT,
+    "max": dist.ReduceOp.MAX,
+    "min": dist.ReduceOp.MIN,
+}
+
+_DTYPES = {
+    "float32": torch.float32,
+    "float64": torch.float64,
+    "float16": torch.float16,
+    "bfloat16": torch.bfloat16,
+    "int32": torch.int32,
+    "int64": torch.int64,
+}
+
+
+def bus_bandwidth_factor(collective: str, world_size: int) -> float:
+    """
+    Ratio of bus bandwidth to algorithm bandwidth: how much of the
+    payload each rank actually moves over its links.
+    """
+    n = world_size
+    if collective == "all_reduce":
+        return 2 * (n - 1) / n
+    if collective in (
+        "all_gather",
+        "reduce_scatter",
+        "all_to_all",
+    ):
+        return (n - 1) / n
+    raise ValueError(f"Unknown collective {collective!r}.")
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of `values`, with q in [0, 100]."""
+    ordered = sorted(values)
+    index = max(0, math.ceil(len(ordered) * q / 100) - 1)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def _implementations(collective: str) -> Dict[str, Callable]:
+    """
+    Factories per implementation, called as `make(nbytes, dtype, op,
+    device)` and returning a zero-argument function to time.
+    """
+    world_size = dist.get_world_size()
+
+    def numel(nbytes, dtype):
+        size = torch.empty((), dtype=dtype).element_size()
+        return max(1, nbytes // size)
+
+    if collective == "all_reduce":
+
+        def reduce_with(fn):
+            def make(nbytes, dtype, op, device):
+                tensor = torch.zeros(
+                    numel(nbytes, dtype), dtype=dtype, device=device
+                )
+                return lambda: fn(tensor, op)
+
+            return make
+
+        impls = {"torch": reduce_with(dist.all_reduce)}
+        for name, fn in ALL_REDUCE_ALGORITHMS.items():
+            if name != "builtin":
+                impls[name] = reduce_with(fn)
+        impls["auto"] = reduce_with(fused_all_reduce)
+        return impls
+
+    if collective == "all_gather":
+        # nbytes is the gathered output, each rank sends 1 / N of it
+
+        def gather_list(fn):
+            def make(nbytes, dtype, op, device):
+                count = max(1, numel(nbytes, dtype) // world_size)
+                tensor = torch.zeros(
+                    count, dtype=dtype, device=device
+                )
+                outputs = [
+                    torch.empty_like(tensor)
+                    for _ in range(world_size)
+                ]
+                return lambda: fn(list(outputs), tensor)
+
+            return make
+
+        def gather_into(nbytes, dtype, op, device):
+            count = max(1, numel(nbytes, dtype) // world_size)
+            tensor = torch.zeros(count, dtype=dtype, device=device)
+            output = torch.empty(
+                world_size * count, dtype=dtype, device=device
+            )
+            return lambda: fused_all_gather_into(tensor, output)
+
+        impls = {"torch": gather_list(dist.all_gather)}
+        for name, fn in ALL_GATHER_ALGORITHMS.items():
+            impls[name] = gather_list(fn)
+        impls["into"] = gather_into
+        impls["auto"] = gather_list(fused_all_gather)
+        return impls
+
+    if collective == "reduce_scatter":
+
+        def builtin(nbytes, dtype, op, device):
+            count = max(1, numel(nbytes, dtype) // world_size)
+            tensor = torch.zeros(
+                world_size * count, dtype=dtype, device=device
+            )
+            output = torch.empty(count, dtype=dtype, device=device)
+            return lambda: dist.reduce_scatter_tensor(
+                output, tensor, op=op
+            )
+
+        def ring(nbytes, dtype, op, device):
+            tensor = torch.zeros(
+                numel(nbytes, dtype), dtype=dtype, device=device
+            )
+            return lambda: fused_reduce_scatter(tensor, op)
+
+        return {"torch": builtin, "ring": ring}
+
+    if collective == "all_to_all":
+        # nbytes is sent by each rank, split evenly across ranks
+
+        def single(nbytes, dtype, op, device):
+            count = max(1, numel(nbytes, dtype) // world_size)
+            tensor = torch.zeros(
+                world_size * count, dtype=dtype, device=device
+            )
+            output = torch.empty_like(tensor)
+            return lambda: dist.all_to_all_single(output, tensor)
+
+        def varying(nbytes, dtype, op, device):
+            count = max(1, numel(nbytes, dtype) // world_size)
+            tensor = torch.zeros(
+                world_size * count, dtype=dtype, device=device
+            )
+            splits = [count] * world_size
+            return lambda: all_to_all_v(tensor, splits)
+
+        return {"torch": single, "v": varying}
+
+    raise ValueError(f"Unknown collective {collective!r}.")
+
+
+def _time_iterations(
+    fn: Callable, device, warmup: int, iters: int
+) -> List[float]:
+    """
+    Time every iteration of `fn` and return, per iteration, the slowest
+    rank's seconds.
+    """
+    for _ in range(warmup):
+        fn()
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+    dist.barrier()
+
+    times = []
+    for _ in range(iters):
+        start = time.perf_counter()
+        fn()
+        if device.type == "cuda":
+            torch.cuda.synchronize(device)
+        times.append(time.perf_counter() - start)
+
+    slowest = torch.tensor(times, dtype=torch.float64, device=device)
+    dist.all_reduce(slowest, op=dist.ReduceOp.MAX)
+    return slowest.tolist()
+
+
+def _supported(fn: Callable, device) -> bool:
+    """
+    Run one call and agree across ranks on whether it worked. Backends
+    reject unsupported collectives or dtypes before sending anything.
+    """
+    ok = torch.ones(1, device=device)
+    try:
+        fn()
+    except (RuntimeError, ValueError) as e:
+        logger.debug(f"Skipping unsupported case: {e}")
+        ok.zero_()
+    dist.all_reduce(ok, op=dist.ReduceOp.MIN)
+    return bool(ok.item())
+
+
+def run_benchmarks(
+    collectives: Sequence[str] = COLLECTIVES,
+    sizes: Sequence[int] = DEFAULT_BENCH_SIZES,
+    dtypes: Sequence[torch.dtype] = (torch.float32,),
+    ops: Sequence[str] = ("sum",),
+    implementations: Optional[Sequence[str]] = None,
+    warmup: int = 5,
+    iters: int = 50,
+    device: Optional[torch.device] = None,
+) -> List[dict]:
+    """
+    Benchmark the collectives on the current process group. Must be
+    called on every rank; all ranks return the same results.
+
+    Args:
+        collectives (Sequence[str]): Any of "all_reduce", "all_gather", "reduce_scatter",
+            "all_to_all".
+        sizes (Sequence[int]): Message sizes in bytes. For all_gather this is the
+            gathered output, as in nccl-tests.
+        dtypes (Sequence[torch.dtype]): Dtypes to sweep.
+        ops (Sequence[str]): Reduction ops to sweep, e.g. "sum" or "max".
+        implementations (Sequence[str], optional): Only run these implementations.
+            Defaults to all of them.
+        warmup (int): Untimed calls per case.
+        iters (int): Timed calls per case.
+        device (torch.device, optional): Where to allocate the tensors. Defaults to
+            the current CUDA device with NCCL, else CPU.
+
+    Returns:
+        List[dict]: One record per case with latency percentiles in microseconds
+        and algorithm and bus bandwidth in GB/s.
+    """
+    backend = dist.get_backend()
+    world_size = dist.get_world_size()
+    if device is None:
+        device = torch.device(
+            f"cuda:{torch.cuda.current_device()}"
+            if backend == "nccl"
+            else "cpu"
+        )
+
+    results = []
+    for collective in collectives:
+        impls = {
+            name: make
+            for name, make in _implementations(collective).items()
+            if not implementations or name in implementations
+        }
+        factor = bus_bandwidth_factor(collective, world_size)
+        case_ops = ops if collective != "all_gather" else ("-",)
+        for dtype in dtypes:
+            for op_name in case_ops:
+                op = _OPS.get(op_name)
+                for nbytes in sizes:
+                    for name, make in impls.items():
+                        fn = make(nbytes, dtype, op, device)
+                        if not _supported(fn, device):
+                            continue
+                        times = _time_iterations(
+                            fn, device, warmup, iters
+                        )
+                        mean = sum(times) / len(times)
+                        algbw = nbytes / percentile(times, 50) / 1e9
+                        results.append(
+                            {
+                                "collective": collective,
+                                "implementation": name,
+                                "dtype": str(dtype).replace(
+                                    "torch.", ""
+                                ),
+                                "op": op_name,
+                                "nbytes": nbytes,
+                                "mean_us": mean * 1e6,
+                                "p50_us": percentile(times, 50) * 1e6,
+                                "p90_us": percentile(times, 90) * 1e6,
+                                "p99_us": percentile(times, 99) * 1e6,
+                                "algbw_gbps": algbw,
+                                "busbw_gbps": algbw * factor,
+                            }
+                        )
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _metadata(world_size: int, backend: str) -> dict:
+    return {
+        "commit": _git_commit(),
+        "world_size": world_size,
+        "backend": backend,
+        "torch": torch.__version__,
+        "python": platform.python_version(),
+        "host": socket.gethostname(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def _case_key(record: dict) -> tuple:
+    return (
+        record["collective"],
+        record["implementation"],
+        record["dtype"],
+        record["op"],
+        record["nbytes"],
+    )
+
+
+def compare_results(
+    baseline: List[dict], current: List[dict], tolerance: float = 0.1
+) -> List[dict]:
+    """
+    Find cases whose median latency grew by more than `tolerance`
+    (a fraction) relative to a baseline run.
+
+    Returns:
+        List[dict]: One entry per regressed case with both medians.
+    """
+    previous = {_case_key(r): r for r in baseline}
+    regressions = []
+    for record in current:
+        old = previous.get(_case_key(record))
+        if old is None or old["p50_us"] <= 0:
+            continue
+        change = record["p50_us"] / old["p50_us"] - 1
+        if change > tolerance:
+            regressions.append(
+                {
+                    "case": _case_key(record),
+                    "baseline_p50_us": old["p50_us"],
+                    "p50_us": record["p50_us"],
+                    "change": change,
+                }
+            )
+    return regressions
+
+
+def format_results(results: List[dict]) -> str:
+    """Render results as a fixed-width table."""
+    header = (
+        f"{'collective':<15}{'impl':<18}{'dtype':<10}{'op':<8}"
+        f"{'bytes':>10}{'p50 us':>11}{'p99 us':>11}"
+        f"{'algbw':>9}{'busbw':>9}"
+    )
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r['collective']:<15}{r['implementation']:<18}"
+            f"{r['dtype']:<10}{r['op']:<8}{r['nbytes']:>10}"
+            f"{r['p50_us']:>11.1f}{r['p99_us']:>11.1f}"
+            f"{r['algbw_gbps']:>9.3f}{r['busbw_gbps']:>9.3f}"
+        )
+    return "\n".join(lines)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _worker(rank, world_size, port, kwargs, queue):
+    dist.init_process_group(
+        "gloo",
+        init_method=f"tcp://127.0.0.1:{port}",
+        rank=rank,
+        world_size=world_size,
+    )
+    try:
+        results = run_benchmarks(**kwargs)
+        if rank == 0:
+            queue.put(results)
+    finally:
+        dist.destroy_process_group()
+
+
+def launch(world_size: int, **kwargs) -> List[dict]:
+    """
+    Spawn `world_size` local gloo ranks, run `run_benchmarks` on them
+    with `kwargs` and return rank 0's results.
+    """
+    queue = mp.get_context("spawn").SimpleQueue()
+    mp.spawn(
+        _worker,
+        args=(world_size, _free_port(), kwargs, queue),
+        nprocs=world_size,
+        join=True,
+    )
+    return queue.get()
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m exa.bench.collectives",
+        description="Benchmark the fused collectives on local ranks.",
+    )
+    parser.add_argument("--world-size", type=int, default=4)
+    parser.add_argument(
+        "--collectives", nargs="+", default=list(COLLECTIVES)
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=DEFAULT_BENCH_SIZES,
+        help="Message sizes in bytes.",
+    )
+    parser.add_argument(
+        "--dtypes", nargs="+", default=["float32"], choices=_DTYPES
+    )
+    parser.add_argument(
+        "--ops", nargs="+", default=["sum"], choices=_OPS
+    )
+    parser.add_argument(
+        "--implementations",
+        nargs="+",
+        help="Only run these implementations, e.g. torch ring tree.",
+    )
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--iters", type=int, default=50)
+    parser.add_argument(
+        "--output", help="Write results as JSON here."
+    )
+    parser.add_argument(
+        "--baseline",
+        help=(
+            "JSON results of an earlier run to check for regressions."
+        ),
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Allowed median latency growth over the baseline.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    results = launch(
+        args.world_size,
+        collectives=args.collectives,
+        sizes=args.sizes,
+        dtypes=[_DTYPES[d] for d in args.dtypes],
+        ops=args.ops,
+        implementations=args.implementations,
+        warmup=args.warmup,
+        iters=args.iters,
+    )
+    print(format_results(results))
+
+    report = {
+        "meta": _metadata(args.world_size, "gloo"),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Wrote benchmark results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare_results(
+            baseline, results, args.tolerance
+        )
+        for r in regressions:
+            logger.warning(
+                f"Regression in {r['case']}: p50"
+                f" {r['baseline_p50_us']:.1f} us ->"
+                f" {r['p50_us']:.1f} us ({r['change']:+.0%})"
+            )
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
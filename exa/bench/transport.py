@@ -0,0 +1,167 @@
+"""
+Round-trip benchmark of HivePool's tensor transports on the CPU: the
+default torch.multiprocessing queues, which pickle every tensor into a
+new shared-memory segment, against the preallocated shared-memory slot
+rings, which only pass slot indices.
+
+    python -m exa.bench.transport --sizes 4096 1048576 16777216
+
+A worker running an identity model echoes every tensor back, so the
+numbers are pure transport cost: latency percentiles of one request at a
+time, and throughput with many requests in flight.
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import List, Sequence
+
+import torch
+from loguru import logger
+from torch import nn
+
+from exa.bench.collectives import percentile
+from exa.structs.hive_model import HivePool
+
+# Payload sizes swept by default, 4 KiB to 16 MiB
+DEFAULT_TRANSPORT_SIZES = [2**i for i in range(12, 25, 4)]
+
+TRANSPORTS = ("queue", "shm")
+
+
+class _Identity(nn.Module):
+    def forward(self, x):
+        return x
+
+
+def _pool(transport: str, max_bytes: int, slots: int) -> HivePool:
+    if transport not in TRANSPORTS:
+        raise ValueError(
+            f"Unknown transport {transport!r}, expected one of"
+            f" {TRANSPORTS}."
+        )
+    return HivePool(
+        _Identity,
+        devices=["cpu"],
+        shm_slots=slots if transport == "shm" else 0,
+        shm_slot_bytes=max_bytes,
+    )
+
+
+def run_transport_benchmark(
+    sizes: Sequence[int] = DEFAULT_TRANSPORT_SIZES,
+    transports: Sequence[str] = TRANSPORTS,
+    warmup: int = 5,
+    iters: int = 50,
+    slots: int = 8,
+) -> List[dict]:
+    """
+    Time request round trips through a one-worker HivePool.
+
+    Args:
+        sizes (Sequence[int]): Payload sizes in bytes.
+        transports (Sequence[str]): "queue" and/or "shm".
+        warmup (int): Untimed requests per case. Default is 5.
+        iters (int): Timed requests per case. Default is 50.
+        slots (int): Slots per shared-memory ring. Default is 8.
+
+    Returns:
+        List[dict]: One record per transport and size, with latency percentiles in
+        microseconds and throughput in GB/s of payload each way.
+    """
+    results = []
+    for transport in transports:
+        with _pool(transport, max(sizes), slots) as pool:
+            for nbytes in sizes:
+                data = torch.randn(max(1, nbytes // 4))
+                for _ in range(warmup):
+                    pool.submit(data).result()
+
+                latencies = []
+                for _ in range(iters):
+                    start = time.perf_counter()
+                    pool.submit(data).result()
+                    latencies.append(time.perf_counter() - start)
+
+                # Keep the transport busy in both directions
+                start = time.perf_counter()
+                pool.map([data] * iters)
+                elapsed = time.perf_counter() - start
+
+                payload = data.numel() * data.element_size()
+                throughput = payload * iters / elapsed
+                results.append(
+                    {
+                        "transport": transport,
+                        "nbytes": payload,
+                        "p50_us": percentile(latencies, 50) * 1e6,
+                        "p99_us": percentile(latencies, 99) * 1e6,
+                        "throughput_gbps": throughput / 1e9,
+                    }
+                )
+    return results
+
+
+def format_transport_results(results: List[dict]) -> str:
+    """Render results as a fixed-width table."""
+    header = (
+        f"{'transport':<11}{'bytes':>10}{'p50 us':>11}{'p99 us':>11}"
+        f"{'GB/s':>9}"
+    )
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r['transport']:<11}{r['nbytes']:>10}"
+            f"{r['p50_us']:>11.1f}{r['p99_us']:>11.1f}"
+            f"{r['throughput_gbps']:>9.3f}"
+        )
+    return "\n".join(lines)
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m exa.bench.transport",
+        description="Benchmark HivePool's queue and shm transports.",
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=DEFAULT_TRANSPORT_SIZES,
+        help="Payload sizes in bytes.",
+    )
+    parser.add_argument(
+        "--transports",
+        nargs="+",
+        default=list(TRANSPORTS),
+        choices=TRANSPORTS,
+    )
+    parser.add_argument("--slots", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--iters", type=int, default=50)
+    parser.add_argument(
+        "--output", help="Write results as JSON here."
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    results = run_transport_benchmark(
+        sizes=args.sizes,
+        transports=args.transports,
+        warmup=args.warmup,
+        iters=args.iters,
+        slots=args.slots,
+    )
+    print(format_transport_results(results))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"Wrote benchmark results to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
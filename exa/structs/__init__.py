@@ -3,13 +3,65 @@ from exa.structs.parallelize_models_gpus import (
     setup_distributed_environment,
     initialize_process_group,
 )
-from exa.structs.model_thread_router import ModelThreadWorker, Router
+from exa.structs.model_thread_router import (
+    ModelThreadWorker,
+    Router,
+    RoutingPolicy,
+    LeastOutstandingPolicy,
+    PowerOfTwoChoicesPolicy,
+    EWMALatencyPolicy,
+)
+from exa.structs.tensor_parallel import (
+    ColumnParallelLinear,
+    RowParallelLinear,
+    tensor_parallelize,
+    load_sharded_state_dict,
+)
+from exa.structs.hive_model import HivePool, share_model, mmap_model
+from exa.structs.shm_transport import ShmTensorRing, SlotRef
+from exa.structs.pipeline_parallel import (
+    PipelineRunner,
+    PipelineStats,
+    partition_sequential,
+)
+from exa.structs.placement import (
+    LayerProfile,
+    PartitionPlan,
+    profile_layers,
+    memory_budgets,
+    plan_partition,
+    apply_device_map,
+    auto_partition,
+)
 
 __all__ = [
     "ModelThreadWorker",
     "Router",
+    "RoutingPolicy",
+    "LeastOutstandingPolicy",
+    "PowerOfTwoChoicesPolicy",
+    "EWMALatencyPolicy",
     "prepare_model_for_ddp_inference",
     "setup_distributed_environment",
     "initialize_process_group",
     "prepare_model_for_ddp_inference",
+    "ColumnParallelLinear",
+    "RowParallelLinear",
+    "tensor_parallelize",
+    "load_sharded_state_dict",
+    "HivePool",
+    "share_model",
+    "mmap_model",
+    "ShmTensorRing",
+    "SlotRef",
+    "PipelineRunner",
+    "PipelineStats",
+    "partition_sequential",
+    "LayerProfile",
+    "PartitionPlan",
+    "profile_layers",
+    "memory_budgets",
+    "plan_partition",
+    "apply_device_map",
+    "auto_partition",
 ]
@@ -1,6 +1,103 @@
+import functools
+import itertools
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import Future, as_completed
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
 import torch
 import torch.multiprocessing as mp
-import queue
+from loguru import logger
+from torch import nn
+
+from exa.structs.shm_transport import ShmTensorRing, SlotRef
+
+# Slot capacity of HivePool's shared-memory rings, 16 MiB
+DEFAULT_SHM_SLOT_BYTES = 16 * 1024 * 1024
+
+
+def share_model(model: nn.Module) -> nn.Module:
+    """
+    Prepare a model built once in the parent so that worker processes
+    attach to its weights instead of building their own copy: the
+    parameters and buffers move into shared memory, and only their
+    handles are pickled when the model is passed to a worker. Resident
+    memory then stays about constant as replicas are added, and a
+    worker is ready as soon as it unpickles the handles.
+
+    Workers run the model under torch.no_grad() and must treat the
+    weights as read-only: an in-place change is seen by every replica.
+
+    Args:
+        model (nn.Module): The model, on the CPU.
+
+    Returns:
+        nn.Module: The same model, in eval mode and shared. Pass it where a
+        model_class is expected.
+    """
+    model.eval()
+    model.requires_grad_(False)
+    return model.share_memory()
+
+
+def _load_mmap(model_class, checkpoint: str) -> nn.Module:
+    """Build the model on meta and assign the mmap'd checkpoint."""
+    with torch.device("meta"):
+        model = model_class()
+    state_dict = torch.load(
+        checkpoint, map_location="cpu", mmap=True, weights_only=True
+    )
+    # Fills every parameter and persistent buffer, or raises
+    model.load_state_dict(state_dict, strict=True, assign=True)
+    # Non-persistent buffers are not in any checkpoint
+    missing = [
+        name
+        for name, tensor in itertools.chain(
+            model.named_parameters(), model.named_buffers()
+        )
+        if tensor.is_meta
+    ]
+    if missing:
+        raise ValueError(
+            f"{model_class!r} has tensors no checkpoint can hold,"
+            f" left on the meta device: {', '.join(missing)}. Make"
+            " these buffers persistent, or build the model with"
+            " share_model instead."
+        )
+    return model
+
+
+def mmap_model(model_class, checkpoint: str):
+    """
+    Model factory that memory-maps its weights from a checkpoint instead
+    of allocating them: the model is built on the meta device and the
+    torch.save'd state dict is assigned from an mmap, so every process
+    reads the same page-cache pages and nothing is initialized.
+
+    Args:
+        model_class (Callable): Picklable callable building the model.
+        checkpoint (str): Path to a torch.save'd state dict holding every parameter
+            and persistent buffer. Models with non-persistent buffers are rejected when
+            loaded, since those would stay on the meta device.
+
+    Returns:
+        Callable: A picklable factory to pass where a model_class is expected.
+    """
+    return functools.partial(_load_mmap, model_class, checkpoint)
+
+
+def _build_model(model_class, device) -> nn.Module:
+    """
+    The model for a worker: a shared model is used as is (moving it to
+    another device copies it), anything else is called to build one.
+    """
+    if isinstance(model_class, nn.Module):
+        model = model_class
+    else:
+        model = model_class()
+    return model.to(device).eval()
 
 
 def model_worker(model_class, gpu_id, input_queue, output_queue):
@@ -10,8 +107,7 @@ def model_worker(model_class, gpu_id, input_queue, output_queue):
     Processes inputs and puts results into the output_queue.
     """
     device = torch.device(f"cuda:{gpu_id}")
-    model = model_class().to(device)
-    model.eval()
+    model = _build_model(model_class, device)
 
     with torch.no_grad():
         while True:
@@ -32,6 +128,8 @@ def setup_model_on_gpus(model_class, num_models_per_gpu=1):
     """
     Sets up model instances across available GPUs, dividing the GPU memory to determine
     the number of models that can fit based on a simple heuristic.
+    model_class may also be a model from share_model, or a factory from mmap_model,
+    so the weights are loaded once instead of once per process.
     """
     if not torch.cuda.is_available():
         raise RuntimeError(
@@ -85,8 +183,364 @@ def distribute_inference(workers, input_queues, output_queue, inputs):
     return results
 
 
+def _detach_from(output, slot: torch.Tensor):
+    """
+    Clone every tensor of `output` that aliases the input slot, since
+    the slot is reused once released. Walks tuples, lists and dicts.
+    """
+    if isinstance(output, torch.Tensor):
+        storage = output.untyped_storage().data_ptr()
+        if storage == slot.untyped_storage().data_ptr():
+            return output.clone()
+        return output
+    if isinstance(output, (tuple, list)):
+        items = [_detach_from(o, slot) for o in output]
+        if hasattr(output, "_fields"):
+            return type(output)(*items)
+        return type(output)(items)
+    if isinstance(output, dict):
+        return {k: _detach_from(v, slot) for k, v in output.items()}
+    return output
+
+
+def _pool_worker(
+    model_class,
+    device,
+    input_queue,
+    output_queue,
+    ring_handles=None,
+):
+    """
+    Worker process of a HivePool. Builds the model once, then answers
+    `(request_id, input)` messages with `(request_id, output, error)`
+    until it receives None. With shared-memory rings, inputs and outputs
+    that fit a slot travel as SlotRefs instead of pickled tensors.
+    """
+    device = torch.device(device)
+    start = time.perf_counter()
+    model = _build_model(model_class, device)
+    logger.debug(
+        f"HivePool worker model ready on {device} in"
+        f" {1000 * (time.perf_counter() - start):.1f} ms"
+    )
+    in_ring = out_ring = None
+    if ring_handles is not None:
+        in_ring, out_ring = (
+            ShmTensorRing.attach(handle) for handle in ring_handles
+        )
+
+    with torch.no_grad():
+        while True:
+            message = input_queue.get()
+            if message is None:
+                break
+            request_id, data = message
+            ref = data if isinstance(data, SlotRef) else None
+            try:
+                if ref is not None:
+                    # Zero-copy on CPU: the model reads the slot itself
+                    data = in_ring.get(ref)
+                output = model(data.to(device))
+                if hasattr(output, "cpu"):
+                    output = output.cpu()
+                if (
+                    out_ring is not None
+                    and isinstance(output, torch.Tensor)
+                    and out_ring.fits(output)
+                ):
+                    output = out_ring.put(output)
+                elif ref is not None:
+                    # The queue pickles in a feeder thread, after the
+                    # slot below is released and possibly overwritten
+                    output = _detach_from(output, data)
+                output_queue.put((request_id, output, None))
+            except Exception:
+                # Tracebacks always pickle, arbitrary exceptions may not
+                output_queue.put(
+                    (request_id, None, traceback.format_exc())
+                )
+            finally:
+                # Anything still aliasing the slot was copied above
+                if ref is not None:
+                    in_ring.release(ref)
+
+    if ring_handles is not None:
+        in_ring.close()
+        out_ring.close()
+
+
+class HivePool:
+    """
+    A long-lived pool of model replicas in worker processes. Replicas
+    are built once and stay resident across calls, and every request
+    carries an ID, so results can be returned in input order however the
+    workers finish. Each request goes to the replica with the fewest
+    requests outstanding.
+
+    With `shm_slots`, every worker also gets a pair of preallocated
+    shared-memory rings, one for inputs and one for outputs. Tensors
+    that fit in a slot are copied into it and only the slot index
+    travels through the queues, instead of pickling the tensor and
+    creating a new shared-memory segment for every message.
+
+    Args:
+        model_class (Callable or nn.Module): Picklable callable building the model, e.g.
+            the class. A model from share_model is built once and shared by every
+            CPU replica, and a factory from mmap_model maps its weights from disk.
+        num_models_per_gpu (int): Replicas per device. Default is 1.
+        devices (Sequence[str], optional): Devices to place replicas on. Defaults to every
+            visible GPU, or the CPU when there is none.
+        shm_slots (int): Slots per shared-memory ring, 0 to send tensors through the
+            queues. Bounds the inputs queued per worker. Default is 0.
+        shm_slot_bytes (int): Capacity of each slot. Larger tensors use the queues.
+
+    Methods:
+        submit: Sends one input and returns a Future of its output.
+        map: Runs inputs and returns the outputs in input order.
+        imap_unordered: Yields `(index, output)` as each input completes.
+        close: Stops and joins the worker processes.
+    """
+
+    def __init__(
+        self,
+        model_class,
+        num_models_per_gpu: int = 1,
+        devices: Optional[Sequence[str]] = None,
+        shm_slots: int = 0,
+        shm_slot_bytes: int = DEFAULT_SHM_SLOT_BYTES,
+    ):
+        if devices is None:
+            devices = [
+                f"cuda:{gpu_id}"
+                for gpu_id in range(torch.cuda.device_count())
+            ] or ["cpu"]
+        context = mp.get_context("spawn")
+        self.output_queue = context.Queue()
+        self.input_queues = []
+        self.workers = []
+        # Per worker: (input ring, output ring), None without shm
+        self.rings = []
+        for device in devices:
+            for _ in range(num_models_per_gpu):
+                input_queue = context.Queue()
+                rings = None
+                if shm_slots > 0:
+                    rings = (
+                        ShmTensorRing(shm_slots, shm_slot_bytes),
+                        ShmTensorRing(shm_slots, shm_slot_bytes),
+                    )
+                process = context.Process(
+                    target=_pool_worker,
+                    args=(
+                        model_class,
+                        device,
+                        input_queue,
+                        self.output_queue,
+                        rings and tuple(r.handle() for r in rings),
+                    ),
+                    daemon=True,
+                )
+                self.rings.append(rings)
+                process.start()
+                self.input_queues.append(input_queue)
+                self.workers.append(process)
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        # request_id -> (future, worker index) for requests in flight
+        self._pending = {}
+        # request_id -> worker index for requests failed by a death
+        self._lost = {}
+        self._outstanding = [0] * len(self.workers)
+        self._closed = False
+        self._collector = threading.Thread(
+            target=self._collect, daemon=True
+        )
+        self._collector.start()
+
+    def _collect(self):
+        """Complete the Future of every result the workers send back."""
+        while True:
+            try:
+                message = self.output_queue.get(timeout=1.0)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            if message is None:
+                break
+            request_id, output, error = message
+            with self._lock:
+                entry = self._pending.pop(request_id, None)
+                if entry is None:
+                    # Already failed when its worker was found dead
+                    worker = self._lost.pop(request_id, None)
+                    if (
+                        isinstance(output, SlotRef)
+                        and worker is not None
+                    ):
+                        self.rings[worker][1].release(output)
+                    continue
+                future, worker = entry
+                self._outstanding[worker] -= 1
+            if isinstance(output, SlotRef):
+                out_ring = self.rings[worker][1]
+                # Copy out so the slot can go straight back to the worker
+                tensor = out_ring.get(output).clone()
+                out_ring.release(output)
+                output = tensor
+            if error is None:
+                future.set_result(output)
+            else:
+                future.set_exception(
+                    RuntimeError(f"Model worker failed:\n{error}")
+                )
+
+    def _check_workers(self):
+        """Fail the requests of any worker process that has died."""
+        lost = []
+        with self._lock:
+            if self._closed:
+                return
+            for index, process in enumerate(self.workers):
+                if process.is_alive() or self._outstanding[index] < 0:
+                    continue
+                logger.error(
+                    f"HivePool worker {index} exited with code"
+                    f" {process.exitcode}"
+                )
+                # Never route to it again
+                self._outstanding[index] = -1
+                lost += [
+                    request_id
+                    for request_id, entry in self._pending.items()
+                    if entry[1] == index
+                ]
+            futures = []
+            for request_id in lost:
+                future, worker = self._pending.pop(request_id)
+                # Results it sent before dying may still arrive
+                self._lost[request_id] = worker
+                futures.append(future)
+        for future in futures:
+            future.set_exception(
+                RuntimeError("The model worker process died.")
+            )
+
+    def submit(self, data: torch.Tensor) -> Future:
+        """
+        Send one input to the least busy replica.
+
+        Args:
+            data (torch.Tensor): The model input.
+
+        Returns:
+            Future: Completed with the output, on the CPU.
+        """
+        future = Future()
+        # Sent requests cannot be taken back, so they cannot cancel
+        future.set_running_or_notify_cancel()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The pool is closed.")
+            alive = [
+                index
+                for index, count in enumerate(self._outstanding)
+                if count >= 0
+            ]
+            if not alive:
+                raise RuntimeError("Every model worker has died.")
+            worker = min(alive, key=self._outstanding.__getitem__)
+            request_id = next(self._ids)
+            self._pending[request_id] = (future, worker)
+            self._outstanding[worker] += 1
+        rings = self.rings[worker]
+        ref = None
+        try:
+            if (
+                rings is not None
+                and isinstance(data, torch.Tensor)
+                and rings[0].fits(data)
+            ):
+                # Waits while the worker still holds every input slot
+                ref = data = rings[0].put(data)
+            self.input_queues[worker].put((request_id, data))
+        except BaseException:
+            # Never sent: the worker must not look busy with it
+            if ref is not None:
+                rings[0].release(ref)
+            with self._lock:
+                if self._pending.pop(request_id, None) is not None:
+                    self._outstanding[worker] -= 1
+            raise
+        return future
+
+    def map(self, inputs: Iterable[torch.Tensor]) -> List:
+        """
+        Run every input and return the outputs in input order.
+
+        Args:
+            inputs (Iterable[torch.Tensor]): The model inputs.
+
+        Returns:
+            List: The output of every input, in order.
+        """
+        futures = [self.submit(data) for data in inputs]
+        return [future.result() for future in futures]
+
+    def imap_unordered(
+        self, inputs: Iterable[torch.Tensor]
+    ) -> Iterator[Tuple[int, object]]:
+        """
+        Run every input and yield each output with the index of its
+        input as soon as it is done.
+
+        Args:
+            inputs (Iterable[torch.Tensor]): The model inputs.
+
+        Yields:
+            Tuple[int, object]: The input index and its output.
+        """
+        futures = {
+            self.submit(data): index
+            for index, data in enumerate(inputs)
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+    def close(self):
+        """Stop the workers once they finish their queued requests."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for input_queue in self.input_queues:
+            input_queue.put(None)
+        for process in self.workers:
+            process.join()
+        self.output_queue.put(None)
+        self._collector.join()
+        for rings in self.rings:
+            for ring in rings or ():
+                ring.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
 # Example usage:
 # Define your model class here, e.g., `MyModelClass`.
 # workers, input_queues, output_queue = setup_model_on_gpus(MyModelClass, num_models_per_gpu=2)
 # inputs = [torch.randn(1, 3, 224, 224) for _ in range(10)]  # Example input tensors
 # results = distribute_inference(workers, input_queues, output_queue, inputs)
+#
+# Or keep the replicas resident across calls:
+# with HivePool(MyModelClass, num_models_per_gpu=2) as pool:
+#     results = pool.map(inputs)  # In input order
+#
+# Or build the model once and let every CPU replica share its weights:
+# model = share_model(MyModelClass())
+# with HivePool(model, num_models_per_gpu=4, devices=["cpu"]) as pool:
+#     results = pool.map(inputs)
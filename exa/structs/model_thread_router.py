@@ -1,18 +1,72 @@
-import torch
+import asyncio
+import random
 import threading
-from queue import Queue, Empty
-from typing import Optional, Callable
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from queue import Queue, Empty, Full
+from typing import Any, Iterable, Iterator, List, Optional, Callable
+
+import torch
+from loguru import logger
+
+# Queueing delays kept for the percentile statistics
+_DELAY_WINDOW = 4096
+
+# Weight of the newest sample in a worker's latency average
+_EWMA_ALPHA = 0.2
+
+# Longest pause of asubmit between retries while every queue is full
+_MAX_BACKOFF = 0.005
+
+
+def _can_batch(tasks: List, dim: int) -> bool:
+    """Whether the tasks are tensors that concatenate along `dim`."""
+    first = tasks[0]
+    if not isinstance(first, torch.Tensor) or not (
+        -first.dim() <= dim < first.dim()
+    ):
+        return False
+    dim = dim % first.dim()
+    return all(
+        isinstance(t, torch.Tensor)
+        and t.dim() == first.dim()
+        and t.shape[:dim] == first.shape[:dim]
+        and t.shape[dim + 1 :] == first.shape[dim + 1 :]
+        and t.dtype == first.dtype
+        and t.device == first.device
+        for t in tasks
+    )
 
 
 class ModelThreadWorker:
     """
     Represents a worker thread that processes tasks using a model.
 
+    Batching is opt-in, for models whose inputs carry a batch
+    dimension. With `batch_dim` set, queued requests are batched
+    dynamically: the worker takes the first waiting request, keeps
+    collecting until it has `max_batch_size` of them or `max_wait_ms`
+    have passed, concatenates them along `batch_dim` and runs them
+    through the model in one forward pass; the output is split back per
+    requester along the same dimension. Requests that do not
+    concatenate are run one by one, and so is a batch whose forward
+    pass raises, so a bad request fails only its own requester.
+
     Args:
         worker_id (int): The ID of the worker.
         gpu_id (int): The ID of the GPU to be used by the worker.
-        queue (Queue): The queue from which the worker retrieves tasks.
+        queue (Queue): The queue of `(task, response_queue)` or
+            `(task, response_queue, enqueued_at)` tuples, where enqueued_at is a
+            time.perf_counter() timestamp. None stops the worker.
         model (Optional[Callable]): The model function to be used for processing tasks.
+        *args: Passed on to `run`.
+        max_batch_size (int): Keyword-only. Most requests run in one forward pass.
+            Default is 1, no batching. Larger values need `batch_dim`.
+        batch_dim (int, optional): Keyword-only. The dimension requests are concatenated
+            along. Default is None, no batching.
+        max_wait_ms (float): Keyword-only. Longest time the first request of a batch
+            waits for more. Default is 2.
 
     Attributes:
         worker_id (int): The ID of the worker.
@@ -22,6 +76,9 @@ class ModelThreadWorker:
         model (Callable): The model function used for processing tasks.
         thread (threading.Thread): The thread object representing the worker.
         device (str): The device string specifying the GPU used by the worker.
+        available (threading.Event): Set while the worker waits for work.
+        in_flight (int): Requests queued or running on the worker.
+        ewma_latency (float or None): Moving average of the seconds per request.
 
     """
 
@@ -32,129 +89,519 @@ class ModelThreadWorker:
         queue: Queue,
         model: Optional[Callable] = None,
         *args,
+        max_batch_size: int = 1,
+        batch_dim: Optional[int] = None,
+        max_wait_ms: float = 2.0,
         **kwargs,
     ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        if max_batch_size > 1 and batch_dim is None:
+            raise ValueError(
+                "max_batch_size > 1 needs batch_dim, the dimension"
+                " requests are concatenated along."
+            )
         self.worker_id = worker_id
         self.gpu_id = gpu_id
         self.queue = queue
         self.model = model
+        self.max_batch_size = max_batch_size
+        self.batch_dim = batch_dim
+        self.max_wait_ms = max_wait_ms
         self.lock = threading.Lock()
-        self.model = None
-        self.thread = threading.Thread(target=self.run, daemon=True)
         self.device = (
             f"cuda:{gpu_id}" if torch.cuda.is_available() else "cpu"
         )
-        self.thread.start()
 
         # Availability
         self.available = threading.Event()
         self.available.set()
 
-        # Task que
-        self.task_queue = Queue()
+        # Load, read by the Router's routing policies
+        self.in_flight = 0
+        self.ewma_latency = None
+
+        # Batching statistics
+        self.batch_sizes = Counter()
+        self.queue_delays = deque(maxlen=_DELAY_WINDOW)
+        self.requests = 0
 
-        # Response queue
-        self.response_queue = Queue()
+        # Start last, run() uses everything above
+        self.thread = threading.Thread(
+            target=self.run, args=args, kwargs=kwargs, daemon=True
+        )
+        self.thread.start()
+
+    def enqueue(
+        self,
+        task,
+        response_queue: Queue,
+        timeout: Optional[float] = None,
+    ) -> bool:
+        """
+        Queue a request, counting it as in flight until its result is
+        delivered. Blocks while the queue is full.
+
+        Args:
+            task: The model input.
+            response_queue (Queue): Where the result is put.
+            timeout (float, optional): Seconds to wait for room in the queue. Default waits forever.
+
+        Returns:
+            bool: False if the queue stayed full for `timeout` seconds.
+        """
+        with self.lock:
+            self.in_flight += 1
+        try:
+            self.queue.put(
+                (task, response_queue, time.perf_counter()),
+                timeout=timeout,
+            )
+        except Full:
+            with self.lock:
+                self.in_flight -= 1
+            return False
+        return True
+
+    def expected_latency(self) -> float:
+        """Seconds until a new request would be done, 0 if unknown."""
+        return (self.in_flight + 1) * (self.ewma_latency or 0.0)
+
+    def _collect(self):
+        """
+        Wait for a request, then gather more until the batch is full or
+        the deadline passes. Returns the batch and whether to stop.
+        """
+        item = self.queue.get()
+        if item is None:
+            self.queue.task_done()
+            return [], True
+        batch = [item]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=timeout)
+            except Empty:
+                break
+            if item is None:
+                self.queue.task_done()
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _forward(self, tasks: List, *args, **kwargs) -> List:
+        """Run the tasks in one forward pass, splitting the output."""
+        dim = self.batch_dim
+        sizes = [task.shape[dim] for task in tasks]
+        output = self.model(torch.cat(tasks, dim), *args, **kwargs)
+        if (
+            not isinstance(output, torch.Tensor)
+            or output.dim() != tasks[0].dim()
+            or output.shape[dim] != sum(sizes)
+        ):
+            raise RuntimeError(
+                "A batched model must return one output slice per"
+                f" input slice along dim {dim}."
+            )
+        return list(output.split(sizes, dim))
+
+    def _run_each(self, tasks: List, *args, **kwargs) -> List:
+        """Run the tasks one by one; a failure is its task's result."""
+        results = []
+        for task in tasks:
+            try:
+                results.append(self.model(task, *args, **kwargs))
+            except Exception as error:
+                logger.exception(
+                    f"Worker {self.worker_id} failed on a request"
+                )
+                results.append(error)
+        return results
+
+    def _process(self, batch: List, *args, **kwargs):
+        start = time.perf_counter()
+        tasks = [item[0] for item in batch]
+        results = None
+        if len(tasks) > 1 and _can_batch(tasks, self.batch_dim):
+            try:
+                results = self._forward(tasks, *args, **kwargs)
+            except Exception:
+                # Find out which requests fail instead of failing all
+                logger.warning(
+                    f"Worker {self.worker_id} failed on a batch of"
+                    f" {len(batch)}, running it request by request"
+                )
+        if results is None:
+            # Every requester gets its result or its error
+            results = self._run_each(tasks, *args, **kwargs)
+
+        per_request = (time.perf_counter() - start) / len(batch)
+        with self.lock:
+            self.in_flight -= len(batch)
+            self.ewma_latency = (
+                per_request
+                if self.ewma_latency is None
+                else _EWMA_ALPHA * per_request
+                + (1 - _EWMA_ALPHA) * self.ewma_latency
+            )
+            self.requests += len(batch)
+            self.batch_sizes[len(batch)] += 1
+            self.queue_delays.extend(
+                start - item[2] if len(item) > 2 else 0.0
+                for item in batch
+            )
+
+        for item, result in zip(batch, results):
+            item[1].put(result)
+            self.queue.task_done()
 
     def run(self, *args, **kwargs):
         """
         The main method that runs in the worker thread.
 
-        This method continuously retrieves tasks from the queue, processes them using the model,
-        and puts the results into the response queue.
+        This method collects batches of requests from the queue, processes them using the
+        model, and puts each result into its requester's response queue.
 
         Args:
-            *args: Variable length argument list.
-            **kwargs: Arbitrary keyword arguments.
+            *args: Variable length argument list passed to the model.
+            **kwargs: Arbitrary keyword arguments passed to the model.
 
         """
         while True:
-            try:
-                self.available.clear()
-                task = self.queue.get()
-                if task is None:
-                    break
-                task, response_queue = task
-                print(
-                    f"Worker {self.worker_id} on GPU"
-                    f" {self.gpu_id} processing {task}"
+            self.available.set()
+            batch, stop = self._collect()
+            self.available.clear()
+            if batch:
+                logger.debug(
+                    f"Worker {self.worker_id} on GPU {self.gpu_id}"
+                    f" processing a batch of {len(batch)}"
                 )
-                result = self.model(task, *args, **kwargs)
-                response_queue.put(result)
-                self.queue.task_done()
-                self.available.set()
-            except Empty:
-                continue
+                self._process(batch, *args, **kwargs)
+            if stop:
+                break
+
+    def stats(self) -> dict:
+        """
+        Return batch-size and queueing-delay statistics, to tune
+        max_batch_size and max_wait_ms.
+        """
+        with self.lock:
+            delays = sorted(self.queue_delays)
+            batches = sum(self.batch_sizes.values())
+            sizes = dict(sorted(self.batch_sizes.items()))
+            requests = self.requests
+
+        def percentile(q):
+            if not delays:
+                return 0.0
+            return delays[min(len(delays) - 1, int(q * len(delays)))]
+
+        return {
+            "requests": requests,
+            "batches": batches,
+            "mean_batch_size": requests / batches if batches else 0.0,
+            "batch_sizes": sizes,
+            "mean_queue_delay_ms": (
+                1000 * sum(delays) / len(delays) if delays else 0.0
+            ),
+            "p50_queue_delay_ms": 1000 * percentile(0.5),
+            "p99_queue_delay_ms": 1000 * percentile(0.99),
+        }
+
+
+class _FutureResponse:
+    """
+    Response channel that completes a Future, so a request needs no
+    queue and no thread blocked on it.
+    """
+
+    def __init__(self, future: Future):
+        self.future = future
+
+    def put(self, result):
+        if isinstance(result, BaseException):
+            self.future.set_exception(result)
+        else:
+            self.future.set_result(result)
+
+
+class RoutingPolicy:
+    """
+    Picks the worker for the next request. Subclasses implement
+    `select`, given the workers whose queues have room.
+    """
+
+    def select(
+        self, workers: List[ModelThreadWorker]
+    ) -> ModelThreadWorker:
+        raise NotImplementedError
+
+
+class LeastOutstandingPolicy(RoutingPolicy):
+    """
+    The worker with the fewest requests in flight. Ties rotate, so an
+    idle pool is filled evenly instead of from worker 0.
+    """
+
+    def __init__(self):
+        self._offset = 0
+
+    def select(self, workers):
+        self._offset = (self._offset + 1) % len(workers)
+        rotated = workers[self._offset :] + workers[: self._offset]
+        return min(rotated, key=lambda w: w.in_flight)
+
+
+class PowerOfTwoChoicesPolicy(RoutingPolicy):
+    """
+    The less loaded of two workers drawn at random: close to least
+    outstanding, without every router herding onto the same worker.
+
+    Args:
+        seed (int, optional): Seed for the random draws.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self._random = random.Random(seed)
+
+    def select(self, workers):
+        if len(workers) == 1:
+            return workers[0]
+        a, b = self._random.sample(workers, 2)
+        return a if a.in_flight <= b.in_flight else b
+
+
+class EWMALatencyPolicy(RoutingPolicy):
+    """
+    The worker with the lowest expected completion time: requests in
+    flight times its moving-average latency per request. Workers
+    without a latency sample yet are tried first.
+    """
+
+    def __init__(self):
+        self._least_outstanding = LeastOutstandingPolicy()
+
+    def select(self, workers):
+        unmeasured = [w for w in workers if w.ewma_latency is None]
+        if unmeasured:
+            return self._least_outstanding.select(unmeasured)
+        return min(workers, key=lambda w: w.expected_latency())
+
+
+ROUTING_POLICIES = {
+    "least_outstanding": LeastOutstandingPolicy,
+    "power_of_two": PowerOfTwoChoicesPolicy,
+    "ewma_latency": EWMALatencyPolicy,
+}
 
 
 class Router:
     """
     A class that routes tasks to worker threads for parallel processing.
 
+    Every worker has its own bounded queue. A routing policy picks the
+    worker for each request among those with room; when every queue is
+    full the request waits for room on the policy's pick instead of
+    being refused.
+
     Args:
-        num_workers_per_gpu (int): The number of worker threads per GPU.
+        num_workers_per_gpu (int): The number of worker threads per GPU, or in total on
+            CPU-only hosts. Default is 1.
         model (Optional[Callable]): An optional callable representing the model.
+        policy (str or RoutingPolicy): "least_outstanding", "power_of_two", "ewma_latency",
+            or a RoutingPolicy instance. Default is "least_outstanding".
+        max_queue_size (int): Requests each worker may have queued. Default is 64.
+        **kwargs: Passed to every ModelThreadWorker, e.g. max_batch_size and
+            batch_dim.
 
     Attributes:
         queues (List[Queue]): A list of queues for each worker thread.
         workers (List[ModelThreadWorker]): A list of worker threads.
         num_gpus (int): The number of available GPUs.
+        policy (RoutingPolicy): The routing policy.
 
     Methods:
         route_task: Routes a task to a worker thread.
+        submit: Routes a task and returns a Future of its result.
+        asubmit: Coroutine routing a task and returning its result.
+        map: Runs an iterable of tasks, yielding results in order.
         shutdown: Shuts down all worker threads.
 
     """
 
     def __init__(
         self,
-        num_workers_per_gpu: int = None,
+        num_workers_per_gpu: int = 1,
         model: Optional[Callable] = None,
-        *args,
+        policy="least_outstanding",
+        max_queue_size: int = 64,
         **kwargs,
     ):
+        if isinstance(policy, str):
+            if policy not in ROUTING_POLICIES:
+                raise ValueError(
+                    f"Unknown routing policy {policy!r}, expected one"
+                    f" of {sorted(ROUTING_POLICIES)}."
+                )
+            policy = ROUTING_POLICIES[policy]()
+        self.policy = policy
         self.num_workers = num_workers_per_gpu
+        self.max_queue_size = max_queue_size
         self.model = model
         self.queues = []
         self.workers = []
-        self.num_gpus = torch.device_count()
+        self.num_gpus = torch.cuda.device_count()
 
-        for gpu_id in range(self.num_gpus):
+        for gpu_id in range(max(1, self.num_gpus)):
             for worker_id in range(num_workers_per_gpu):
-                queue = Queue()
+                queue = Queue(maxsize=max_queue_size)
                 worker = ModelThreadWorker(
                     f"{gpu_id}-{worker_id}",
                     gpu_id,
                     queue,
                     model=self.model,
-                    *args,
                     **kwargs,
                 )
                 self.queues.append(queue)
                 self.workers.append(worker)
 
-    def route_task(self, task: str, *args, **kwargs):
+    def route_task(
+        self,
+        task,
+        response_queue: Optional[Queue] = None,
+        timeout: Optional[float] = None,
+    ) -> Optional[Queue]:
         """
         Routes a task to a worker thread.
 
         Args:
-            task (str): The task to be executed.
-            *args: Variable length argument list.
-            **kwargs: Arbitrary keyword arguments.
+            task: The model input.
+            response_queue (Queue, optional): Where the result is put. A new queue is
+                created when omitted.
+            timeout (float, optional): Seconds to wait while every queue is full. Default
+                waits forever.
 
+        Returns:
+            Queue or None: The queue the result will be put on, or None if no worker had
+            room within `timeout`.
         """
-        for worker in self.workers:
-            if worker.available_is_set():
-                worker.task_queue.put(task)
-                return True
+        if response_queue is None:
+            response_queue = Queue(maxsize=1)
+        # Only when every queue is full does the request wait for room
+        candidates = [
+            w for w in self.workers if not w.queue.full()
+        ] or self.workers
+        worker = self.policy.select(candidates)
+        if worker.enqueue(task, response_queue, timeout=timeout):
+            return response_queue
+        return None
 
-        # If no worker is available return False or queue the task differently
-        return False
+    def submit(self, task, timeout: Optional[float] = None) -> Future:
+        """
+        Route a task and return a Future completed with the model's
+        output, or with its exception.
+
+        Args:
+            task: The model input.
+            timeout (float, optional): Seconds to wait while every queue is full. Default
+                waits forever.
+
+        Returns:
+            Future: The pending result.
+
+        Raises:
+            queue.Full: If no worker had room within `timeout`.
+        """
+        future = Future()
+        # Queued requests cannot be taken back, so they cannot cancel
+        future.set_running_or_notify_cancel()
+        response = _FutureResponse(future)
+        if self.route_task(task, response, timeout) is None:
+            raise Full("Every worker queue is full.")
+        return future
+
+    async def asubmit(self, task) -> Any:
+        """
+        Route a task from an asyncio event loop and return the model's
+        output. Neither admission nor the wait for the result blocks
+        the loop: while every queue is full the coroutine backs off and
+        retries, and the result arrives through the worker's callback.
+
+        Args:
+            task: The model input.
+
+        Returns:
+            The model's output for `task`.
+        """
+        delay = 0.0001
+        while True:
+            try:
+                future = self.submit(task, timeout=0)
+                break
+            except Full:
+                await asyncio.sleep(delay)
+                delay = min(2 * delay, _MAX_BACKOFF)
+        return await asyncio.wrap_future(future)
+
+    def map(
+        self, tasks: Iterable, max_in_flight: Optional[int] = None
+    ) -> Iterator:
+        """
+        Run every task and yield the outputs in input order, keeping at
+        most `max_in_flight` tasks submitted at a time. Tasks are taken
+        from the iterable lazily.
+
+        Args:
+            tasks (Iterable): The model inputs.
+            max_in_flight (int, optional): Tasks submitted but not yet yielded. Defaults to
+                enough to fill every worker and its queue.
+
+        Yields:
+            The model's output for each task, in order. A failed task raises its
+            exception when its turn comes.
+        """
+        if max_in_flight is None:
+            max_in_flight = len(self.workers) * (
+                self.max_queue_size + 1
+            )
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1.")
+        pending = deque()
+        for task in tasks:
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+            pending.append(self.submit(task))
+        while pending:
+            yield pending.popleft().result()
+
+    def stats(self) -> dict:
+        """Return the load and batching statistics of every worker."""
+        return {
+            worker.worker_id: {
+                "in_flight": worker.in_flight,
+                "ewma_latency_ms": 1000 * (
+                    worker.ewma_latency or 0.0
+                ),
+                **worker.stats(),
+            }
+            for worker in self.workers
+        }
 
     def shutdown(self):
         """
-        Shuts down all worker threads.
+        Shuts down all worker threads, after the requests already queued.
 
         """
         for worker in self.workers:
-            worker.task_queue.put(None)
+            worker.queue.put(None)
+        for worker in self.workers:
+            worker.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
@@ -0,0 +1,359 @@
+import time
+from typing import List, Optional, Sequence, Union
+
+import torch
+import torch.distributed as dist
+from loguru import logger
+from torch import Tensor, nn
+
+from exa.utils.async_work import run_async
+from exa.utils.topology import global_rank
+
+# Dtypes a stage boundary can carry, indexed by their header code
+_WIRE_DTYPES = [
+    torch.float32,
+    torch.float64,
+    torch.float16,
+    torch.bfloat16,
+    torch.int64,
+    torch.int32,
+    torch.bool,
+]
+
+# Header: dtype code, number of dims, then up to _MAX_DIMS sizes
+_MAX_DIMS = 8
+_HEADER_LEN = 2 + _MAX_DIMS
+
+# Header dtype code telling the next stage that the stream has ended
+_END_OF_STREAM = -1
+
+# Sends kept in flight before the oldest one is waited on
+_MAX_INFLIGHT_SENDS = 8
+
+
+def partition_sequential(
+    model: nn.Sequential,
+    num_stages: int,
+    balance: Optional[Sequence[int]] = None,
+) -> List[nn.Sequential]:
+    """
+    Split an nn.Sequential into contiguous stages.
+
+    Args:
+        model (nn.Sequential): The model to split.
+        num_stages (int): Number of stages.
+        balance (Sequence[int], optional): Number of layers in each stage. Defaults to
+            splitting so every stage holds about the same number of parameters.
+
+    Returns:
+        List[nn.Sequential]: One module per stage, sharing the model's layers.
+    """
+    layers = list(model.children())
+    if balance is None:
+        balance = _balance_by_params(layers, num_stages)
+    if len(balance) != num_stages or sum(balance) != len(layers):
+        raise ValueError(
+            f"balance {list(balance)} must have {num_stages} entries"
+            f" adding up to the {len(layers)} layers of the model."
+        )
+    if any(n <= 0 for n in balance):
+        raise ValueError("Every stage needs at least one layer.")
+
+    stages, start = [], 0
+    for count in balance:
+        stages.append(nn.Sequential(*layers[start : start + count]))
+        start += count
+    return stages
+
+
+def _balance_by_params(layers: List[nn.Module], num_stages: int):
+    """Contiguous split with roughly equal parameter counts."""
+    if len(layers) < num_stages:
+        raise ValueError(
+            f"Cannot split {len(layers)} layers into {num_stages}"
+            " stages."
+        )
+    # Parameterless layers still cost something, count them as one
+    costs = [
+        max(1, sum(p.numel() for p in layer.parameters()))
+        for layer in layers
+    ]
+    return balance_costs(costs, num_stages)
+
+
+def balance_costs(
+    costs: Sequence[float], num_stages: int
+) -> List[int]:
+    """
+    Split a sequence of per-layer costs into `num_stages` contiguous
+    groups, minimizing the most expensive group.
+
+    Returns:
+        List[int]: Number of layers in each stage.
+    """
+    n = len(costs)
+    prefix = [0.0]
+    for cost in costs:
+        prefix.append(prefix[-1] + cost)
+
+    # best[s][i]: lowest bottleneck for the first i layers in s stages
+    inf = float("inf")
+    best = [[inf] * (n + 1) for _ in range(num_stages + 1)]
+    cut = [[0] * (n + 1) for _ in range(num_stages + 1)]
+    best[0][0] = 0.0
+    for s in range(1, num_stages + 1):
+        for i in range(s, n - (num_stages - s) + 1):
+            for j in range(s - 1, i):
+                value = max(best[s - 1][j], prefix[i] - prefix[j])
+                if value < best[s][i]:
+                    best[s][i], cut[s][i] = value, j
+
+    balance, i = [], n
+    for s in range(num_stages, 0, -1):
+        j = cut[s][i]
+        balance.append(i - j)
+        i = j
+    return balance[::-1]
+
+
+class PipelineStats:
+    """
+    How busy every stage was during one pipelined run.
+
+    Attributes:
+        busy (List[float]): Seconds each stage spent computing.
+        wall (List[float]): Seconds each stage spent in the run.
+        micro_batches (int): Micro-batches streamed through the pipeline.
+        stage_utilization (List[float]): busy / wall per stage.
+        bubble_fraction (float): Share of stage time spent idle, averaged
+            over stages.
+        ideal_bubble_fraction (float): (S - 1) / (M + S - 1), the bubble of
+            a perfectly balanced pipeline with S stages and M micro-batches.
+    """
+
+    def __init__(self, busy, wall, micro_batches: int):
+        self.busy = busy
+        self.wall = wall
+        self.micro_batches = micro_batches
+
+    @property
+    def stage_utilization(self) -> List[float]:
+        return [
+            busy / wall if wall > 0 else 0.0
+            for busy, wall in zip(self.busy, self.wall)
+        ]
+
+    @property
+    def bubble_fraction(self) -> float:
+        utilization = self.stage_utilization
+        return 1.0 - sum(utilization) / len(utilization)
+
+    @property
+    def ideal_bubble_fraction(self) -> float:
+        stages = len(self.busy)
+        return (stages - 1) / (self.micro_batches + stages - 1)
+
+    def __repr__(self):
+        utilization = ", ".join(
+            f"{u:.2f}" for u in self.stage_utilization
+        )
+        return (
+            f"PipelineStats(stage_utilization=[{utilization}],"
+            f" bubble_fraction={self.bubble_fraction:.2f},"
+            " ideal_bubble_fraction="
+            f"{self.ideal_bubble_fraction:.2f})"
+        )
+
+
+class PipelineRunner:
+    """
+    Pipeline-parallel inference: every rank of the group runs one stage
+    of the model, and micro-batches stream through the stages with
+    point-to-point sends. A stage receives micro-batch m + 1 on the
+    background communication thread while it computes micro-batch m,
+    and hands its result on without waiting for the next stage, so
+    after the first S - 1 steps every stage is busy.
+    Works with CPU processes over gloo.
+
+    Args:
+        model (nn.Sequential or List[nn.Module]): The whole model, split with
+            partition_sequential, or the stages already split by the user.
+        balance (Sequence[int], optional): Layers per stage when splitting `model`.
+        group (ProcessGroup, optional): One rank per stage, in order. Default is the world group.
+        device (torch.device, optional): Where this stage runs. Default is CPU.
+    """
+
+    def __init__(
+        self,
+        model: Union[nn.Sequential, List[nn.Module]],
+        balance: Optional[Sequence[int]] = None,
+        group=None,
+        device=None,
+    ):
+        self.group = group
+        self.stage = dist.get_rank(group)
+        self.num_stages = dist.get_world_size(group)
+        self.device = torch.device(device or "cpu")
+
+        if isinstance(model, nn.Sequential):
+            stages = partition_sequential(
+                model, self.num_stages, balance
+            )
+        else:
+            stages = list(model)
+        if len(stages) != self.num_stages:
+            raise ValueError(
+                f"Got {len(stages)} stages for {self.num_stages}"
+                " ranks."
+            )
+        # Keep only this rank's stage alive
+        self.module = stages[self.stage].to(self.device).eval()
+
+        self.prev = (
+            global_rank(group, self.stage - 1)
+            if self.stage > 0
+            else None
+        )
+        self.next = (
+            global_rank(group, self.stage + 1)
+            if self.stage < self.num_stages - 1
+            else None
+        )
+        self._sends = []
+        self._busy = 0.0
+        self._wall = 0.0
+        self._micro_batches = 0
+
+    @property
+    def is_first(self) -> bool:
+        return self.stage == 0
+
+    @property
+    def is_last(self) -> bool:
+        return self.stage == self.num_stages - 1
+
+    def _isend(self, tensor: Tensor):
+        self._sends.append(
+            (tensor, dist.isend(tensor, self.next, group=self.group))
+        )
+        # Bound the memory held by in-flight sends
+        while len(self._sends) > _MAX_INFLIGHT_SENDS:
+            self._sends.pop(0)[1].wait()
+
+    def _send(self, tensor: Optional[Tensor]):
+        """Hand a micro-batch, or the end of the stream, to the next stage."""
+        header = torch.zeros(_HEADER_LEN, dtype=torch.int64)
+        if tensor is None:
+            header[0] = _END_OF_STREAM
+            self._isend(header)
+            return
+        if (
+            tensor.dim() > _MAX_DIMS
+            or tensor.dtype not in _WIRE_DTYPES
+        ):
+            raise ValueError(
+                f"Cannot pass a {tensor.dim()}-d {tensor.dtype}"
+                " tensor between stages."
+            )
+        header[0] = _WIRE_DTYPES.index(tensor.dtype)
+        header[1] = tensor.dim()
+        header[2 : 2 + tensor.dim()] = torch.tensor(tensor.shape)
+        self._isend(header)
+        self._isend(tensor.contiguous())
+
+    def _recv(self) -> Optional[Tensor]:
+        """Receive the next micro-batch, or None at the end of the stream."""
+        header = torch.empty(_HEADER_LEN, dtype=torch.int64)
+        dist.recv(header, self.prev, group=self.group)
+        code = int(header[0])
+        if code == _END_OF_STREAM:
+            return None
+        shape = header[2 : 2 + int(header[1])].tolist()
+        tensor = torch.empty(
+            shape, dtype=_WIRE_DTYPES[code], device=self.device
+        )
+        dist.recv(tensor, self.prev, group=self.group)
+        return tensor
+
+    def _forward(self, x: Tensor) -> Tensor:
+        start = time.perf_counter()
+        out = self.module(x.to(self.device))
+        self._busy += time.perf_counter() - start
+        return out
+
+    @torch.no_grad()
+    def run(
+        self,
+        inputs: Optional[Union[Tensor, Sequence[Tensor]]] = None,
+        num_micro_batches: int = 4,
+    ) -> Optional[List[Tensor]]:
+        """
+        Stream a batch through the pipeline. Must be called on every
+        stage.
+
+        Args:
+            inputs (Tensor or Sequence[Tensor], optional): Only used on the first stage:
+                a batch split into `num_micro_batches` along dim 0, or ready-made
+                micro-batches.
+            num_micro_batches (int): Micro-batches to split a batch into. Default is 4.
+
+        Returns:
+            List[Tensor] or None: The outputs of every micro-batch on the last stage,
+            None on the other stages.
+        """
+        self._busy, self._micro_batches = 0.0, 0
+        start = time.perf_counter()
+        outputs = []
+
+        if self.is_first:
+            if inputs is None:
+                raise ValueError("The first stage needs inputs.")
+            if isinstance(inputs, Tensor):
+                inputs = torch.tensor_split(inputs, num_micro_batches)
+            for micro_batch in inputs:
+                out = self._forward(micro_batch)
+                self._micro_batches += 1
+                if self.is_last:
+                    outputs.append(out)
+                else:
+                    self._send(out)
+        else:
+            work = run_async(self._recv)
+            while True:
+                x = work.wait()
+                if x is None:
+                    break
+                # Receive the next micro-batch, header and body, on the
+                # communication thread while this one computes
+                work = run_async(self._recv)
+                out = self._forward(x)
+                self._micro_batches += 1
+                if self.is_last:
+                    outputs.append(out)
+                else:
+                    self._send(out)
+
+        if not self.is_last:
+            self._send(None)
+        for _, work in self._sends:
+            work.wait()
+        self._sends.clear()
+        self._wall = time.perf_counter() - start
+        return outputs if self.is_last else None
+
+    def stats(self) -> PipelineStats:
+        """
+        Gather the utilization of every stage for the last run. Must be
+        called on every stage.
+        """
+        local = (self._busy, self._wall, self._micro_batches)
+        gathered = [None] * self.num_stages
+        dist.all_gather_object(gathered, local, group=self.group)
+        stats = PipelineStats(
+            [g[0] for g in gathered],
+            [g[1] for g in gathered],
+            gathered[0][2],
+        )
+        if self.is_first:
+            logger.info(f"Pipeline run: {stats}")
+        return stats
@@ -0,0 +1,452 @@
+import time
+from typing import Dict, List, Optional, Sequence, Union
+
+import torch
+from loguru import logger
+from torch import Tensor, nn
+
+from exa.utils.gpu_ops import (
+    calculate_available_memory,
+    get_num_gpus_available,
+)
+
+Device = Union[str, int, torch.device]
+
+
+class LayerProfile:
+    """
+    What one placeable submodule costs.
+
+    Attributes:
+        name (str): Qualified name of the submodule in the model.
+        param_bytes (int): Bytes of its parameters and buffers.
+        input_bytes (int): Bytes of the tensors it receives.
+        activation_bytes (int): Bytes of the tensors it returns.
+        latency (float or None): Mean forward time in seconds, None when profiled on meta.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        param_bytes: int,
+        input_bytes: int = 0,
+        activation_bytes: int = 0,
+        latency: Optional[float] = None,
+    ):
+        self.name = name
+        self.param_bytes = param_bytes
+        self.input_bytes = input_bytes
+        self.activation_bytes = activation_bytes
+        self.latency = latency
+
+    def __repr__(self):
+        return (
+            f"LayerProfile({self.name!r},"
+            f" param_bytes={self.param_bytes},"
+            f" activation_bytes={self.activation_bytes},"
+            f" latency={self.latency})"
+        )
+
+
+class PartitionPlan:
+    """
+    A contiguous assignment of profiled submodules to devices.
+
+    Attributes:
+        device_map (Dict[str, Device]): Device of every submodule, for apply_device_map.
+        devices (List[Device]): Devices that received at least one submodule, in order.
+        balance (List[int]): Submodules per used device, as PipelineRunner takes it.
+        stage_cost (List[float]): Forward latency (or its parameter-size proxy) per stage.
+        stage_memory (List[int]): Peak bytes per stage.
+    """
+
+    def __init__(
+        self,
+        device_map: Dict[str, Device],
+        devices: List[Device],
+        balance: List[int],
+        stage_cost: List[float],
+        stage_memory: List[int],
+    ):
+        self.device_map = device_map
+        self.devices = devices
+        self.balance = balance
+        self.stage_cost = stage_cost
+        self.stage_memory = stage_memory
+
+    @property
+    def bottleneck(self) -> float:
+        """Cost of the slowest stage."""
+        return max(self.stage_cost)
+
+    def __repr__(self):
+        return (
+            f"PartitionPlan(devices={self.devices},"
+            f" balance={self.balance},"
+            f" bottleneck={self.bottleneck:.4g})"
+        )
+
+
+def _tensor_bytes(value) -> int:
+    """Bytes of every tensor in a (nested) output."""
+    if isinstance(value, Tensor):
+        return value.numel() * value.element_size()
+    if isinstance(value, (list, tuple)):
+        return sum(_tensor_bytes(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_tensor_bytes(v) for v in value.values())
+    return 0
+
+
+def _to_device(value, device):
+    if isinstance(value, Tensor):
+        return value.to(device)
+    if isinstance(value, (list, tuple)):
+        return type(value)(_to_device(v, device) for v in value)
+    if isinstance(value, dict):
+        return {k: _to_device(v, device) for k, v in value.items()}
+    return value
+
+
+def _placeable_modules(model: nn.Module, prefix: str = ""):
+    """
+    Direct children of the model, with containers that are never called
+    themselves (ModuleList, ModuleDict) expanded into their members.
+    """
+    for name, child in model.named_children():
+        qualified = f"{prefix}{name}"
+        if isinstance(child, (nn.ModuleList, nn.ModuleDict)):
+            yield from _placeable_modules(child, f"{qualified}.")
+        else:
+            yield qualified, child
+
+
+def _module_bytes(module: nn.Module) -> int:
+    return sum(
+        t.numel() * t.element_size()
+        for t in list(module.parameters()) + list(module.buffers())
+    )
+
+
+@torch.no_grad()
+def profile_layers(
+    model: nn.Module,
+    sample_input,
+    modules: Optional[Sequence[str]] = None,
+    iterations: int = 3,
+) -> List[LayerProfile]:
+    """
+    Profile the parameter bytes, activation bytes and forward latency of
+    every placeable submodule, in the order the forward pass runs them.
+
+    A model on the meta device is run once on meta inputs. This gives
+    parameter and activation sizes without allocating memory or doing any
+    compute, but latencies are then None.
+
+    Args:
+        model (nn.Module): The model to profile.
+        sample_input (Tensor, tuple or dict): A representative input. A tuple is passed
+            as positional arguments and a dict as keyword arguments.
+        modules (Sequence[str], optional): Qualified names of the submodules to place.
+            Defaults to the model's children, with ModuleList and ModuleDict expanded.
+        iterations (int): Timed forward passes after one warmup pass. Default is 3.
+
+    Returns:
+        List[LayerProfile]: One profile per submodule, in execution order.
+    """
+    if modules is None:
+        named = list(_placeable_modules(model))
+    else:
+        named = [
+            (name, model.get_submodule(name)) for name in modules
+        ]
+    if not named:
+        raise ValueError("The model has no submodules to place.")
+
+    on_meta = any(p.is_meta for p in model.parameters())
+    if on_meta:
+        sample_input = _to_device(sample_input, "meta")
+        iterations = 1
+
+    profiles = {
+        name: LayerProfile(name, _module_bytes(module))
+        for name, module in named
+    }
+    elapsed = {name: 0.0 for name, _ in named}
+    order, starts = [], {}
+
+    def _sync(value):
+        if isinstance(value, Tensor) and value.is_cuda:
+            torch.cuda.synchronize(value.device)
+
+    def pre_hook(name):
+        def hook(module, args, kwargs):
+            _sync(next(iter(args), None))
+            starts[name] = time.perf_counter()
+
+        return hook
+
+    def post_hook(name):
+        def hook(module, args, kwargs, output):
+            _sync(output if isinstance(output, Tensor) else None)
+            elapsed[name] += time.perf_counter() - starts[name]
+            profile = profiles[name]
+            profile.input_bytes = _tensor_bytes(args) + _tensor_bytes(
+                kwargs
+            )
+            profile.activation_bytes = _tensor_bytes(output)
+            if name not in order:
+                order.append(name)
+
+        return hook
+
+    handles = []
+    for name, module in named:
+        handles.append(
+            module.register_forward_pre_hook(
+                pre_hook(name), with_kwargs=True
+            )
+        )
+        handles.append(
+            module.register_forward_hook(
+                post_hook(name), with_kwargs=True
+            )
+        )
+
+    def forward():
+        if isinstance(sample_input, dict):
+            return model(**sample_input)
+        if isinstance(sample_input, tuple):
+            return model(*sample_input)
+        return model(sample_input)
+
+    try:
+        if not on_meta:
+            forward()  # warmup
+            for name in elapsed:
+                elapsed[name] = 0.0
+        for _ in range(iterations):
+            forward()
+    finally:
+        for handle in handles:
+            handle.remove()
+
+    # Submodules the sample input never reached still need a device
+    order += [name for name, _ in named if name not in order]
+    result = []
+    for name in order:
+        profile = profiles[name]
+        if not on_meta:
+            profile.latency = elapsed[name] / iterations
+        result.append(profile)
+    return result
+
+
+def memory_budgets(
+    budgets: Optional[Dict[Device, int]] = None,
+    reserve_fraction: float = 0.1,
+) -> Dict[Device, int]:
+    """
+    Bytes each device may hold. Configured budgets are used as given;
+    otherwise every visible GPU offers its free memory minus a reserve
+    for the allocator and workspace.
+
+    Args:
+        budgets (Dict[Device, int], optional): Bytes per device, in placement order. Required
+            on CPU-only hosts, e.g. {0: 8 * 2**30, 1: 8 * 2**30} for two pipeline ranks.
+        reserve_fraction (float): Share of free GPU memory kept back. Default is 0.1.
+
+    Returns:
+        Dict[Device, int]: Bytes per device, in placement order.
+    """
+    if budgets is not None:
+        return dict(budgets)
+    if not torch.cuda.is_available():
+        raise ValueError(
+            "No GPUs are visible, pass the memory budgets of the"
+            " devices to place the model on."
+        )
+    return {
+        f"cuda:{gpu_id}": int(
+            calculate_available_memory(gpu_id)
+            * 1024**3
+            * (1 - reserve_fraction)
+        )
+        for gpu_id in range(get_num_gpus_available())
+    }
+
+
+def plan_partition(
+    profiles: Sequence[LayerProfile],
+    budgets: Dict[Device, int],
+) -> PartitionPlan:
+    """
+    Split the profiled submodules into contiguous stages, one per device
+    in budget order, so that the slowest stage is as fast as possible
+    and no stage exceeds its device's memory budget. A device may be
+    left empty when the rest already give the fastest plan.
+
+    Stages are costed by their summed latency; without latencies (meta
+    profiles) parameter bytes stand in, as compute scales with weights
+    for most layers.
+
+    Args:
+        profiles (Sequence[LayerProfile]): Output of profile_layers.
+        budgets (Dict[Device, int]): Bytes per device, e.g. from memory_budgets.
+
+    Returns:
+        PartitionPlan: The placement.
+    """
+    devices = list(budgets)
+    limits = [budgets[d] for d in devices]
+    n, num_devices = len(profiles), len(devices)
+    if any(p.latency is None for p in profiles):
+        costs = [float(p.param_bytes) for p in profiles]
+    else:
+        costs = [p.latency for p in profiles]
+
+    prefix_cost, prefix_params = [0.0], [0]
+    for profile, cost in zip(profiles, costs):
+        prefix_cost.append(prefix_cost[-1] + cost)
+        prefix_params.append(prefix_params[-1] + profile.param_bytes)
+
+    # best[d][i]: lowest bottleneck, first i modules on devices < d
+    inf = float("inf")
+    best = [[inf] * (n + 1) for _ in range(num_devices + 1)]
+    cut = [[0] * (n + 1) for _ in range(num_devices + 1)]
+    best[0][0] = 0.0
+    for d in range(1, num_devices + 1):
+        for i in range(n + 1):
+            # Grow the stage j..i leftwards, tracking its peak
+            live = 0
+            for j in range(i, -1, -1):
+                if j < i:
+                    p = profiles[j]
+                    live = max(
+                        live, p.input_bytes + p.activation_bytes
+                    )
+                memory = prefix_params[i] - prefix_params[j] + live
+                if j < i and memory > limits[d - 1]:
+                    break
+                value = max(
+                    best[d - 1][j], prefix_cost[i] - prefix_cost[j]
+                )
+                if value < best[d][i]:
+                    best[d][i], cut[d][i] = value, j
+
+    if best[num_devices][n] == inf:
+        total = prefix_params[n]
+        raise RuntimeError(
+            f"The model ({total / 2**30:.2f} GiB of weights) does not"
+            f" fit in the memory budgets of {devices}."
+        )
+
+    ranges, i = [], n
+    for d in range(num_devices, 0, -1):
+        j = cut[d][i]
+        ranges.append((devices[d - 1], j, i))
+        i = j
+    ranges.reverse()
+
+    device_map, used, balance = {}, [], []
+    stage_cost, stage_memory = [], []
+    for device, j, i in ranges:
+        if j == i:
+            continue
+        stage = profiles[j:i]
+        for profile in stage:
+            device_map[profile.name] = device
+        used.append(device)
+        balance.append(i - j)
+        stage_cost.append(prefix_cost[i] - prefix_cost[j])
+        stage_memory.append(
+            prefix_params[i]
+            - prefix_params[j]
+            + max(p.input_bytes + p.activation_bytes for p in stage)
+        )
+
+    plan = PartitionPlan(
+        device_map, used, balance, stage_cost, stage_memory
+    )
+    logger.info(f"Planned placement: {plan}")
+    return plan
+
+
+def apply_device_map(
+    model: nn.Module, device_map: Dict[str, Device]
+) -> nn.Module:
+    """
+    Move every mapped submodule to its device, in place, and make each
+    one move its inputs to its own device before it runs, so the model
+    can be called as before. Parameters and buffers outside the mapped
+    submodules go to the first device of the map.
+
+    Args:
+        model (nn.Module): The model to place.
+        device_map (Dict[str, Device]): Device per submodule, e.g. PartitionPlan.device_map.
+
+    Returns:
+        nn.Module: The same model.
+    """
+    if not device_map:
+        raise ValueError("The device map is empty.")
+    first = _as_device(next(iter(device_map.values())))
+    # Move the unmapped remainder alone, the whole model may not fit
+    mapped = tuple(f"{name}." for name in device_map)
+    for name, module in model.named_modules():
+        if name in device_map or name.startswith(mapped):
+            continue
+        for key, param in module.named_parameters(recurse=False):
+            param.data = param.data.to(first)
+        for key, buffer in module.named_buffers(recurse=False):
+            module._buffers[key] = buffer.to(first)
+
+    def move_inputs(device):
+        def hook(module, args, kwargs):
+            return (
+                _to_device(args, device),
+                _to_device(kwargs, device),
+            )
+
+        return hook
+
+    for name, device in device_map.items():
+        device = _as_device(device)
+        module = model.get_submodule(name)
+        module.to(device)
+        module.register_forward_pre_hook(
+            move_inputs(device), with_kwargs=True
+        )
+    return model
+
+
+def _as_device(device: Device) -> torch.device:
+    """Ints name CUDA devices, as with torch.device."""
+    if isinstance(device, int):
+        return torch.device("cuda", device)
+    return torch.device(device)
+
+
+def auto_partition(
+    model: nn.Module,
+    sample_input,
+    budgets: Optional[Dict[Device, int]] = None,
+    modules: Optional[Sequence[str]] = None,
+) -> PartitionPlan:
+    """
+    Profile the model and plan its placement over the devices' memory
+    budgets. Apply the result with apply_device_map, or pass its balance
+    to PipelineRunner for one stage per process.
+
+    Args:
+        model (nn.Module): The model, materialized or on the meta device.
+        sample_input (Tensor, tuple or dict): A representative input.
+        budgets (Dict[Device, int], optional): Bytes per device. Defaults to the free memory of
+            every visible GPU.
+        modules (Sequence[str], optional): Qualified names of the submodules to place.
+
+    Returns:
+        PartitionPlan: The placement.
+    """
+    profiles = profile_layers(model, sample_input, modules=modules)
+    return plan_partition(profiles, memory_budgets(budgets))
@@ -0,0 +1,221 @@
+import atexit
+import os
+import threading
+import time
+import uuid
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import torch
+from torch import Tensor
+
+from exa.utils.atomic_flags import AtomicFlags, atomic_flags_supported
+
+# One state flag per cache line so writer and reader never share one
+_FLAG_STRIDE = 8
+
+# Slot states, each written by one side only
+_FREE = 0
+_BUSY = 1
+
+# Seconds `put` waits for a free slot by default
+DEFAULT_PUT_TIMEOUT = 300.0
+
+
+def _align(nbytes: int, alignment: int = 64) -> int:
+    return (nbytes + alignment - 1) // alignment * alignment
+
+
+class SlotRef:
+    """
+    What travels through the queue instead of a tensor: the slot it was
+    written to, plus its dtype and shape.
+
+    Attributes:
+        slot (int): Index of the slot in the ring.
+        dtype (torch.dtype): Dtype of the tensor.
+        shape (Tuple[int, ...]): Shape of the tensor.
+    """
+
+    __slots__ = ("slot", "dtype", "shape")
+
+    def __init__(self, slot: int, dtype: torch.dtype, shape):
+        self.slot = slot
+        self.dtype = dtype
+        self.shape = tuple(shape)
+
+    def __reduce__(self):
+        return (SlotRef, (self.slot, self.dtype, self.shape))
+
+    def __repr__(self):
+        return (
+            f"SlotRef(slot={self.slot}, dtype={self.dtype},"
+            f" shape={self.shape})"
+        )
+
+
+class ShmTensorRing:
+    """
+    A ring of preallocated tensor slots in one shared-memory segment,
+    for moving tensors one way between two processes without pickling
+    them. The writer copies a tensor into a free slot with `put` and
+    sends the returned SlotRef, a few bytes, through any queue. The
+    reader gets a zero-copy view with `get` and hands the slot back with
+    `release` once it is done with it.
+
+    Every slot has a state flag written by one side only, busy by the
+    writer and free by the reader, so no locks are needed. The reader
+    frees a slot with a release store once it is done reading, and the
+    writer claims it only after an acquire load, so a slot is never
+    overwritten while it is being read (AtomicFlags). When every slot
+    is busy, `put` waits, which bounds how far the writer can run
+    ahead.
+
+    Args:
+        num_slots (int): Number of slots. Default is 8.
+        slot_bytes (int): Capacity of each slot in bytes. Default is 4 MiB.
+        name (str, optional): Attach to the existing segment of this name instead of
+            creating one. Use `ShmTensorRing.attach(ring.handle())`.
+    """
+
+    def __init__(
+        self,
+        num_slots: int = 8,
+        slot_bytes: int = 4 * 1024 * 1024,
+        name: Optional[str] = None,
+    ):
+        if not atomic_flags_supported():
+            raise RuntimeError(
+                "Shared-memory rings need libatomic on this CPU."
+            )
+        self.num_slots = num_slots
+        self.slot_bytes = _align(slot_bytes)
+        header = _align(num_slots * _FLAG_STRIDE * 8)
+        size = header + num_slots * self.slot_bytes
+
+        self.owner = name is None
+        if self.owner:
+            name = f"exa_ring_{os.getpid()}_{uuid.uuid4().hex[:12]}"
+            self.shm = shared_memory.SharedMemory(
+                name=name, create=True, size=size
+            )
+        else:
+            # Processes spawned by the creator share its resource
+            # tracker, which drops the segment once the creator unlinks
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        self.flags = AtomicFlags(
+            self.shm.buf, num_slots, stride=_FLAG_STRIDE
+        )
+        if self.owner:
+            self.flags.fill(_FREE)
+        self.data = torch.frombuffer(
+            self.shm.buf,
+            dtype=torch.uint8,
+            count=num_slots * self.slot_bytes,
+            offset=header,
+        )
+        self._cursor = 0
+        # Writers on several threads must not claim the same slot
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def handle(self) -> Tuple[str, int, int]:
+        """Picklable description for `attach` in another process."""
+        return (self.shm.name, self.num_slots, self.slot_bytes)
+
+    @classmethod
+    def attach(cls, handle: Tuple[str, int, int]) -> "ShmTensorRing":
+        """Map a ring created by another process."""
+        name, num_slots, slot_bytes = handle
+        return cls(num_slots, slot_bytes, name=name)
+
+    def fits(self, tensor: Tensor) -> bool:
+        """Whether the tensor fits in one slot."""
+        nbytes = tensor.numel() * tensor.element_size()
+        return nbytes <= self.slot_bytes
+
+    def _slot_view(self, ref: SlotRef) -> Tensor:
+        start = ref.slot * self.slot_bytes
+        nbytes = (
+            torch.Size(ref.shape).numel()
+            * torch.empty(0, dtype=ref.dtype).element_size()
+        )
+        return (
+            self.data[start : start + nbytes]
+            .view(ref.dtype)
+            .view(ref.shape)
+        )
+
+    def _acquire(self, timeout: float) -> int:
+        """Index of a free slot, waiting while every slot is busy."""
+        deadline = time.monotonic() + timeout
+        spins = 0
+        while True:
+            for offset in range(self.num_slots):
+                slot = (self._cursor + offset) % self.num_slots
+                if self.flags.load(slot) == _FREE:
+                    self._cursor = (slot + 1) % self.num_slots
+                    return slot
+            spins += 1
+            if spins > 1000:
+                # Yield the core to the reader we are waiting on
+                time.sleep(0)
+                if time.monotonic() > deadline:
+                    raise RuntimeError(
+                        "Timed out waiting for a free slot."
+                    )
+
+    def put(
+        self, tensor: Tensor, timeout: float = DEFAULT_PUT_TIMEOUT
+    ) -> SlotRef:
+        """
+        Copy a tensor into a free slot, waiting while none is free.
+
+        Args:
+            tensor (Tensor): The tensor to send. Must fit in a slot.
+            timeout (float): Seconds to wait for a free slot.
+
+        Returns:
+            SlotRef: The reference to send to the reader.
+        """
+        if not self.fits(tensor):
+            raise ValueError(
+                f"A {tensor.numel() * tensor.element_size()} B tensor"
+                f" does not fit in {self.slot_bytes} B slots."
+            )
+        with self._lock:
+            slot = self._acquire(timeout)
+            self.flags.store(slot, _BUSY)
+        ref = SlotRef(slot, tensor.dtype, tensor.shape)
+        self._slot_view(ref).copy_(tensor)
+        return ref
+
+    def get(self, ref: SlotRef) -> Tensor:
+        """
+        Zero-copy view of a received tensor. Only valid until
+        `release(ref)`: clone it to keep it longer.
+        """
+        return self._slot_view(ref)
+
+    def release(self, ref: SlotRef):
+        """Hand the slot back to the writer."""
+        self.flags.store(ref.slot, _FREE)
+
+    def close(self):
+        """Unmap the segment, and remove it if this process created it."""
+        if self.shm is None:
+            return
+        # Views into the buffer must go before the mapping can close
+        self.flags = None
+        self.data = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+        self.shm = None
@@ -0,0 +1,421 @@
+import fnmatch
+from typing import Dict, Optional, Tuple, Union
+
+import torch
+import torch.distributed as dist
+import torch.nn.functional as F
+from loguru import logger
+from torch import Tensor, nn
+
+from exa.utils.all_reduce import fused_all_reduce
+from exa.utils.collective_matmul import (
+    all_gather_matmul,
+    matmul_reduce_scatter,
+)
+from exa.utils.fused_all_gather import fused_all_gather_into
+
+# Projection names of common MLP and attention blocks. Column layers
+# keep their output sharded so the following row layer consumes it
+# without any communication in between.
+DEFAULT_TP_PLAN = {
+    "*q_proj": "column",
+    "*k_proj": "column",
+    "*v_proj": "column",
+    "*o_proj": "row",
+    "*out_proj": "row",
+    "*gate_proj": "column",
+    "*up_proj": "column",
+    "*down_proj": "row",
+    "*fc1": "column",
+    "*fc2": "row",
+}
+
+
+def shard_range(size: int, group=None) -> Tuple[int, int]:
+    """
+    Return the [start, end) range of a dimension of `size` owned by
+    this rank. The dimension must split evenly across the group.
+    """
+    world_size = dist.get_world_size(group)
+    rank = dist.get_rank(group)
+    if size % world_size:
+        raise ValueError(
+            f"Dimension {size} cannot be split evenly over"
+            f" {world_size} ranks."
+        )
+    shard = size // world_size
+    return rank * shard, (rank + 1) * shard
+
+
+class _ParallelLinear(nn.Module):
+    """
+    Shared loading logic: full-size weights found in a state dict are
+    narrowed to this rank's shard before they are copied in, so the
+    model's ordinary load_state_dict works with unsharded checkpoints.
+    Subclasses set `_shard_dims`, the sharded dim of every parameter.
+    """
+
+    _shard_dims: Dict[str, Optional[int]] = {}
+
+    def _full_shape(self, name: str, shape):
+        dim = self._shard_dims.get(name)
+        if dim is None:
+            return tuple(shape)
+        full = list(shape)
+        full[dim] *= self.world_size
+        return tuple(full)
+
+    def shard(self, name: str, full: Tensor) -> Tensor:
+        """Slice this rank's shard out of a full-size parameter."""
+        dim = self._shard_dims.get(name)
+        if dim is None:
+            return full
+        start, end = shard_range(full.shape[dim], self.group)
+        # Clone so only the shard is materialized, even from an mmap
+        return full.narrow(dim, start, end - start).clone()
+
+    def _load_from_state_dict(
+        self, state_dict, prefix, local_metadata, strict, *args
+    ):
+        local = None
+        for name, param in self.named_parameters(recurse=False):
+            key = prefix + name
+            value = state_dict.get(key)
+            if value is None:
+                continue
+            full_shape = self._full_shape(name, param.shape)
+            if tuple(value.shape) == full_shape:
+                if local is None:
+                    # Shard into a copy, the caller's dict stays full
+                    local = dict(state_dict)
+                local[key] = self.shard(name, value)
+        super()._load_from_state_dict(
+            state_dict if local is None else local,
+            prefix,
+            local_metadata,
+            strict,
+            *args,
+        )
+
+
+class ColumnParallelLinear(_ParallelLinear):
+    """
+    nn.Linear with its output features split across the ranks of a
+    group: every rank holds out_features / N rows of the weight and
+    computes that slice of the output. With `gather_output` the slices
+    are all-gathered into the full output; without it the output stays
+    sharded for a following RowParallelLinear.
+
+    With `sequence_parallel` the input arrives split by rows (dim 0)
+    instead of replicated, and the row all-gather is overlapped with
+    the matmul through all_gather_matmul. The row counts need not be
+    equal: they are exchanged on every call, so the rows need not
+    divide the group size.
+
+    Built for inference: the collectives are not differentiated
+    through.
+
+    Args:
+        in_features (int): Size of each input sample.
+        out_features (int): Size of each full output sample, divisible by the group size.
+        bias (bool): Whether to learn an additive bias. Default is True.
+        gather_output (bool): All-gather the output shards. Default is True.
+        sequence_parallel (bool): The input is split by rows across ranks. Default is False.
+        group (ProcessGroup, optional): The tensor-parallel group. Default is the world group.
+        device (torch.device, optional): Where to allocate the shard.
+        dtype (torch.dtype, optional): Dtype of the shard.
+    """
+
+    _shard_dims = {"weight": 0, "bias": 0}
+
+    def __init__(
+        self,
+        in_features: int,
+        out_features: int,
+        bias: bool = True,
+        gather_output: bool = True,
+        sequence_parallel: bool = False,
+        group=None,
+        device=None,
+        dtype=None,
+    ):
+        super().__init__()
+        if gather_output and sequence_parallel:
+            raise ValueError(
+                "gather_output cannot be combined with"
+                " sequence_parallel."
+            )
+        self.group = group
+        self.world_size = dist.get_world_size(group)
+        self.in_features = in_features
+        self.out_features = out_features
+        self.gather_output = gather_output
+        self.sequence_parallel = sequence_parallel
+        start, end = shard_range(out_features, group)
+        self.local_out_features = end - start
+
+        factory = {"device": device, "dtype": dtype}
+        self.weight = nn.Parameter(
+            torch.empty(
+                self.local_out_features, in_features, **factory
+            )
+        )
+        self.bias = (
+            nn.Parameter(
+                torch.zeros(self.local_out_features, **factory)
+            )
+            if bias
+            else None
+        )
+
+    def forward(self, x: Tensor) -> Tensor:
+        if self.sequence_parallel and self.world_size > 1:
+            output, _ = all_gather_matmul(
+                x, self.weight, self.bias, group=self.group
+            )
+            return output
+        local = F.linear(x, self.weight, self.bias)
+        if not self.gather_output or self.world_size == 1:
+            return local
+        # One zero-copy view per rank, laid out feature-last
+        pieces = fused_all_gather_into(
+            local.contiguous(), group=self.group
+        )
+        return torch.cat(pieces, dim=-1)
+
+    def extra_repr(self) -> str:
+        return (
+            f"in_features={self.in_features},"
+            f" out_features={self.out_features},"
+            f" local_out_features={self.local_out_features},"
+            f" gather_output={self.gather_output},"
+            f" sequence_parallel={self.sequence_parallel}"
+        )
+
+
+class RowParallelLinear(_ParallelLinear):
+    """
+    nn.Linear with its input features split across the ranks of a
+    group: every rank holds in_features / N columns of the weight,
+    multiplies its slice of the input, and the partial products are
+    summed with fused_all_reduce. The bias is added once, after the
+    reduction.
+
+    With `sequence_parallel` the sum is reduce-scattered by rows
+    instead, overlapped with the matmul through matmul_reduce_scatter,
+    so each rank keeps its share of the rows for a following
+    sequence-parallel ColumnParallelLinear. The rows are split as by
+    torch.tensor_split, so when they do not divide the group size the
+    first ranks keep one row more.
+
+    Built for inference: the collectives are not differentiated
+    through.
+
+    Args:
+        in_features (int): Size of each full input sample, divisible by the group size.
+        out_features (int): Size of each output sample.
+        bias (bool): Whether to learn an additive bias. Default is True.
+        input_is_parallel (bool): The input is already this rank's shard, as produced by
+            a ColumnParallelLinear without gather_output. Otherwise it is sliced here.
+            Default is True.
+        sequence_parallel (bool): Reduce-scatter the output by rows. Default is False.
+        group (ProcessGroup, optional): The tensor-parallel group. Default is the world group.
+        device (torch.device, optional): Where to allocate the shard.
+        dtype (torch.dtype, optional): Dtype of the shard.
+    """
+
+    _shard_dims = {"weight": 1, "bias": None}
+
+    def __init__(
+        self,
+        in_features: int,
+        out_features: int,
+        bias: bool = True,
+        input_is_parallel: bool = True,
+        sequence_parallel: bool = False,
+        group=None,
+        device=None,
+        dtype=None,
+    ):
+        super().__init__()
+        self.group = group
+        self.world_size = dist.get_world_size(group)
+        self.in_features = in_features
+        self.out_features = out_features
+        self.input_is_parallel = input_is_parallel
+        self.sequence_parallel = sequence_parallel
+        self.input_start, end = shard_range(in_features, group)
+        self.local_in_features = end - self.input_start
+
+        factory = {"device": device, "dtype": dtype}
+        self.weight = nn.Parameter(
+            torch.empty(
+                out_features, self.local_in_features, **factory
+            )
+        )
+        self.bias = (
+            nn.Parameter(torch.zeros(out_features, **factory))
+            if bias
+            else None
+        )
+
+    def forward(self, x: Tensor) -> Tensor:
+        if not self.input_is_parallel:
+            x = x.narrow(-1, self.input_start, self.local_in_features)
+        if self.sequence_parallel and self.world_size > 1:
+            return matmul_reduce_scatter(
+                x, self.weight, self.bias, group=self.group
+            )
+        out = F.linear(x, self.weight)
+        if self.world_size > 1:
+            fused_all_reduce(out, group=self.group)
+        if self.bias is not None:
+            out = out + self.bias
+        return out
+
+    def extra_repr(self) -> str:
+        return (
+            f"in_features={self.in_features},"
+            f" out_features={self.out_features},"
+            f" local_in_features={self.local_in_features},"
+            f" input_is_parallel={self.input_is_parallel},"
+            f" sequence_parallel={self.sequence_parallel}"
+        )
+
+
+def _parallel_linear(
+    linear: nn.Linear, style: str, group, sequence_parallel: bool
+):
+    """Build the parallel replacement of `linear` with its shard."""
+    meta = linear.weight.device.type == "meta"
+    factory = {
+        # A meta model gets real, empty shards to load into later
+        "device": "cpu" if meta else linear.weight.device,
+        "dtype": linear.weight.dtype,
+    }
+    bias = linear.bias is not None
+    if style in ("column", "column_gather"):
+        layer = ColumnParallelLinear(
+            linear.in_features,
+            linear.out_features,
+            bias=bias,
+            gather_output=style == "column_gather",
+            sequence_parallel=sequence_parallel,
+            group=group,
+            **factory,
+        )
+    elif style == "row":
+        layer = RowParallelLinear(
+            linear.in_features,
+            linear.out_features,
+            bias=bias,
+            sequence_parallel=sequence_parallel,
+            group=group,
+            **factory,
+        )
+    else:
+        raise ValueError(
+            f"Unknown tensor-parallel style {style!r}. Expected"
+            " 'column', 'column_gather' or 'row'."
+        )
+
+    if not meta:
+        with torch.no_grad():
+            layer.weight.copy_(layer.shard("weight", linear.weight))
+            if bias:
+                layer.bias.copy_(layer.shard("bias", linear.bias))
+    return layer
+
+
+def tensor_parallelize(
+    model: nn.Module,
+    plan: Optional[Dict[str, str]] = None,
+    group=None,
+    sequence_parallel: bool = False,
+) -> nn.Module:
+    """
+    Replace the nn.Linear projections of a model with column- or
+    row-parallel shards, in place.
+
+    `plan` maps fnmatch patterns over module names to a style:
+    "column" (output stays sharded), "column_gather" (output
+    all-gathered) or "row" (sharded input, all-reduced output). Pair
+    each column layer with a row layer, as in an MLP (up, down) or
+    attention (q/k/v, o), so activations stay sharded in between. Attention modules must
+    derive their head count from the projection's local size.
+
+    To keep the full weights off every rank, build the model on the
+    meta device (`with torch.device("meta"):`), parallelize it, then
+    fill it with load_sharded_state_dict.
+
+    With `sequence_parallel`, activations outside the column/row pairs
+    are split by rows (dim 0) across ranks, and the pairs overlap their
+    communication with the matmuls (all_gather_matmul into a column
+    layer, matmul_reduce_scatter out of a row layer).
+
+    Args:
+        model (nn.Module): The model to shard.
+        plan (Dict[str, str], optional): Module name patterns to styles. Defaults to
+            DEFAULT_TP_PLAN.
+        group (ProcessGroup, optional): The tensor-parallel group. Default is the world group.
+        sequence_parallel (bool): Use row-split activations between pairs. Default is False.
+
+    Returns:
+        nn.Module: The same model, with its matching Linear layers replaced.
+    """
+    plan = DEFAULT_TP_PLAN if plan is None else plan
+    replaced = 0
+    for name, module in list(model.named_modules()):
+        if not isinstance(module, nn.Linear):
+            continue
+        style = next(
+            (s for p, s in plan.items() if fnmatch.fnmatch(name, p)),
+            None,
+        )
+        if style is None:
+            continue
+        parent_name, _, child = name.rpartition(".")
+        parent = model.get_submodule(parent_name)
+        layer = _parallel_linear(
+            module, style, group, sequence_parallel
+        )
+        setattr(parent, child, layer)
+        replaced += 1
+
+    logger.info(
+        f"Sharded {replaced} linear layers over"
+        f" {dist.get_world_size(group)} ranks"
+    )
+    return model
+
+
+def load_sharded_state_dict(
+    model: nn.Module,
+    checkpoint: Union[str, Dict[str, Tensor]],
+    strict: bool = True,
+):
+    """
+    Load an unsharded checkpoint into a tensor-parallel model. A path
+    is memory-mapped, so each parallel layer copies out only its own
+    shard and the full matrices are never materialized in the process.
+    Parameters still on the meta device are assigned directly.
+
+    Args:
+        model (nn.Module): A model prepared with tensor_parallelize.
+        checkpoint (str or Dict[str, Tensor]): Path to a torch.save'd state dict, or the dict.
+        strict (bool): Passed to load_state_dict. Default is True.
+
+    Returns:
+        The result of model.load_state_dict.
+    """
+    if isinstance(checkpoint, str):
+        checkpoint = torch.load(
+            checkpoint,
+            map_location="cpu",
+            mmap=True,
+            weights_only=True,
+        )
+    meta = any(p.device.type == "meta" for p in model.parameters())
+    return model.load_state_dict(
+        dict(checkpoint), strict=strict, assign=meta
+    )
@@ -11,12 +11,55 @@ from exa.utils.dist_process_init import initialize_distributed
 from exa.utils.all_reduce import (
     fused_all_reduce_v1,
     fused_all_reduce_v2,
+    fused_all_reduce_coalesced,
+    fused_all_reduce,
+    tree_all_reduce,
+    halving_doubling_all_reduce,
+    select_all_reduce_algorithm,
+    hierarchical_all_reduce,
 )
 from exa.utils.fused_all_gather import (
     fused_all_gather_v1,
     fused_all_gather_v2,
+    fused_all_gather,
+    fused_all_gather_into,
+    all_gather_v,
 )
+from exa.utils.fused_reduce_scatter import fused_reduce_scatter
+from exa.utils.rooted_collectives import fused_reduce, fused_gather
+from exa.utils.all_to_all import all_to_all_v
+from exa.utils.moe import MoEDispatchState, moe_dispatch, moe_combine
+from exa.utils.collective_matmul import (
+    all_gather_matmul,
+    matmul_reduce_scatter,
+)
+from exa.utils.ring_attention import ring_attention
 from exa.utils.count_cores_for_workers import calculate_workers
+from exa.utils.async_work import CollectiveWork
+from exa.utils.topology import NodeTopology, get_node_topology
+from exa.utils.shm_collectives import (
+    ShmCommunicator,
+    shm_all_reduce,
+    shm_all_gather,
+)
+from exa.utils.tuning_table import TuningTable, get_tuning_table
+from exa.utils.buffer_pool import BufferPool, get_buffer_pool
+from exa.utils.compression import (
+    CompressionStats,
+    CastCompressor,
+    TopKCompressor,
+    PowerSGDCompressor,
+    compressed_all_reduce,
+)
+from exa.utils.tracing import (
+    StragglerReport,
+    enable_tracing,
+    disable_tracing,
+    finish_tracing,
+    straggler_report,
+    export_chrome_trace,
+)
+from exa.utils.autotune import autotune_collectives, ensure_tuned
 
 
 __all__ = [
@@ -30,7 +73,49 @@ __all__ = [
     "initialize_distributed",
     "fused_all_reduce_v1",
     "fused_all_reduce_v2",
+    "fused_all_reduce_coalesced",
+    "fused_all_reduce",
+    "tree_all_reduce",
+    "halving_doubling_all_reduce",
+    "select_all_reduce_algorithm",
+    "hierarchical_all_reduce",
+    "NodeTopology",
+    "get_node_topology",
+    "ShmCommunicator",
+    "shm_all_reduce",
+    "shm_all_gather",
     "fused_all_gather_v1",
     "fused_all_gather_v2",
+    "fused_all_gather",
+    "fused_all_gather_into",
+    "all_gather_v",
+    "fused_reduce_scatter",
+    "fused_reduce",
+    "fused_gather",
+    "all_to_all_v",
+    "MoEDispatchState",
+    "moe_dispatch",
+    "moe_combine",
+    "all_gather_matmul",
+    "matmul_reduce_scatter",
+    "ring_attention",
     "calculate_workers",
+    "CollectiveWork",
+    "TuningTable",
+    "get_tuning_table",
+    "BufferPool",
+    "get_buffer_pool",
+    "autotune_collectives",
+    "ensure_tuned",
+    "CompressionStats",
+    "CastCompressor",
+    "TopKCompressor",
+    "PowerSGDCompressor",
+    "compressed_all_reduce",
+    "StragglerReport",
+    "enable_tracing",
+    "disable_tracing",
+    "finish_tracing",
+    "straggler_report",
+    "export_chrome_trace",
 ]
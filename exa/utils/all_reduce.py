@@ -1,69 +1,688 @@
+import functools
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
 import torch
 from torch import Tensor
 import torch.distributed as dist
+
+from exa.utils.async_work import (
+    CollectiveWork,
+    dist_async,
+    run_async,
+    run_in_order,
+)
+from exa.utils.buffer_pool import get_buffer_pool
+from exa.utils.reduce_ops import reduce_inplace
+from exa.utils.ring import Ring
+from exa.utils.shm_collectives import shm_all_reduce, shm_available
+from exa.utils.topology import (
+    NodeTopology,
+    get_node_topology,
+    global_rank,
+    local_world_size_from_env,
+)
+from exa.utils.tracing import annotate, traced
+from exa.utils.tuning_table import get_tuning_table
+
 # from exa.utils.dist_process_init import initialize_distributed
 
 
 # initialize_distributed()
 
+# Default bucket size for coalesced all-reduce, same as DDP
+DEFAULT_BUCKET_SIZE_BYTES = 25 * 1024 * 1024
+
 
-def fused_all_reduce_v1(tensor: Tensor, op=dist.ReduceOp.SUM):
+@traced
+def fused_all_reduce_v1(
+    tensor: Tensor,
+    op=dist.ReduceOp.SUM,
+    group=None,
+    pipeline_depth: int = 4,
+    async_op: bool = False,
+):
     """
     Hyper-optimized fused all_reduce operation with reduced communication overhead.
-    This version uses a ring-reduce approach to minimize the amount of data sent across the network.
+    This version uses a bandwidth-optimal two-phase ring: the tensor is
+    split into world_size chunks, a reduce-scatter leaves every rank
+    with one fully reduced chunk and an all-gather circulates the
+    reduced chunks back. Each chunk is further split into sub-chunks
+    that are forwarded as soon as they are reduced, so sends overlap the
+    local reductions. Every rank moves 2 * (N - 1) / N of the payload.
 
     Args:
-    - tensor (torch.Tensor): The tensor to be reduced across all processes.
+    - tensor (torch.Tensor): The tensor to be reduced across all processes. Reduced in place.
     - op (dist.ReduceOp): The reduction operation to apply. Default is SUM.
+    - group (ProcessGroup, optional): The process group to work on. Default is the world group.
+    - pipeline_depth (int): Maximum number of sub-chunks per ring chunk. Default is 4.
+    - async_op (bool): Run the ring on the background communication thread and
+      return a CollectiveWork handle instead of blocking. Default is False.
+
+    Returns:
+        Tensor or CollectiveWork: The reduced tensor, or a handle completed with it.
     """
-    rank = dist.get_rank()
-    world_size = dist.get_world_size()
-    send_buff = tensor.clone()
-    recv_buff = torch.empty_like(tensor)
-    accum_buff = torch.empty_like(tensor)
-    accum_buff[:] = tensor
+    if async_op:
+        return run_async(
+            _ring_all_reduce, tensor, op, group, pipeline_depth
+        )
+    return run_in_order(
+        _ring_all_reduce, tensor, op, group, pipeline_depth
+    )
 
-    left = (rank - 1) % world_size
-    right = (rank + 1) % world_size
 
-    for i in range(1, world_size):
-        # Send send_buff to the right, receive recv_buff from the left
-        send_req = dist.isend(send_buff, right)
-        recv_req = dist.irecv(recv_buff, left)
-        send_req.wait()
-        recv_req.wait()
+def _ring_all_reduce(
+    tensor: Tensor, op, group, pipeline_depth: int
+) -> Tensor:
+    """Blocking body of fused_all_reduce_v1."""
+    world_size = dist.get_world_size(group)
+    if world_size == 1 or tensor.numel() == 0:
+        return tensor
 
-        # Perform the reduction operation
-        if op == dist.ReduceOp.SUM:
-            accum_buff += recv_buff
-        elif op == dist.ReduceOp.PRODUCT:
-            accum_buff *= recv_buff
-        elif op == dist.ReduceOp.MAX:
-            torch.max(accum_buff, recv_buff, out=accum_buff)
-        elif op == dist.ReduceOp.MIN:
-            torch.min(accum_buff, recv_buff, out=accum_buff)
+    pool = get_buffer_pool()
+    if tensor.is_contiguous():
+        work = tensor.view(-1)
+    else:
+        work = pool.acquire(
+            tensor.numel(), tensor.dtype, tensor.device
+        )
+        work.view_as(tensor).copy_(tensor)
 
-        # Prepare for the next iteration
-        send_buff[:] = recv_buff
+    chunks = list(torch.tensor_split(work, world_size))
+    ring = Ring(chunks, group=group, pipeline_depth=pipeline_depth)
+    ring.reduce_scatter(op)
+    ring.all_gather()
+    ring.wait()
 
-    # Copy the accumulated buffer back to the original tensor
-    tensor[:] = accum_buff
+    if not tensor.is_contiguous():
+        tensor.copy_(work.view_as(tensor))
+        pool.release(work)
+    return tensor
 
 
-def fused_all_reduce_v2(tensor: Tensor, op=dist.ReduceOp.SUM):
+@traced
+def fused_all_reduce_v2(
+    tensor: Tensor,
+    op=dist.ReduceOp.SUM,
+    group=None,
+    async_op: bool = False,
+):
     """
     Perform an all-reduce operation on the given tensor using the specified reduction operation.
 
     Args:
         tensor (Tensor): The input tensor to be reduced.
         op (dist.ReduceOp, optional): The reduction operation to be applied. Defaults to dist.ReduceOp.SUM.
+        group (ProcessGroup, optional): The process group to work on. Defaults to the world group.
+        async_op (bool, optional): Return a CollectiveWork handle completed with the tensor
+            instead of blocking. Defaults to False.
 
     Returns:
         Tensor: The tensor after the all-reduce operation has been applied.
     """
+    if async_op:
+        return dist_async(
+            dist.all_reduce, tensor, op, group=group, result=tensor
+        )
 
     # Use pytorch's built-in all_reduce
-    return dist.all_reduce(tensor, op)
+    return dist.all_reduce(tensor, op, group=group)
+
+
+def _exchange(send_buf: Tensor, recv_buf: Tensor, peer: int, group):
+    """
+    Send `send_buf` to and receive `recv_buf` from the same peer
+    without deadlocking. Empty buffers are skipped; both sides always
+    agree on the sizes, so the messages still match.
+    """
+    reqs = []
+    if send_buf.numel():
+        reqs.append(dist.isend(send_buf, peer, group=group))
+    if recv_buf.numel():
+        reqs.append(dist.irecv(recv_buf, peer, group=group))
+    for req in reqs:
+        req.wait()
+
+
+@traced
+def tree_all_reduce(
+    tensor: Tensor,
+    op=dist.ReduceOp.SUM,
+    group=None,
+    async_op: bool = False,
+):
+    """
+    All-reduce with a binomial tree: reduce to rank 0, then broadcast
+    back down the same tree. Takes 2 * ceil(log2(N)) steps with the full
+    payload each, which is latency-optimal for small messages such as
+    scalars, norms and counters. Works for any world size.
+
+    Args:
+        tensor (Tensor): The tensor to be reduced. Reduced in place.
+        op (dist.ReduceOp, optional): The reduction operation to apply. Defaults to dist.ReduceOp.SUM.
+        group (ProcessGroup, optional): The process group to work on. Defaults to the world group.
+        async_op (bool, optional): Return a CollectiveWork handle instead of blocking. Defaults to False.
+
+    Returns:
+        Tensor or CollectiveWork: The reduced tensor, or a handle completed with it.
+    """
+    if async_op:
+        return run_async(_tree_all_reduce, tensor, op, group)
+    return run_in_order(_tree_all_reduce, tensor, op, group)
+
+
+def _tree_all_reduce(tensor: Tensor, op, group) -> Tensor:
+    """Blocking body of tree_all_reduce."""
+    world_size = dist.get_world_size(group)
+    if world_size == 1 or tensor.numel() == 0:
+        return tensor
+
+    work = tensor if tensor.is_contiguous() else tensor.contiguous()
+    with get_buffer_pool().borrow(
+        work.numel(), work.dtype, work.device
+    ) as recv_buff:
+        _tree_steps(work, recv_buff.view_as(work), op, group)
+
+    if work is not tensor:
+        tensor.copy_(work)
+    return tensor
+
+
+def _tree_steps(work: Tensor, recv_buff: Tensor, op, group):
+    """Reduce up and broadcast down the binomial tree."""
+    rank = dist.get_rank(group)
+    world_size = dist.get_world_size(group)
+
+    def peer(offset):
+        return global_rank(group, rank + offset)
+
+    # Reduce towards rank 0
+    mask = 1
+    while mask < world_size:
+        if rank & mask:
+            dist.send(work, peer(-mask), group=group)
+            break
+        if rank + mask < world_size:
+            dist.recv(recv_buff, peer(mask), group=group)
+            reduce_inplace(work, recv_buff, op)
+        mask <<= 1
+
+    # Broadcast back down the same tree
+    mask = 1
+    while mask < world_size:
+        if rank & mask:
+            dist.recv(work, peer(-mask), group=group)
+            break
+        mask <<= 1
+    mask >>= 1
+    while mask > 0:
+        if rank + mask < world_size:
+            dist.send(work, peer(mask), group=group)
+        mask >>= 1
+
+
+@traced
+def halving_doubling_all_reduce(
+    tensor: Tensor,
+    op=dist.ReduceOp.SUM,
+    group=None,
+    async_op: bool = False,
+):
+    """
+    All-reduce with recursive halving (reduce-scatter) followed by
+    recursive doubling (all-gather). Moves the same 2 * (N - 1) / N of
+    the payload as the ring but in 2 * log2(N) steps instead of
+    2 * (N - 1), which suits medium-sized messages.
+
+    World sizes that are not a power of two are handled by first folding
+    the extra ranks into their even-ranked neighbours and sending them
+    the result at the end, which costs two extra full-payload steps.
+
+    Args:
+        tensor (Tensor): The tensor to be reduced. Reduced in place.
+        op (dist.ReduceOp, optional): The reduction operation to apply. Defaults to dist.ReduceOp.SUM.
+        group (ProcessGroup, optional): The process group to work on. Defaults to the world group.
+        async_op (bool, optional): Return a CollectiveWork handle instead of blocking. Defaults to False.
+
+    Returns:
+        Tensor or CollectiveWork: The reduced tensor, or a handle completed with it.
+    """
+    body = _halving_doubling_all_reduce
+    if async_op:
+        return run_async(body, tensor, op, group)
+    return run_in_order(body, tensor, op, group)
+
+
+def _halving_doubling_all_reduce(tensor: Tensor, op, group) -> Tensor:
+    """Blocking body of halving_doubling_all_reduce."""
+    world_size = dist.get_world_size(group)
+    if world_size == 1 or tensor.numel() == 0:
+        return tensor
+
+    work = tensor if tensor.is_contiguous() else tensor.contiguous()
+    with get_buffer_pool().borrow(
+        work.numel(), work.dtype, work.device
+    ) as recv_buff:
+        _halving_doubling_steps(work.view(-1), recv_buff, op, group)
+
+    if work is not tensor:
+        tensor.copy_(work)
+    return tensor
+
+
+def _halving_doubling_steps(
+    flat: Tensor, recv_buff: Tensor, op, group
+):
+    """Fold, halve, double and unfold over a flat buffer."""
+    rank = dist.get_rank(group)
+    world_size = dist.get_world_size(group)
+
+    # Largest power of two <= world_size and the number of extra ranks
+    pof2 = 1 << (world_size.bit_length() - 1)
+    extra = world_size - pof2
+
+    # Fold: among the first 2 * extra ranks, even ranks hand their data
+    # to the next odd rank and sit out the power-of-two phase
+    if rank < 2 * extra:
+        if rank % 2 == 0:
+            dist.send(flat, global_rank(group, rank + 1), group=group)
+            new_rank = -1
+        else:
+            dist.recv(
+                recv_buff, global_rank(group, rank - 1), group=group
+            )
+            reduce_inplace(flat, recv_buff, op)
+            new_rank = rank // 2
+    else:
+        new_rank = rank - extra
+
+    def real_rank(r):
+        return r * 2 + 1 if r < extra else r + extra
+
+    if new_rank >= 0:
+        # Recursive halving: keep half of the segment, reduce the
+        # partner's copy of it into ours
+        lo, hi = 0, flat.numel()
+        steps = []
+        mask = pof2 >> 1
+        while mask > 0:
+            peer = global_rank(group, real_rank(new_rank ^ mask))
+            mid = lo + (hi - lo) // 2
+            if new_rank & mask:
+                keep, give = (mid, hi), (lo, mid)
+            else:
+                keep, give = (lo, mid), (mid, hi)
+            buf = recv_buff[: keep[1] - keep[0]]
+            _exchange(flat[give[0] : give[1]], buf, peer, group)
+            reduce_inplace(flat[keep[0] : keep[1]], buf, op)
+            steps.append((peer, keep, give))
+            lo, hi = keep
+            mask >>= 1
+
+        # Recursive doubling: retrace the steps, swapping reduced halves
+        for peer, keep, give in reversed(steps):
+            _exchange(
+                flat[keep[0] : keep[1]],
+                flat[give[0] : give[1]],
+                peer,
+                group,
+            )
+
+    # Unfold: hand the result back to the ranks that sat out
+    if rank < 2 * extra:
+        if rank % 2 == 0:
+            dist.recv(flat, global_rank(group, rank + 1), group=group)
+        else:
+            dist.send(flat, global_rank(group, rank - 1), group=group)
+
+
+def _build_buckets(tensors: List[Tensor], bucket_size_bytes: int):
+    """
+    Group tensors by (dtype, device), keeping their order, and cut every
+    group into buckets of at most `bucket_size_bytes`. A tensor larger
+    than the bucket size gets a bucket of its own.
+    """
+    groups = OrderedDict()
+    for tensor in tensors:
+        groups.setdefault((tensor.dtype, tensor.device), []).append(
+            tensor
+        )
+
+    buckets = []
+    for group in groups.values():
+        bucket, size = [], 0
+        for tensor in group:
+            nbytes = tensor.numel() * tensor.element_size()
+            if bucket and size + nbytes > bucket_size_bytes:
+                buckets.append(bucket)
+                bucket, size = [], 0
+            bucket.append(tensor)
+            size += nbytes
+        if bucket:
+            buckets.append(bucket)
+    return buckets
+
+
+def _tuned_bucket_size(tensors: List[Tensor], group) -> int:
+    """Look up the autotuned bucket size for this payload."""
+    if not tensors:
+        return DEFAULT_BUCKET_SIZE_BYTES
+    nbytes = sum(t.numel() * t.element_size() for t in tensors)
+    return get_tuning_table().lookup(
+        "all_reduce_coalesced",
+        dist.get_backend(group),
+        dist.get_world_size(group),
+        tensors[0].dtype,
+        nbytes,
+        default=DEFAULT_BUCKET_SIZE_BYTES,
+    )
+
+
+def _pack_bucket(bucket: List[Tensor], buffer: Tensor) -> None:
+    """Copy the tensors of a bucket back to back into a flat buffer."""
+    offset = 0
+    for tensor in bucket:
+        view = buffer[offset : offset + tensor.numel()]
+        view.view_as(tensor).copy_(tensor)
+        offset += tensor.numel()
+
+
+def _unpack_bucket(bucket: List[Tensor], buffer: Tensor) -> None:
+    """Copy a reduced flat buffer back into the tensors of its bucket."""
+    offset = 0
+    for tensor in bucket:
+        tensor.copy_(
+            buffer[offset : offset + tensor.numel()].view_as(tensor)
+        )
+        offset += tensor.numel()
+
+
+def _finish_bucket(bucket: List[Tensor], buffer: Tensor, _=None):
+    """Unpack a reduced bucket and return its buffer to the pool."""
+    _unpack_bucket(bucket, buffer)
+    get_buffer_pool().release(buffer)
+
+
+@traced
+def fused_all_reduce_coalesced(
+    tensors: List[Tensor],
+    op=dist.ReduceOp.SUM,
+    group=None,
+    bucket_size_bytes: Optional[int] = None,
+    all_reduce_fn: Callable = fused_all_reduce_v2,
+    async_op: bool = False,
+):
+    """
+    All-reduce many tensors with one collective per bucket instead of
+    one per tensor. Tensors are grouped by dtype and device, packed into
+    pooled flat buffers of at most `bucket_size_bytes`, reduced, and
+    unpacked back into the original tensors in place.
+
+    Args:
+        tensors (List[Tensor]): The tensors to reduce. Reduced in place.
+        op (dist.ReduceOp, optional): The reduction operation to apply. Defaults to dist.ReduceOp.SUM.
+        group (ProcessGroup, optional): The process group to work on. Defaults to the world group.
+        bucket_size_bytes (int, optional): Maximum payload of one bucket. Defaults to the
+            autotuned size for this payload, or 25 MiB when nothing was tuned.
+        all_reduce_fn (Callable, optional): The all-reduce used per bucket, called as
+            `all_reduce_fn(buffer, op, group=group, async_op=async_op)`. Defaults to fused_all_reduce_v2.
+        async_op (bool, optional): Launch every bucket without blocking and return a
+            CollectiveWork handle that completes once all tensors are unpacked. Defaults to False.
+
+    Returns:
+        List[Tensor] or CollectiveWork: The reduced tensors, or a handle completed with them.
+    """
+    if bucket_size_bytes is None:
+        bucket_size_bytes = _tuned_bucket_size(tensors, group)
+    if bucket_size_bytes <= 0:
+        raise ValueError("bucket_size_bytes must be positive.")
+
+    pool = get_buffer_pool()
+    works = []
+    for bucket in _build_buckets(tensors, bucket_size_bytes):
+        if len(bucket) == 1 and bucket[0].is_contiguous():
+            # Nothing to coalesce, reduce the tensor directly
+            work = all_reduce_fn(
+                bucket[0], op, group=group, async_op=async_op
+            )
+            if async_op:
+                works.append(work)
+            continue
+
+        numel = sum(t.numel() for t in bucket)
+        buffer = pool.acquire(
+            numel, bucket[0].dtype, bucket[0].device
+        )
+        _pack_bucket(bucket, buffer)
+
+        if async_op:
+            # In-flight buckets each hold their own pooled buffer
+            work = all_reduce_fn(
+                buffer, op, group=group, async_op=True
+            )
+            works.append(
+                work.then(
+                    functools.partial(_finish_bucket, bucket, buffer)
+                )
+            )
+        else:
+            all_reduce_fn(buffer, op, group=group)
+            _finish_bucket(bucket, buffer)
+
+    if async_op:
+        futures = [work.get_future() for work in works]
+        return CollectiveWork(
+            torch.futures.collect_all(futures).then(
+                lambda fut: tensors
+            )
+        )
+    return tensors
+
+
+@traced
+def hierarchical_all_reduce(
+    tensor: Tensor,
+    op=dist.ReduceOp.SUM,
+    group=None,
+    async_op: bool = False,
+    topology: Optional[NodeTopology] = None,
+):
+    """
+    Two-level all-reduce for multi-node jobs: reduce inside each node to
+    its leader, all-reduce across one leader per node, then broadcast
+    inside each node. Only the leaders touch the slow inter-node link,
+    so it carries 1 / local_world_size of the flat ring's traffic.
+
+    The node subgroups are built once from $LOCAL_WORLD_SIZE, or from a
+    user-supplied topology (see exa.utils.topology.get_node_topology),
+    and cached.
+
+    Args:
+        tensor (Tensor): The tensor to be reduced. Reduced in place.
+        op (dist.ReduceOp, optional): The reduction operation to apply. Defaults to dist.ReduceOp.SUM.
+        group (ProcessGroup, optional): Must be None, the hierarchy is built over the world group.
+        async_op (bool, optional): Return a CollectiveWork handle instead of blocking. Defaults to False.
+        topology (NodeTopology, optional): Node layout to use. Defaults to get_node_topology().
+
+    Returns:
+        Tensor or CollectiveWork: The reduced tensor, or a handle completed with it.
+    """
+    if group is not None:
+        raise ValueError(
+            "hierarchical_all_reduce works on the world group only."
+        )
+    # Creating the subgroups is collective, do it on the caller's thread
+    topology = topology or get_node_topology()
+    body = _hierarchical_all_reduce
+    if async_op:
+        return run_async(body, tensor, op, topology)
+    return run_in_order(body, tensor, op, topology)
+
+
+def _hierarchical_all_reduce(
+    tensor: Tensor, op, topology: NodeTopology
+) -> Tensor:
+    """Blocking body of hierarchical_all_reduce."""
+    if topology.is_flat:
+        return fused_all_reduce(tensor, op)
+
+    work = tensor if tensor.is_contiguous() else tensor.contiguous()
+    dist.reduce(
+        work, topology.leader, op=op, group=topology.local_group
+    )
+    if topology.is_leader:
+        fused_all_reduce(work, op, group=topology.leader_group)
+    dist.broadcast(work, topology.leader, group=topology.local_group)
+
+    if work is not tensor:
+        tensor.copy_(work)
+    return tensor
+
+
+# Message-size thresholds used by fused_all_reduce's automatic selection
+DEFAULT_ALGORITHM_THRESHOLDS = {
+    # At or below this size the binomial tree wins on latency
+    "tree_max_bytes": 16 * 1024,
+    # At or below this size halving-doubling beats the ring
+    "halving_doubling_max_bytes": 1024 * 1024,
+    # Backends whose built-in all_reduce always beats the custom paths
+    "builtin_backends": ("nccl",),
+}
+
+ALL_REDUCE_ALGORITHMS = {
+    "builtin": fused_all_reduce_v2,
+    "ring": fused_all_reduce_v1,
+    "tree": tree_all_reduce,
+    "halving_doubling": halving_doubling_all_reduce,
+    "hierarchical": hierarchical_all_reduce,
+    "shm": shm_all_reduce,
+}
+
+
+def select_all_reduce_algorithm(
+    nbytes: int,
+    world_size: int,
+    backend: str,
+    thresholds=None,
+    num_nodes: int = 1,
+    single_host: bool = False,
+) -> str:
+    """
+    Pick the all-reduce algorithm for a message of `nbytes` bytes.
+
+    Args:
+        nbytes (int): Payload size in bytes.
+        world_size (int): Number of ranks taking part.
+        backend (str): The process group backend, e.g. "gloo" or "nccl".
+        thresholds (dict, optional): Overrides for DEFAULT_ALGORITHM_THRESHOLDS.
+        num_nodes (int, optional): Number of nodes the ranks span. Defaults to 1.
+        single_host (bool, optional): Whether all ranks share a host and the tensor
+            is on CPU, so shared memory can replace the network. Defaults to False.
+
+    Returns:
+        str: A key of ALL_REDUCE_ALGORITHMS.
+    """
+    limits = {**DEFAULT_ALGORITHM_THRESHOLDS, **(thresholds or {})}
+    if world_size == 1 or backend in limits["builtin_backends"]:
+        return "builtin"
+    if single_host:
+        return "shm"
+    if nbytes <= limits["tree_max_bytes"]:
+        return "tree"
+    if 1 < num_nodes < world_size:
+        return "hierarchical"
+    if world_size == 2:
+        # Halving-doubling and the ring are the same exchange here, the
+        # ring just pipelines it
+        return "ring"
+    if nbytes <= limits["halving_doubling_max_bytes"]:
+        return "halving_doubling"
+    return "ring"
+
+
+def _num_nodes(group, world_size: int) -> int:
+    """Number of nodes the world group spans, per $LOCAL_WORLD_SIZE."""
+    local_world_size = local_world_size_from_env()
+    if group is not None or not local_world_size:
+        return 1
+    return max(1, world_size // local_world_size)
+
+
+def _single_host(tensor: Tensor, group, backend: str) -> bool:
+    """Whether a CPU tensor can be reduced through shared memory."""
+    return (
+        tensor.device.type == "cpu"
+        and backend == "gloo"
+        and shm_available(group)
+    )
+
+
+@traced
+def fused_all_reduce(
+    tensor: Tensor,
+    op=dist.ReduceOp.SUM,
+    group=None,
+    algorithm: str = "auto",
+    thresholds=None,
+    async_op: bool = False,
+):
+    """
+    All-reduce entry point that dispatches to the best algorithm for the
+    message size and world size: a binomial tree for tiny messages,
+    recursive halving-doubling for medium ones, the pipelined ring for
+    large ones, a two-level hierarchical reduction when the world group
+    spans several nodes, shared memory for CPU tensors when every rank
+    is on the same host, and the built-in `dist.all_reduce` on backends
+    such as NCCL that already do their own selection. With algorithm="auto" a
+    winner recorded by the autotuner takes precedence over the
+    heuristics unless explicit thresholds are passed.
+
+    Args:
+        tensor (Tensor): The tensor to be reduced. Reduced in place.
+        op (dist.ReduceOp, optional): The reduction operation to apply. Defaults to dist.ReduceOp.SUM.
+        group (ProcessGroup, optional): The process group to work on. Defaults to the world group.
+        algorithm (str, optional): "auto" or a key of ALL_REDUCE_ALGORITHMS. Defaults to "auto".
+        thresholds (dict, optional): Overrides for DEFAULT_ALGORITHM_THRESHOLDS.
+        async_op (bool, optional): Return a CollectiveWork handle instead of blocking. Defaults to False.
+
+    Returns:
+        Tensor or CollectiveWork: The reduced tensor, or a handle completed with it.
+    """
+    if algorithm == "auto":
+        nbytes = tensor.numel() * tensor.element_size()
+        world_size = dist.get_world_size(group)
+        backend = dist.get_backend(group)
+        algorithm = None
+        if thresholds is None:
+            algorithm = get_tuning_table().lookup(
+                "all_reduce",
+                backend,
+                world_size,
+                tensor.dtype,
+                nbytes,
+            )
+        if algorithm not in ALL_REDUCE_ALGORITHMS:
+            algorithm = select_all_reduce_algorithm(
+                nbytes,
+                world_size,
+                backend,
+                thresholds,
+                num_nodes=_num_nodes(group, world_size),
+                single_host=_single_host(tensor, group, backend),
+            )
+    if algorithm not in ALL_REDUCE_ALGORITHMS:
+        raise ValueError(
+            f"Unknown all-reduce algorithm: {algorithm}. Expected"
+            f" one of {sorted(ALL_REDUCE_ALGORITHMS)} or 'auto'."
+        )
+
+    annotate(algorithm)
+    result = ALL_REDUCE_ALGORITHMS[algorithm](
+        tensor, op, group=group, async_op=async_op
+    )
+    if async_op:
+        return result
+    return tensor
 
 
 # x = torch.tensor([1, 2, 3, 4, 5], dtype=torch.float32)
@@ -0,0 +1,131 @@
+from typing import List, Optional, Sequence, Union
+
+import torch
+from torch import Tensor
+import torch.distributed as dist
+
+from exa.utils.async_work import dist_async
+from exa.utils.tracing import traced
+
+
+def exchange_splits(
+    send_splits: Sequence[int], group=None, device=None
+) -> List[int]:
+    """
+    Tell every rank how many rows it will get from us, and learn how
+    many we get from each of them, with one small all-to-all.
+
+    Args:
+        send_splits (Sequence[int]): Rows this rank sends to each rank.
+        group (ProcessGroup, optional): The process group. Default is the world group.
+        device (torch.device, optional): Device of the count tensors, CUDA with NCCL.
+
+    Returns:
+        List[int]: Rows this rank receives from each rank.
+    """
+    send = torch.tensor(
+        list(send_splits), dtype=torch.int64, device=device
+    )
+    recv = torch.empty_like(send)
+    dist.all_to_all_single(recv, send, group=group)
+    return [int(n) for n in recv.tolist()]
+
+
+def _pack(
+    tensors: Union[Tensor, List[Tensor]], send_splits, world_size: int
+):
+    """
+    Return the send rows as one contiguous tensor plus the per-rank
+    split sizes, packing a list of per-destination tensors if needed.
+    """
+    if isinstance(tensors, Tensor):
+        if send_splits is None:
+            raise ValueError(
+                "send_splits is required when passing a single"
+                " tensor."
+            )
+        return tensors.contiguous(), [int(n) for n in send_splits]
+
+    if len(tensors) != world_size:
+        raise ValueError("Expected one tensor per destination rank.")
+    splits = [t.shape[0] for t in tensors]
+    if send_splits is not None and list(send_splits) != splits:
+        raise ValueError("send_splits does not match the tensors.")
+    trailing = tuple(tensors[0].shape[1:])
+    packed = torch.empty(
+        sum(splits),
+        *trailing,
+        dtype=tensors[0].dtype,
+        device=tensors[0].device,
+    )
+    # Copy each destination's rows straight into its slice
+    for view, tensor in zip(packed.split(splits, dim=0), tensors):
+        view.copy_(tensor)
+    return packed, splits
+
+
+@traced
+def all_to_all_v(
+    tensor: Union[Tensor, List[Tensor]],
+    send_splits: Optional[Sequence[int]] = None,
+    output: Optional[Tensor] = None,
+    recv_splits: Optional[Sequence[int]] = None,
+    group=None,
+    async_op: bool = False,
+):
+    """
+    All-to-all with a different number of rows for every pair of ranks,
+    e.g. tokens routed to the ranks that own their experts. The split
+    sizes are exchanged first, unless the caller already knows them, and
+    the rows from every rank land directly in one packed output.
+
+    Args:
+    - tensor (torch.Tensor or List[torch.Tensor]): Rows to send, shaped (rows, *trailing) and
+      grouped by destination rank, or one tensor per destination rank which is packed into a
+      single contiguous buffer.
+    - send_splits (Sequence[int], optional): Rows sent to each rank. Required for a single tensor.
+    - output (torch.Tensor, optional): Contiguous buffer for sum(recv_splits) rows. Allocated when omitted.
+    - recv_splits (Sequence[int], optional): Rows received from each rank, skipping the split exchange.
+    - group (ProcessGroup, optional): The process group to work on. Default is the world group.
+    - async_op (bool): Return a CollectiveWork handle completed with the views
+      instead of blocking. Default is False.
+
+    Returns:
+        List[Tensor]: One zero-copy view of the output per source rank, shaped
+        (recv_splits[r], *trailing).
+    """
+    world_size = dist.get_world_size(group)
+    send, send_splits = _pack(tensor, send_splits, world_size)
+    if len(send_splits) != world_size:
+        raise ValueError("send_splits must have one entry per rank.")
+    if sum(send_splits) != send.shape[0]:
+        raise ValueError("send_splits must add up to the rows sent.")
+
+    if recv_splits is None:
+        recv_splits = exchange_splits(
+            send_splits, group=group, device=send.device
+        )
+    recv_splits = [int(n) for n in recv_splits]
+    if len(recv_splits) != world_size:
+        raise ValueError("recv_splits must have one entry per rank.")
+
+    trailing = tuple(send.shape[1:])
+    rows = sum(recv_splits)
+    if output is None:
+        output = torch.empty(
+            rows, *trailing, dtype=send.dtype, device=send.device
+        )
+    elif output.shape[0] != rows or not output.is_contiguous():
+        raise ValueError(
+            f"output must be a contiguous tensor of {rows} rows."
+        )
+    output = output.view(rows, *trailing)
+    views = list(output.split(recv_splits, dim=0))
+
+    args = (output, send, recv_splits, send_splits)
+    if async_op:
+        return dist_async(
+            dist.all_to_all_single, *args, group=group, result=views
+        )
+    dist.all_to_all_single(*args, group=group)
+    return views
@@ -0,0 +1,189 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+import torch
+
+from exa.utils.tracing import bind
+
+
+class CollectiveWork:
+    """
+    Handle for a collective launched with `async_op=True`.
+
+    Wraps a `torch.futures.Future` whose value is the result of the
+    collective (usually the output tensor), so built-in
+    `torch.distributed` work and the custom ring implementations look
+    the same to the caller.
+
+    Args:
+        future (torch.futures.Future): Future completed with the result.
+    """
+
+    def __init__(self, future: torch.futures.Future):
+        self.future = future
+
+    def wait(self) -> Any:
+        """Block until the collective finishes and return its result."""
+        return self.future.wait()
+
+    def is_completed(self) -> bool:
+        """Return True if the collective has finished."""
+        return self.future.done()
+
+    def get_future(self) -> torch.futures.Future:
+        """Return the underlying future."""
+        return self.future
+
+    def then(
+        self, callback: Callable[[Any], Any]
+    ) -> "CollectiveWork":
+        """
+        Chain a callback that runs with the result once the collective
+        finishes. Returns a new handle completed with the callback's
+        return value.
+
+        Args:
+            callback (Callable): Called as `callback(result)`.
+        """
+        return CollectiveWork(
+            self.future.then(lambda fut: callback(fut.value()))
+        )
+
+    @classmethod
+    def completed(cls, result: Any) -> "CollectiveWork":
+        """Return a handle that is already completed with `result`."""
+        future = torch.futures.Future()
+        future.set_result(result)
+        return cls(future)
+
+    @classmethod
+    def from_dist_work(cls, work, result: Any) -> "CollectiveWork":
+        """
+        Wrap the work object returned by a `torch.distributed` call made
+        with `async_op=True`, completing with `result` instead of the raw
+        list of tensors.
+
+        Args:
+            work (dist.Work): The work handle from torch.distributed.
+            result (Any): The value the handle completes with.
+        """
+        return cls(work.get_future().then(lambda fut: result))
+
+
+class _CommThread:
+    """
+    Single background thread that runs the custom collectives launched
+    asynchronously. Collectives run strictly in submission order, which
+    keeps the point-to-point messages of consecutive rings from
+    interleaving between peers.
+    """
+
+    def __init__(self):
+        self.executor = None
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.ident = None
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="exa-comm"
+            )
+        return self.executor
+
+    def submit(self, fn: Callable, *args, **kwargs) -> CollectiveWork:
+        future = torch.futures.Future()
+        # Keep the caller's trace event, if any, across the thread hop
+        fn = bind(fn)
+
+        def run():
+            self.ident = threading.get_ident()
+            error, result = None, None
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                error = e
+            # Mark idle before waking waiters so they can run inline
+            with self.lock:
+                self.pending -= 1
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        with self.lock:
+            self.pending += 1
+            self._executor().submit(run)
+        return CollectiveWork(future)
+
+    def idle(self) -> bool:
+        with self.lock:
+            return self.pending == 0
+
+    def on_thread(self) -> bool:
+        return self.ident == threading.get_ident()
+
+
+_comm_thread = _CommThread()
+
+
+def run_async(fn: Callable, *args, **kwargs) -> CollectiveWork:
+    """
+    Run a custom collective on the background communication thread.
+
+    Args:
+        fn (Callable): The blocking collective to run.
+        *args: Positional arguments for `fn`.
+        **kwargs: Keyword arguments for `fn`.
+
+    Returns:
+        CollectiveWork: Handle completed with the return value of `fn`.
+    """
+    return _comm_thread.submit(fn, *args, **kwargs)
+
+
+def run_in_order(fn: Callable, *args, **kwargs) -> Any:
+    """
+    Run a custom collective synchronously, after any asynchronous ones
+    that are still in flight. Runs inline when nothing is pending.
+
+    Args:
+        fn (Callable): The blocking collective to run.
+        *args: Positional arguments for `fn`.
+        **kwargs: Keyword arguments for `fn`.
+
+    Returns:
+        Any: The return value of `fn`.
+    """
+    if _comm_thread.idle() or _comm_thread.on_thread():
+        return fn(*args, **kwargs)
+    return run_async(fn, *args, **kwargs).wait()
+
+
+def wait_all(works) -> list:
+    """
+    Wait for several handles and return their results in order.
+
+    Args:
+        works (Iterable[CollectiveWork]): The handles to wait on.
+    """
+    return [work.wait() for work in works]
+
+
+def dist_async(collective: Callable, *args, result=None, **kwargs):
+    """
+    Launch a built-in `torch.distributed` collective with
+    `async_op=True` and wrap it in a CollectiveWork.
+
+    Args:
+        collective (Callable): A torch.distributed collective, e.g. dist.all_reduce.
+        *args: Positional arguments for the collective.
+        result (Any, optional): The value the handle completes with.
+        **kwargs: Keyword arguments for the collective.
+    """
+    work = collective(*args, async_op=True, **kwargs)
+    if work is None:
+        # Not a member of the group, nothing to wait for
+        return CollectiveWork.completed(result)
+    return CollectiveWork.from_dist_work(work, result)
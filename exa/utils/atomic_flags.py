@@ -0,0 +1,103 @@
+import ctypes
+import ctypes.util
+import platform
+
+import torch
+
+# Memory orders as libatomic numbers them (the C11 enum)
+_ACQUIRE = 2
+_RELEASE = 3
+
+# Total store order: plain stores are already published in order
+_TSO_MACHINES = ("x86_64", "amd64", "i386", "i686", "x86")
+
+
+def _load_libatomic():
+    """libatomic's 8-byte load and store, or None if unavailable."""
+    path = ctypes.util.find_library("atomic")
+    if path is None:
+        return None
+    try:
+        lib = ctypes.CDLL(path)
+        # getattr: leading double underscores would be name-mangled
+        load = getattr(lib, "__atomic_load_8")
+        store = getattr(lib, "__atomic_store_8")
+    except (OSError, AttributeError):
+        return None
+    load.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    load.restype = ctypes.c_int64
+    store.argtypes = [ctypes.c_void_p, ctypes.c_int64, ctypes.c_int]
+    store.restype = None
+    return load, store
+
+
+_atomic_load, _atomic_store = _load_libatomic() or (None, None)
+
+
+def atomic_flags_supported() -> bool:
+    """
+    Return True if AtomicFlags can order data between processes here:
+    libatomic is available, or the CPU is x86 with total store order.
+    """
+    return (
+        _atomic_load is not None
+        or platform.machine().lower() in _TSO_MACHINES
+    )
+
+
+class AtomicFlags:
+    """
+    int64 flags in a shared buffer that hand data over between
+    processes. The writer fills the data and then `store`s a flag with
+    release semantics; the reader `load`s the flag with acquire
+    semantics and only then reads the data. The data writes are thereby
+    visible before the flag on any architecture, which plain tensor
+    stores do not guarantee outside x86.
+
+    Uses libatomic's __atomic_load_8 and __atomic_store_8. Without it,
+    falls back to plain loads and stores, which is only correct under
+    x86's total store order; elsewhere construction raises RuntimeError.
+
+    Args:
+        buffer: A writable buffer, e.g. `SharedMemory.buf`.
+        count (int): Number of flags.
+        stride (int): int64 elements from one flag to the next. Default is 8,
+            one flag per cache line.
+    """
+
+    def __init__(self, buffer, count: int, stride: int = 8):
+        if not atomic_flags_supported():
+            raise RuntimeError(
+                "Shared-memory flags need libatomic on"
+                f" {platform.machine()}."
+            )
+        self.count = count
+        self.tensor = torch.frombuffer(
+            buffer, dtype=torch.int64, count=count * stride
+        )[::stride]
+        self._base = self.tensor.data_ptr()
+        self._step = stride * self.tensor.element_size()
+
+    def load(self, index: int) -> int:
+        """Read a flag with acquire semantics."""
+        if _atomic_load is None:
+            return int(self.tensor[index])
+        return _atomic_load(self._base + index * self._step, _ACQUIRE)
+
+    def store(self, index: int, value: int):
+        """Write a flag with release semantics."""
+        if _atomic_store is None:
+            self.tensor[index] = value
+            return
+        _atomic_store(
+            self._base + index * self._step, value, _RELEASE
+        )
+
+    def fill(self, value: int):
+        """Write every flag."""
+        for index in range(self.count):
+            self.store(index, value)
+
+    def min(self) -> int:
+        """The smallest flag, each read with acquire semantics."""
+        return min(self.load(index) for index in range(self.count))
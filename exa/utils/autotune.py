@@ -0,0 +1,212 @@
+import time
+from typing import Callable, Optional, Sequence
+
+import torch
+import torch.distributed as dist
+from loguru import logger
+
+from exa.utils.all_reduce import (
+    ALL_REDUCE_ALGORITHMS,
+    fused_all_reduce_coalesced,
+)
+from exa.utils.fused_all_gather import ALL_GATHER_ALGORITHMS
+from exa.utils.tuning_table import (
+    TuningTable,
+    get_tuning_table,
+    set_tuning_table,
+)
+
+# Message sizes swept by default, 4 B to 16 MiB
+DEFAULT_TUNING_SIZES = [2**i for i in range(2, 25, 2)]
+
+# Bucket sizes tried for fused_all_reduce_coalesced
+DEFAULT_BUCKET_SIZES = [
+    256 * 1024,
+    1024 * 1024,
+    4 * 1024 * 1024,
+    25 * 1024 * 1024,
+]
+
+# Size of each tensor in the coalesced workload
+_COALESCED_TENSOR_BYTES = 4 * 1024
+
+
+def _time_collective(
+    fn: Callable, device, warmup: int, iters: int
+) -> float:
+    """
+    Time `fn` and return the slowest rank's mean seconds per call, so
+    every rank sees the same numbers and picks the same winner.
+    """
+    for _ in range(warmup):
+        fn()
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+    dist.barrier()
+
+    start = time.perf_counter()
+    for _ in range(iters):
+        fn()
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+    elapsed = torch.tensor(
+        [(time.perf_counter() - start) / iters],
+        dtype=torch.float64,
+        device=device,
+    )
+    dist.all_reduce(elapsed, op=dist.ReduceOp.MAX)
+    return elapsed.item()
+
+
+def _pick(timings: dict) -> str:
+    return min(timings, key=timings.get)
+
+
+def autotune_collectives(
+    sizes: Sequence[int] = DEFAULT_TUNING_SIZES,
+    dtypes: Sequence[torch.dtype] = (torch.float32,),
+    bucket_sizes: Sequence[int] = DEFAULT_BUCKET_SIZES,
+    warmup: int = 3,
+    iters: int = 20,
+    device: Optional[torch.device] = None,
+    table: Optional[TuningTable] = None,
+    save: bool = True,
+) -> TuningTable:
+    """
+    Benchmark every all-reduce and all-gather implementation, and the
+    coalesced all-reduce bucket sizes, over a sweep of message sizes.
+    The winners are recorded in the tuning table that `fused_all_reduce`,
+    `fused_all_gather` and `fused_all_reduce_coalesced` consult, and
+    rank 0 saves it to disk. Must be called on every rank.
+
+    Args:
+        sizes (Sequence[int]): Message sizes in bytes to sweep.
+        dtypes (Sequence[torch.dtype]): Dtypes to tune for.
+        bucket_sizes (Sequence[int]): Candidate coalescing bucket sizes in bytes.
+        warmup (int): Untimed calls per candidate.
+        iters (int): Timed calls per candidate.
+        device (torch.device, optional): Where to allocate the test tensors.
+            Defaults to the current CUDA device with NCCL, else CPU.
+        table (TuningTable, optional): Table to fill. Defaults to the process-wide table.
+        save (bool): Write the table to disk on rank 0. Default is True.
+
+    Returns:
+        TuningTable: The updated table, also installed process-wide.
+    """
+    backend = dist.get_backend()
+    world_size = dist.get_world_size()
+    rank = dist.get_rank()
+    if device is None:
+        device = torch.device(
+            f"cuda:{torch.cuda.current_device()}"
+            if backend == "nccl"
+            else "cpu"
+        )
+    table = table or get_tuning_table()
+
+    for dtype in dtypes:
+        element_size = torch.empty((), dtype=dtype).element_size()
+        for nbytes in sizes:
+            numel = max(1, nbytes // element_size)
+            # Zeros keep repeated SUMs from overflowing
+            tensor = torch.zeros(numel, dtype=dtype, device=device)
+
+            timings = {
+                name: _time_collective(
+                    lambda fn=fn: fn(tensor), device, warmup, iters
+                )
+                for name, fn in ALL_REDUCE_ALGORITHMS.items()
+            }
+            table.record(
+                "all_reduce",
+                backend,
+                world_size,
+                dtype,
+                nbytes,
+                _pick(timings),
+            )
+
+            tensor_list = [
+                torch.empty_like(tensor) for _ in range(world_size)
+            ]
+            timings = {
+                name: _time_collective(
+                    lambda fn=fn: fn(list(tensor_list), tensor),
+                    device,
+                    warmup,
+                    iters,
+                )
+                for name, fn in ALL_GATHER_ALGORITHMS.items()
+            }
+            table.record(
+                "all_gather",
+                backend,
+                world_size,
+                dtype,
+                nbytes,
+                _pick(timings),
+            )
+
+            # Coalesced workload: many small tensors adding up to nbytes
+            pieces = max(1, nbytes // _COALESCED_TENSOR_BYTES)
+            piece_numel = max(1, numel // pieces)
+            tensors = [
+                torch.zeros(piece_numel, dtype=dtype, device=device)
+                for _ in range(pieces)
+            ]
+            timings = {
+                size: _time_collective(
+                    lambda size=size: fused_all_reduce_coalesced(
+                        tensors, bucket_size_bytes=size
+                    ),
+                    device,
+                    warmup,
+                    iters,
+                )
+                for size in bucket_sizes
+            }
+            table.record(
+                "all_reduce_coalesced",
+                backend,
+                world_size,
+                dtype,
+                nbytes,
+                _pick(timings),
+            )
+
+            if rank == 0:
+                logger.debug(
+                    f"Tuned {backend} x{world_size} {dtype}"
+                    f" {nbytes} B"
+                )
+
+    if save and rank == 0:
+        table.save()
+    set_tuning_table(table)
+    return table
+
+
+def ensure_tuned(**kwargs) -> TuningTable:
+    """
+    Load rank 0's persisted tuning table on every rank and only run the
+    autotuner if it has no entries for the current backend and world
+    size, so repeated job starts reuse earlier results. Other ranks'
+    files are ignored, so every rank picks the same algorithms even
+    when the hosts do not share a home directory. Must be called on
+    every rank.
+
+    Args:
+        **kwargs: Passed on to autotune_collectives when tuning is needed.
+
+    Returns:
+        TuningTable: The loaded or freshly tuned table.
+    """
+    table = TuningTable()
+    entries = [table.load().entries if dist.get_rank() == 0 else None]
+    dist.broadcast_object_list(entries, src=0)
+    table.entries = entries[0]
+    if table.has(dist.get_backend(), dist.get_world_size()):
+        logger.info(f"Reusing collective tuning table {table.path}")
+        set_tuning_table(table)
+        return table
+    return autotune_collectives(table=table, **kwargs)
@@ -0,0 +1,163 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional
+
+import torch
+from torch import Tensor
+
+# Cap on idle pooled bytes unless EXA_BUFFER_POOL_BYTES is set
+DEFAULT_POOL_MAX_BYTES = 1024 * 1024 * 1024
+
+# Smallest size class in elements, so tiny messages share one class
+_MIN_CLASS_NUMEL = 256
+
+
+def size_class(numel: int) -> int:
+    """Round `numel` up to its power-of-two size class."""
+    exponent = max(0, int(numel) - 1).bit_length()
+    return max(_MIN_CLASS_NUMEL, 1 << exponent)
+
+
+class BufferPool:
+    """
+    Pool of flat scratch buffers shared by the fused collectives, so
+    steady-state calls reuse memory instead of going through the
+    allocator every time.
+
+    Buffers are kept per (dtype, device, size class), where the size
+    class is `numel` rounded up to a power of two. `acquire` hands out a
+    view of exactly the requested size and `release` puts the buffer
+    back. Idle buffers are capped at `max_bytes`, evicting the least
+    recently used size class first. Safe to use from the communication
+    thread and the caller's thread at once.
+
+    Args:
+        max_bytes (int, optional): Cap on the bytes of idle buffers kept. Defaults to
+            $EXA_BUFFER_POOL_BYTES or 1 GiB.
+
+    Attributes:
+        hits (int): Acquires served from an idle buffer.
+        misses (int): Acquires that had to allocate.
+        evictions (int): Idle buffers dropped to stay under the cap.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        if max_bytes is None:
+            max_bytes = int(
+                os.getenv(
+                    "EXA_BUFFER_POOL_BYTES", DEFAULT_POOL_MAX_BYTES
+                )
+            )
+        if max_bytes < 0:
+            raise ValueError("max_bytes must not be negative.")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.idle_bytes = 0
+        # Idle buffers per size class, least recently used class first
+        self._idle = OrderedDict()
+        # Buffers handed out, by data pointer
+        self._in_use = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _nbytes(buffer: Tensor) -> int:
+        return buffer.numel() * buffer.element_size()
+
+    def acquire(
+        self, numel: int, dtype: torch.dtype, device
+    ) -> Tensor:
+        """
+        Return a flat buffer of `numel` elements with undefined contents.
+        Must be handed back with `release` once the caller is done.
+        """
+        device = torch.device(device)
+        key = (dtype, device, size_class(numel))
+        with self._lock:
+            buffers = self._idle.get(key)
+            if buffers:
+                buffer = buffers.pop()
+                if not buffers:
+                    del self._idle[key]
+                self.idle_bytes -= self._nbytes(buffer)
+                self.hits += 1
+            else:
+                buffer = None
+                self.misses += 1
+        if buffer is None:
+            buffer = torch.empty(key[2], dtype=dtype, device=device)
+        with self._lock:
+            self._in_use[buffer.data_ptr()] = (key, buffer)
+        return buffer[:numel]
+
+    def release(self, tensor: Tensor):
+        """Return a buffer obtained from `acquire` to the pool."""
+        with self._lock:
+            entry = self._in_use.pop(tensor.data_ptr(), None)
+            if entry is None:
+                raise ValueError(
+                    "Tensor was not acquired from this pool."
+                )
+            key, buffer = entry
+            if self._nbytes(buffer) > self.max_bytes:
+                self.evictions += 1
+                return
+            self._idle.setdefault(key, []).append(buffer)
+            self._idle.move_to_end(key)
+            self.idle_bytes += self._nbytes(buffer)
+            self._evict()
+
+    def _evict(self):
+        while self.idle_bytes > self.max_bytes and self._idle:
+            key, buffers = next(iter(self._idle.items()))
+            buffer = buffers.pop(0)
+            if not buffers:
+                del self._idle[key]
+            self.idle_bytes -= self._nbytes(buffer)
+            self.evictions += 1
+
+    @contextmanager
+    def borrow(self, numel: int, dtype: torch.dtype, device):
+        """Acquire a buffer for the duration of a `with` block."""
+        buffer = self.acquire(numel, dtype, device)
+        try:
+            yield buffer
+        finally:
+            self.release(buffer)
+
+    def clear(self):
+        """Drop every idle buffer. Buffers in use are unaffected."""
+        with self._lock:
+            self._idle.clear()
+            self.idle_bytes = 0
+
+    def stats(self) -> dict:
+        """Return the hit/miss/eviction counters and memory held."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "idle_bytes": self.idle_bytes,
+                "in_use": len(self._in_use),
+            }
+
+
+_buffer_pool = None
+
+
+def get_buffer_pool() -> BufferPool:
+    """Return the process-wide buffer pool, creating it on first use."""
+    global _buffer_pool
+    if _buffer_pool is None:
+        _buffer_pool = BufferPool()
+    return _buffer_pool
+
+
+def set_buffer_pool(pool: Optional[BufferPool]):
+    """Replace the process-wide buffer pool, or reset it with None."""
+    global _buffer_pool
+    _buffer_pool = pool
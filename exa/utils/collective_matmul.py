@@ -0,0 +1,163 @@
+from typing import List, Optional, Sequence, Tuple
+
+import torch
+from torch import Tensor
+import torch.distributed as dist
+
+from exa.utils.async_work import run_in_order
+from exa.utils.fused_all_gather import fused_all_gather_into
+from exa.utils.ring import Ring
+from exa.utils.tracing import traced
+
+
+@traced
+def all_gather_matmul(
+    x: Tensor,
+    weight: Tensor,
+    bias: Optional[Tensor] = None,
+    group=None,
+    pipeline_depth: int = 4,
+    sizes: Optional[Sequence[int]] = None,
+) -> Tuple[Tensor, Tensor]:
+    """
+    Compute `F.linear(all_gather(x), weight, bias)` with the gather
+    split into ring steps: the rows of each rank are multiplied as soon
+    as they arrive, while the next rank's rows are still in flight, so
+    the layer takes about max(comm, compute) instead of their sum.
+
+    Args:
+        x (Tensor): This rank's rows, shaped (rows, *mid, in_features). The row
+            counts may differ between ranks, e.g. as split by matmul_reduce_scatter;
+            the other dimensions must match.
+        weight (Tensor): Weight shaped (out_features, in_features), e.g. a column shard.
+        bias (Tensor, optional): Bias shaped (out_features,).
+        group (ProcessGroup, optional): The process group to work on. Defaults to the world group.
+        pipeline_depth (int, optional): Maximum number of sub-chunks per ring step. Defaults to 4.
+        sizes (Sequence[int], optional): Row count of every rank, skipping the small
+            all-gather that exchanges them.
+
+    Returns:
+        Tuple[Tensor, Tensor]: The output for the rows of all ranks in rank order,
+        shaped (sum(sizes), *mid, out_features), and the gathered input.
+    """
+    world_size = dist.get_world_size(group)
+    if sizes is None:
+        rows = torch.tensor(
+            [x.shape[0]], dtype=torch.int64, device=x.device
+        )
+        gathered = fused_all_gather_into(rows, group=group)
+        sizes = [int(r) for r in torch.cat(gathered).tolist()]
+    sizes = list(sizes)
+    if len(sizes) != world_size:
+        raise ValueError("sizes must have one entry per rank.")
+    rank = dist.get_rank(group)
+    if x.shape[0] != sizes[rank]:
+        raise ValueError(
+            f"Rank {rank} has {x.shape[0]} rows but sizes gives it"
+            f" {sizes[rank]}."
+        )
+    return run_in_order(
+        _all_gather_matmul,
+        x,
+        weight,
+        bias,
+        group,
+        pipeline_depth,
+        sizes,
+    )
+
+
+def _all_gather_matmul(
+    x, weight, bias, group, pipeline_depth, sizes: List[int]
+):
+    """Blocking body of all_gather_matmul."""
+    rank = dist.get_rank(group)
+    total = sum(sizes)
+
+    gathered = torch.empty(
+        total, *x.shape[1:], dtype=x.dtype, device=x.device
+    )
+    output = torch.empty(
+        total,
+        *x.shape[1:-1],
+        weight.shape[0],
+        dtype=x.dtype,
+        device=x.device,
+    )
+    # Every rank cuts the same blocks, so the ring messages match
+    blocks = list(gathered.split(sizes, dim=0))
+    outputs = list(output.split(sizes, dim=0))
+    blocks[rank].copy_(x)
+
+    def on_chunk(idx):
+        torch.matmul(blocks[idx], weight.t(), out=outputs[idx])
+        if bias is not None:
+            outputs[idx].add_(bias)
+
+    ring = Ring(
+        [b.view(-1) for b in blocks],
+        group=group,
+        pipeline_depth=pipeline_depth,
+    )
+    ring.all_gather(on_chunk)
+    ring.wait()
+    return output, gathered
+
+
+@traced
+def matmul_reduce_scatter(
+    x: Tensor,
+    weight: Tensor,
+    bias: Optional[Tensor] = None,
+    group=None,
+    pipeline_depth: int = 4,
+) -> Tensor:
+    """
+    Compute `reduce_scatter(F.linear(x, weight))` along the rows, with
+    the matmul for each ring step's rows done while the partial sums of
+    the previous step are in flight. Typical for a row-parallel layer:
+    every rank holds a slice of the input features and ends up with the
+    full sum for its share of the rows.
+
+    Args:
+        x (Tensor): All rows, shaped (rows, *mid, in_features), the same rows on every
+            rank. Rows are split across ranks as by torch.tensor_split.
+        weight (Tensor): Weight shaped (out_features, in_features), e.g. a row shard.
+        bias (Tensor, optional): Bias shaped (out_features,), added once after the sum.
+        group (ProcessGroup, optional): The process group to work on. Defaults to the world group.
+        pipeline_depth (int, optional): Maximum number of sub-chunks per ring step. Defaults to 4.
+
+    Returns:
+        Tensor: This rank's rows of the summed output, shaped (rows_r, *mid, out_features).
+    """
+    return run_in_order(
+        _matmul_reduce_scatter, x, weight, bias, group, pipeline_depth
+    )
+
+
+def _matmul_reduce_scatter(x, weight, bias, group, pipeline_depth):
+    """Blocking body of matmul_reduce_scatter."""
+    world_size = dist.get_world_size(group)
+    rank = dist.get_rank(group)
+
+    output = torch.empty(
+        *x.shape[:-1], weight.shape[0], dtype=x.dtype, device=x.device
+    )
+    inputs = torch.tensor_split(x, world_size, dim=0)
+    outputs = torch.tensor_split(output, world_size, dim=0)
+
+    def prepare(idx):
+        torch.matmul(inputs[idx], weight.t(), out=outputs[idx])
+
+    ring = Ring(
+        [o.view(-1) for o in outputs],
+        group=group,
+        pipeline_depth=pipeline_depth,
+    )
+    ring.reduce_scatter(prepare=prepare)
+    ring.wait()
+
+    result = outputs[rank]
+    if bias is not None:
+        result.add_(bias)
+    return result
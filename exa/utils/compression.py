@@ -0,0 +1,290 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+import torch
+from torch import Tensor
+import torch.distributed as dist
+
+from exa.utils.all_reduce import fused_all_reduce
+from exa.utils.tracing import traced
+
+
+class CompressionStats:
+    """
+    Payload sizes of one compressed all-reduce, as seen by this rank.
+
+    Args:
+        original_bytes (int): Bytes the uncompressed all-reduce would send.
+        compressed_bytes (int): Bytes actually put on the wire.
+
+    Attributes:
+        ratio (float): original_bytes / compressed_bytes.
+        bytes_saved (int): original_bytes - compressed_bytes.
+    """
+
+    def __init__(self, original_bytes: int, compressed_bytes: int):
+        self.original_bytes = original_bytes
+        self.compressed_bytes = compressed_bytes
+
+    @property
+    def ratio(self) -> float:
+        if self.compressed_bytes == 0:
+            return float("inf")
+        return self.original_bytes / self.compressed_bytes
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.compressed_bytes
+
+    def __repr__(self):
+        return (
+            f"CompressionStats(ratio={self.ratio:.2f},"
+            f" bytes_saved={self.bytes_saved})"
+        )
+
+
+class Compressor(ABC):
+    """
+    Base class for all-reduce compressors. Subclasses implement
+    `all_reduce`, reducing the tensor in place and returning the bytes
+    they put on the wire. Totals across calls are kept in
+    `original_bytes` and `compressed_bytes`.
+    """
+
+    def __init__(self):
+        self.original_bytes = 0
+        self.compressed_bytes = 0
+
+    @abstractmethod
+    def all_reduce(self, tensor: Tensor, group=None, key=None) -> int:
+        """
+        All-reduce `tensor` in place.
+
+        Args:
+            tensor (Tensor): The tensor to reduce.
+            group (ProcessGroup, optional): The process group. Default is the world group.
+            key (optional): Identifies the tensor across calls, for compressors that keep
+                per-tensor state such as error feedback.
+
+        Returns:
+            int: Bytes this rank put on the wire.
+        """
+
+    def __call__(
+        self, tensor: Tensor, group=None, key=None
+    ) -> CompressionStats:
+        original = tensor.numel() * tensor.element_size()
+        compressed = self.all_reduce(tensor, group=group, key=key)
+        self.original_bytes += original
+        self.compressed_bytes += compressed
+        return CompressionStats(original, compressed)
+
+    @property
+    def stats(self) -> CompressionStats:
+        """Stats accumulated over every call so far."""
+        return CompressionStats(
+            self.original_bytes, self.compressed_bytes
+        )
+
+
+class CastCompressor(Compressor):
+    """
+    Cast to a narrower floating point type on the wire, e.g. fp32 to
+    fp16 or bf16, halving the payload. bf16 keeps fp32's range, so sums
+    over many ranks do not overflow.
+
+    Args:
+        dtype (torch.dtype): The on-the-wire dtype. Default is torch.bfloat16.
+    """
+
+    def __init__(self, dtype: torch.dtype = torch.bfloat16):
+        super().__init__()
+        self.dtype = dtype
+
+    def all_reduce(self, tensor: Tensor, group=None, key=None) -> int:
+        wire = tensor.to(self.dtype)
+        fused_all_reduce(wire, group=group)
+        tensor.copy_(wire)
+        return wire.numel() * wire.element_size()
+
+
+class _ErrorFeedback:
+    """Per-tensor residuals of what earlier calls left unsent."""
+
+    def __init__(self):
+        self.residuals = {}
+
+    def corrected(self, tensor: Tensor, key) -> Tensor:
+        residual = self.residuals.get(key)
+        if residual is None or residual.shape != tensor.shape:
+            return tensor.clone()
+        return tensor + residual
+
+    def store(self, key, residual: Tensor):
+        self.residuals[key] = residual
+
+
+def _state_key(tensor: Tensor, key):
+    # Without an explicit key, tensors are told apart by their storage
+    return key if key is not None else tensor.data_ptr()
+
+
+class TopKCompressor(Compressor):
+    """
+    Sparsify to the largest `ratio` fraction of entries (top-k), or a
+    random subset of them (random-k), with error feedback: what is not
+    sent is added back into the same tensor on the next call, so no
+    update is lost, only delayed.
+
+    Top-k indices differ per rank, so indices and values are
+    all-gathered and summed densely. Random-k draws the same indices on
+    every rank from a shared seed, so only the values are all-reduced.
+    Only SUM is supported.
+
+    Args:
+        ratio (float): Fraction of entries to send. Default is 0.01.
+        random (bool): Use random-k instead of top-k. Default is False.
+        seed (int): Seed for random-k, identical on every rank. Default is 0.
+    """
+
+    def __init__(
+        self, ratio: float = 0.01, random: bool = False, seed: int = 0
+    ):
+        super().__init__()
+        if not 0 < ratio <= 1:
+            raise ValueError("ratio must be in (0, 1].")
+        self.ratio = ratio
+        self.random = random
+        self.generator = torch.Generator().manual_seed(seed)
+        self.feedback = _ErrorFeedback()
+
+    def all_reduce(self, tensor: Tensor, group=None, key=None) -> int:
+        key = _state_key(tensor, key)
+        flat = self.feedback.corrected(tensor, key).reshape(-1)
+        k = max(1, int(flat.numel() * self.ratio))
+
+        if self.random:
+            indices = torch.randperm(
+                flat.numel(), generator=self.generator
+            )[:k].to(flat.device)
+        else:
+            indices = flat.abs().topk(k, sorted=False).indices
+        values = flat[indices]
+
+        residual = flat.clone()
+        residual[indices] = 0
+        self.feedback.store(key, residual.view_as(tensor))
+
+        if self.random:
+            # Same indices everywhere, reduce the values alone
+            fused_all_reduce(values, group=group)
+            out = torch.zeros_like(flat)
+            out[indices] = values
+            tensor.copy_(out.view_as(tensor))
+            return values.numel() * values.element_size()
+
+        world_size = dist.get_world_size(group)
+        all_indices = torch.empty(
+            world_size * k, dtype=indices.dtype, device=indices.device
+        )
+        all_values = torch.empty(
+            world_size * k, dtype=values.dtype, device=values.device
+        )
+        # Gather straight into views of one flat buffer per field
+        dist.all_gather(
+            list(all_indices.chunk(world_size)), indices, group=group
+        )
+        dist.all_gather(
+            list(all_values.chunk(world_size)), values, group=group
+        )
+
+        out = torch.zeros_like(flat)
+        out.index_add_(0, all_indices, all_values)
+        tensor.copy_(out.view_as(tensor))
+        return (
+            indices.numel() * indices.element_size()
+            + values.numel() * values.element_size()
+        )
+
+
+class PowerSGDCompressor(Compressor):
+    """
+    PowerSGD-style low-rank compression. A tensor reshaped to an n x m
+    matrix M is approximated as P Q^T with P (n x r) and Q (m x r), so
+    only (n + m) * r values are all-reduced instead of n * m. One power
+    iteration per call, warm-started from the previous Q, with error
+    feedback of the approximation error. Tensors with fewer than two
+    dimensions, or too small to gain anything, are all-reduced as is.
+    Only SUM is supported.
+
+    Args:
+        rank (int): Rank r of the approximation. Default is 4.
+        seed (int): Seed for the initial Q, identical on every rank. Default is 0.
+    """
+
+    def __init__(self, rank: int = 4, seed: int = 0):
+        super().__init__()
+        self.rank = rank
+        self.seed = seed
+        self.feedback = _ErrorFeedback()
+        self.queries = {}
+
+    def _query(self, key, m: int, rank: int, like: Tensor) -> Tensor:
+        query = self.queries.get(key)
+        if query is None or query.shape != (m, rank):
+            generator = torch.Generator().manual_seed(self.seed)
+            query = torch.randn(m, rank, generator=generator).to(like)
+        return query
+
+    def all_reduce(self, tensor: Tensor, group=None, key=None) -> int:
+        nbytes = tensor.numel() * tensor.element_size()
+        if tensor.dim() < 2:
+            fused_all_reduce(tensor, group=group)
+            return nbytes
+        n = tensor.shape[0]
+        m = tensor.numel() // n
+        rank = min(self.rank, n, m)
+        if (n + m) * rank >= n * m:
+            fused_all_reduce(tensor, group=group)
+            return nbytes
+
+        key = _state_key(tensor, key)
+        matrix = self.feedback.corrected(tensor, key).reshape(n, m)
+        query = self._query(key, m, rank, matrix)
+
+        p = matrix @ query
+        fused_all_reduce(p, group=group)
+        p = torch.linalg.qr(p).Q
+
+        q = matrix.t() @ p
+        # The local share of the approximation is what this rank sent
+        self.feedback.store(key, (matrix - p @ q.t()).view_as(tensor))
+        fused_all_reduce(q, group=group)
+        self.queries[key] = q
+
+        tensor.copy_((p @ q.t()).view_as(tensor))
+        return (p.numel() + q.numel()) * p.element_size()
+
+
+@traced
+def compressed_all_reduce(
+    tensor: Tensor,
+    compressor: Compressor,
+    group=None,
+    key: Optional[object] = None,
+) -> CompressionStats:
+    """
+    Sum `tensor` across ranks in place through a compressor.
+
+    Args:
+        tensor (Tensor): The tensor to be reduced. Reduced in place.
+        compressor (Compressor): A CastCompressor, TopKCompressor or PowerSGDCompressor.
+            Stateful compressors keep their error-feedback residuals per tensor.
+        group (ProcessGroup, optional): The process group to work on. Defaults to the world group.
+        key (Hashable, optional): Identifies the tensor across calls for error feedback.
+            Defaults to the tensor's storage address.
+
+    Returns:
+        CompressionStats: The achieved compression ratio and bytes saved.
+    """
+    return compressor(tensor, group=group, key=key)
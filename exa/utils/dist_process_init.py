@@ -51,3 +51,15 @@ def initialize_distributed():
     logger.debug(f"MASTER_PORT: {os.environ['MASTER_PORT']}")
     logger.debug(f"WORLD_SIZE: {os.environ['WORLD_SIZE']}")
     logger.debug(f"RANK: {os.environ['RANK']}")
+
+    # Optionally tune the collectives, reusing a persisted table if any
+    if os.getenv("EXA_AUTOTUNE", "0") == "1":
+        from exa.utils.autotune import ensure_tuned
+
+        ensure_tuned()
+
+    # Optionally trace every collective, see exa.utils.tracing
+    if os.getenv("EXA_TRACE_COLLECTIVES", "0") == "1":
+        from exa.utils.tracing import enable_tracing
+
+        enable_tracing()
@@ -1,19 +1,174 @@
 import torch
 import torch.distributed as dist
-from typing import List
+from typing import List, Optional
 from torch import Tensor
 
+from exa.utils.async_work import CollectiveWork, dist_async
+from exa.utils.shm_collectives import shm_all_gather, shm_available
+from exa.utils.topology import global_rank
+from exa.utils.tracing import annotate, traced
+from exa.utils.tuning_table import get_tuning_table
+
+
+def _gather_output(
+    output: Optional[Tensor], tensor: Tensor, numel: int
+) -> Tensor:
+    """Check a caller-provided output buffer, or allocate one."""
+    if output is None:
+        return torch.empty(
+            numel, dtype=tensor.dtype, device=tensor.device
+        )
+    if output.numel() != numel or not output.is_contiguous():
+        raise ValueError(
+            f"output must be a contiguous tensor of {numel} elements."
+        )
+    if output.dtype != tensor.dtype or output.device != tensor.device:
+        raise ValueError(
+            "output must match the input tensor's dtype and device."
+        )
+    return output.view(-1)
+
+
+@traced
+def fused_all_gather_into(
+    tensor: Tensor,
+    output: Optional[Tensor] = None,
+    group=None,
+    async_op: bool = False,
+):
+    """
+    All-gather straight into one contiguous output tensor and return a
+    zero-copy view of every rank's piece. Nothing is copied after the
+    collective and nothing is allocated when `output` is given.
+
+    Args:
+    - tensor (torch.Tensor): Tensor to be gathered across all processes.
+    - output (torch.Tensor, optional): Contiguous buffer of world_size * tensor.numel()
+      elements to gather into. Allocated when omitted.
+    - group (ProcessGroup, optional): The process group to work on. Default is the world group.
+    - async_op (bool): Return a CollectiveWork handle completed with the views
+      instead of blocking. Default is False.
+
+    Returns:
+        List[Tensor]: world_size views of `output`, each shaped like `tensor`.
+    """
+    world_size = dist.get_world_size(group)
+    flat = _gather_output(output, tensor, world_size * tensor.numel())
+    views = list(flat.view(world_size, *tensor.shape).unbind(0))
+    tensor = tensor.contiguous()
+
+    if dist.get_backend(group) == "nccl":
+        # NCCL gathers into a single flat tensor natively
+        args = (dist.all_gather_into_tensor, flat, tensor)
+    else:
+        args = (dist.all_gather, views, tensor)
+
+    if async_op:
+        return dist_async(*args, group=group, result=views)
+    args[0](*args[1:], group=group)
+    return views
+
+
+@traced
+def all_gather_v(
+    tensor: Tensor,
+    output: Optional[Tensor] = None,
+    sizes: Optional[List[int]] = None,
+    group=None,
+    async_op: bool = False,
+):
+    """
+    All-gather tensors whose first dimension differs between ranks,
+    without the caller padding them. The row counts are exchanged in one
+    small all-gather, unless the caller passes `sizes` it already knows,
+    and every rank's rows land directly in one packed contiguous output.
+
+    Args:
+    - tensor (torch.Tensor): This rank's tensor, shaped (rows, *trailing) with the
+      same trailing dimensions on every rank.
+    - output (torch.Tensor, optional): Contiguous buffer for sum(sizes) rows. Allocated when omitted.
+    - sizes (List[int], optional): Row count of every rank, skipping the size exchange.
+    - group (ProcessGroup, optional): The process group to work on. Default is the world group.
+    - async_op (bool): Return a CollectiveWork handle completed with the views
+      instead of blocking. Default is False.
+
+    Returns:
+        List[Tensor]: One zero-copy view of `output` per rank, shaped (sizes[r], *trailing).
+    """
+    world_size = dist.get_world_size(group)
+    trailing = tuple(tensor.shape[1:])
+    if sizes is None:
+        rows = torch.tensor(
+            [tensor.shape[0]], dtype=torch.int64, device=tensor.device
+        )
+        gathered = fused_all_gather_into(rows, group=group)
+        sizes = [int(r) for r in torch.cat(gathered).tolist()]
+    if len(sizes) != world_size:
+        raise ValueError("sizes must have one entry per rank.")
+    # Check before any peer is waiting in the broadcasts below
+    rank = dist.get_rank(group)
+    if tensor.dim() == 0 or tensor.shape[0] != sizes[rank]:
+        raise ValueError(
+            f"Rank {rank} has {tuple(tensor.shape)} but sizes gives"
+            f" it {sizes[rank]} rows."
+        )
+    if (
+        output is not None
+        and output.dim() > 1
+        and tuple(output.shape[1:]) != trailing
+    ):
+        raise ValueError(
+            "output has trailing dimensions"
+            f" {tuple(output.shape[1:])} but the tensor has"
+            f" {trailing}."
+        )
+
+    row_numel = 1
+    for dim in trailing:
+        row_numel *= dim
+    flat = _gather_output(output, tensor, sum(sizes) * row_numel)
+    views = list(flat.view(sum(sizes), *trailing).split(sizes, dim=0))
+
+    if len(set(sizes)) == 1:
+        return fused_all_gather_into(
+            tensor, flat, group=group, async_op=async_op
+        )
+
+    # Ragged: every rank broadcasts its rows into its own slice
+    views[rank].copy_(tensor)
+    works = [
+        dist_async(
+            dist.broadcast,
+            views[r],
+            global_rank(group, r),
+            group=group,
+        )
+        for r in range(world_size)
+        if sizes[r]
+    ]
+    futures = [work.get_future() for work in works]
+    work = CollectiveWork(
+        torch.futures.collect_all(futures).then(lambda fut: views)
+    )
+    return work if async_op else work.wait()
+
 
 # Fused all_gather operations
-def fused_all_gather_v1(tensor_list: List[Tensor], tensor: Tensor):
+@traced
+def fused_all_gather_v1(
+    tensor_list: List[Tensor], tensor: Tensor, async_op: bool = False
+):
     """
     Fused all_gather operation optimized for speed. Version 1 focuses on minimizing communication overhead.
+    Every rank's tensor is gathered straight into one flat buffer and
+    `tensor_list[i]` is replaced with a zero-copy view of rank i's piece.
 
     Args:
     - tensor_list (List[torch.Tensor]): List to store the gathered tensors from all processes.
     - tensor (torch.Tensor): Tensor to be gathered across all processes.
+    - async_op (bool): Return a CollectiveWork handle completed with `tensor_list`
+      instead of blocking. Default is False.
     """
-    dist.get_rank()
     world_size = dist.get_world_size()
 
     # Ensuring tensor_list can hold tensors from all processes
@@ -22,43 +177,31 @@ def fused_all_gather_v1(tensor_list: List[Tensor], tensor: Tensor):
             "tensor_list must have length equal to the world size."
         )
 
-    tensor_shape = tensor.size()
-    flat_tensor = tensor.flatten()
+    def finish(views):
+        tensor_list[:] = views
+        return tensor_list
 
-    # Allocate a flat buffer for the gathered tensors
-    buffer_size = flat_tensor.numel() * world_size
-    buffer = torch.empty(
-        buffer_size, dtype=tensor.dtype, device=tensor.device
-    )
-
-    # Allgather operation
-    dist.all_gather(tensor_list, flat_tensor)
-
-    # Concatenating into a single buffer then splitting ensures minimal communication overhead
-    for i, gathered_tensor in enumerate(tensor_list):
-        buffer[
-            i * flat_tensor.numel() : (i + 1) * flat_tensor.numel()
-        ] = gathered_tensor.flatten()
-
-    # Reshape the flattened tensors back to their original shape
-    for i in range(world_size):
-        start_index = i * flat_tensor.numel()
-        end_index = (i + 1) * flat_tensor.numel()
-        tensor_list[i] = buffer[start_index:end_index].view(
-            tensor_shape
+    if async_op:
+        return fused_all_gather_into(tensor, async_op=True).then(
+            finish
         )
+    return finish(fused_all_gather_into(tensor))
 
 
 # Fused all_gather operations
-def fused_all_gather_v2(tensor_list: List[Tensor], tensor: Tensor):
+@traced
+def fused_all_gather_v2(
+    tensor_list: List[Tensor], tensor: Tensor, async_op: bool = False
+):
     """
     Fused all_gather operation optimized for speed. Version 2 focuses on reducing memory footprint.
 
     Args:
     - tensor_list (List[torch.Tensor]): List to store the gathered tensors from all processes.
     - tensor (torch.Tensor): Tensor to be gathered across all processes.
+    - async_op (bool): Return a CollectiveWork handle completed with `tensor_list`
+      instead of blocking. Default is False.
     """
-    rank = dist.get_rank()
     world_size = dist.get_world_size()
 
     # Ensuring tensor_list can hold tensors from all processes
@@ -68,30 +211,71 @@ def fused_all_gather_v2(tensor_list: List[Tensor], tensor: Tensor):
         )
 
     tensor_shape = tensor.size()
-    num_elements = tensor.numel()
-
-    # Use torch.cuda.comm.gather if available for lower memory footprint
-    if tensor.is_cuda:
-        gathered = torch.cuda.comm.gather(tensor, destination=0)
-        if rank == 0:
-            for i, t in enumerate(gathered):
-                tensor_list[i] = t.view(tensor_shape)
-    else:
-        flat_tensor = tensor.flatten()
-        torch.empty(
-            num_elements * world_size,
-            dtype=tensor.dtype,
-            device=tensor.device,
-        )
-        dist.all_gather(tensor_list, flat_tensor)
+    flat_tensor = tensor.flatten()
 
+    def finish(_=None):
         # Directly split the buffer to reduce memory footprint
         for i, gathered_tensor in enumerate(tensor_list):
             tensor_list[i] = gathered_tensor.view(tensor_shape)
+        return tensor_list
 
-        # For non-zero ranks or when not using CUDA, fall back to CPU-based gathering and reshaping
-        if not tensor.is_cuda or rank != 0:
-            for i in range(world_size):
-                i * num_elements
-                (i + 1) * num_elements
-                tensor_list
+    # Same path for CPU and CUDA, every rank receives every tensor
+    if async_op:
+        return dist_async(
+            dist.all_gather, tensor_list, flat_tensor
+        ).then(finish)
+    dist.all_gather(tensor_list, flat_tensor)
+    return finish()
+
+
+ALL_GATHER_ALGORITHMS = {
+    "v1": fused_all_gather_v1,
+    "v2": fused_all_gather_v2,
+    "shm": shm_all_gather,
+}
+
+
+@traced
+def fused_all_gather(
+    tensor_list: List[Tensor],
+    tensor: Tensor,
+    algorithm: str = "auto",
+    async_op: bool = False,
+):
+    """
+    All-gather entry point. With algorithm="auto" it uses the winner the
+    autotuner recorded for this backend, world size, dtype and message
+    size, falling back to shared memory for CPU tensors on a single
+    host and fused_all_gather_v1 otherwise.
+
+    Args:
+    - tensor_list (List[torch.Tensor]): List to store the gathered tensors from all processes.
+    - tensor (torch.Tensor): Tensor to be gathered across all processes.
+    - algorithm (str): "auto" or a key of ALL_GATHER_ALGORITHMS. Default is "auto".
+    - async_op (bool): Return a CollectiveWork handle instead of blocking. Default is False.
+    """
+    if algorithm == "auto":
+        backend = dist.get_backend()
+        algorithm = get_tuning_table().lookup(
+            "all_gather",
+            backend,
+            dist.get_world_size(),
+            tensor.dtype,
+            tensor.numel() * tensor.element_size(),
+        )
+        if algorithm not in ALL_GATHER_ALGORITHMS:
+            single_host = (
+                tensor.device.type == "cpu"
+                and backend == "gloo"
+                and shm_available()
+            )
+            algorithm = "shm" if single_host else "v1"
+    if algorithm not in ALL_GATHER_ALGORITHMS:
+        raise ValueError(
+            f"Unknown all-gather algorithm: {algorithm}. Expected"
+            f" one of {sorted(ALL_GATHER_ALGORITHMS)} or 'auto'."
+        )
+    annotate(algorithm)
+    return ALL_GATHER_ALGORITHMS[algorithm](
+        tensor_list, tensor, async_op=async_op
+    )
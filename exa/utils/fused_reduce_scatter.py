@@ -0,0 +1,170 @@
+from typing import List, Optional, Union
+
+import torch
+from torch import Tensor
+import torch.distributed as dist
+
+from exa.utils.all_reduce import (
+    DEFAULT_BUCKET_SIZE_BYTES,
+    _build_buckets,
+)
+from exa.utils.async_work import run_async, run_in_order
+from exa.utils.buffer_pool import get_buffer_pool
+from exa.utils.ring import Ring
+from exa.utils.tracing import traced
+
+
+def _shards(tensor: Tensor, world_size: int) -> List[Tensor]:
+    """Split a tensor's flattened elements into one shard per rank."""
+    return list(torch.tensor_split(tensor.reshape(-1), world_size))
+
+
+def _ring_reduce_scatter(
+    chunks: List[Tensor], op, group, pipeline_depth: int
+):
+    """Reduce chunk r of every rank into chunk r on rank r, in place."""
+    ring = Ring(chunks, group=group, pipeline_depth=pipeline_depth)
+    ring.reduce_scatter(op)
+    ring.wait()
+
+
+def _reduce_scatter_tensor(
+    tensor: Tensor,
+    output: Optional[Tensor],
+    op,
+    group,
+    pipeline_depth: int,
+) -> Tensor:
+    """Blocking reduce-scatter of a single tensor."""
+    rank = dist.get_rank(group)
+    world_size = dist.get_world_size(group)
+    flat = tensor.reshape(-1)
+
+    if (
+        dist.get_backend(group) == "nccl"
+        and flat.numel() % world_size == 0
+    ):
+        if output is None:
+            output = torch.empty_like(_shards(flat, world_size)[rank])
+        dist.reduce_scatter_tensor(
+            output.view(-1), flat, op=op, group=group
+        )
+        return output
+
+    if output is None:
+        # The reduced shard stays in place inside the input
+        chunks = _shards(flat, world_size)
+        _ring_reduce_scatter(chunks, op, group, pipeline_depth)
+        return chunks[rank]
+
+    # Leave the caller's input intact: the ring runs on a pooled copy
+    pool = get_buffer_pool()
+    scratch = pool.acquire(flat.numel(), flat.dtype, flat.device)
+    try:
+        scratch.copy_(flat)
+        chunks = _shards(scratch, world_size)
+        _ring_reduce_scatter(chunks, op, group, pipeline_depth)
+        output.view(-1).copy_(chunks[rank])
+    finally:
+        pool.release(scratch)
+    return output
+
+
+def _reduce_scatter_bucket(
+    bucket: List[Tensor], op, group, pipeline_depth: int
+) -> List[Tensor]:
+    """
+    Reduce-scatter several tensors with one ring. The pooled buffer
+    holds all of rank 0's shards back to back, then all of rank 1's, and
+    so on, so each rank's ring chunk is exactly the shards it keeps.
+    Only this rank's chunk is copied out before the buffer goes back to
+    the pool.
+    """
+    rank = dist.get_rank(group)
+    world_size = dist.get_world_size(group)
+    shards = [_shards(t, world_size) for t in bucket]
+    pool = get_buffer_pool()
+    buffer = pool.acquire(
+        sum(t.numel() for t in bucket),
+        bucket[0].dtype,
+        bucket[0].device,
+    )
+    try:
+        chunks, offset = [], 0
+        for r in range(world_size):
+            start = offset
+            for tensor_shards in shards:
+                piece = tensor_shards[r]
+                buffer[offset : offset + piece.numel()].copy_(piece)
+                offset += piece.numel()
+            chunks.append(buffer[start:offset])
+
+        _ring_reduce_scatter(chunks, op, group, pipeline_depth)
+        kept = chunks[rank].clone()
+    finally:
+        pool.release(buffer)
+    return list(kept.split([s[rank].numel() for s in shards]))
+
+
+@traced
+def fused_reduce_scatter(
+    tensors: Union[Tensor, List[Tensor]],
+    op=dist.ReduceOp.SUM,
+    group=None,
+    output: Optional[Tensor] = None,
+    bucket_size_bytes: int = DEFAULT_BUCKET_SIZE_BYTES,
+    pipeline_depth: int = 4,
+    async_op: bool = False,
+):
+    """
+    Reduce across ranks and leave each rank with only its shard of the
+    result: the flattened tensor is split into world_size near-equal
+    shards and rank r receives the reduced shard r. Every rank moves
+    (N - 1) / N of the payload and keeps 1 / N of it.
+
+    Runs on the pipelined ring from fused_all_reduce_v1, or on
+    reduce_scatter_tensor with NCCL when the shards divide evenly. A list
+    of tensors is coalesced into buckets of at most `bucket_size_bytes`,
+    each reduced with a single ring.
+
+    Args:
+        tensors (Tensor or List[Tensor]): The tensor(s) to reduce-scatter.
+        op (dist.ReduceOp, optional): The reduction operation to apply. Defaults to dist.ReduceOp.SUM.
+        group (ProcessGroup, optional): The process group to work on. Defaults to the world group.
+        output (Tensor, optional): Where to write this rank's shard for a single tensor.
+            The input is then left unchanged, the ring running on a pooled copy. By
+            default the input is overwritten with partial sums and the shard is returned
+            as a view of it.
+        bucket_size_bytes (int, optional): Maximum payload of one bucket for a list. Defaults to 25 MiB.
+        pipeline_depth (int, optional): Maximum number of sub-chunks per ring chunk. Defaults to 4.
+        async_op (bool, optional): Return a CollectiveWork handle instead of blocking. Defaults to False.
+
+    Returns:
+        Tensor, List[Tensor] or CollectiveWork: This rank's reduced shard (one per
+        tensor for a list), or a handle completed with it.
+    """
+    if isinstance(tensors, Tensor):
+        body = _reduce_scatter_tensor
+        args = (tensors, output, op, group, pipeline_depth)
+    else:
+        if output is not None:
+            raise ValueError(
+                "output is only supported for one tensor."
+            )
+
+        def body():
+            shards = {}
+            for bucket in _build_buckets(tensors, bucket_size_bytes):
+                outputs = _reduce_scatter_bucket(
+                    bucket, op, group, pipeline_depth
+                )
+                for tensor, shard in zip(bucket, outputs):
+                    shards[id(tensor)] = shard
+            # Buckets group tensors by dtype, restore the input order
+            return [shards[id(t)] for t in tensors]
+
+        args = ()
+
+    if async_op:
+        return run_async(body, *args)
+    return run_in_order(body, *args)
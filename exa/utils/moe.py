@@ -0,0 +1,175 @@
+from typing import List, Tuple
+
+import torch
+from torch import Tensor
+import torch.distributed as dist
+
+from exa.utils.all_to_all import all_to_all_v, exchange_splits
+
+
+class MoEDispatchState:
+    """
+    What `moe_combine` needs to send expert outputs back to the ranks
+    and token positions they came from.
+
+    Attributes:
+        num_tokens (int): Tokens on this rank before dispatch.
+        token_ids (Tensor): Source token of every sent row, in send order.
+        send_splits (List[int]): Rows sent to each rank.
+        recv_splits (List[int]): Rows received from each rank.
+        recv_order (Tensor): Permutation sorting received rows by local expert.
+        weight_order (Tensor): Position in the flattened top-k of every sent row.
+    """
+
+    def __init__(
+        self,
+        num_tokens: int,
+        token_ids: Tensor,
+        send_splits: List[int],
+        recv_splits: List[int],
+        recv_order: Tensor,
+        weight_order: Tensor,
+    ):
+        self.num_tokens = num_tokens
+        self.token_ids = token_ids
+        self.send_splits = send_splits
+        self.recv_splits = recv_splits
+        self.recv_order = recv_order
+        self.weight_order = weight_order
+
+
+def experts_per_rank(num_experts: int, group=None) -> int:
+    """Number of experts each rank owns, experts being split evenly."""
+    world_size = dist.get_world_size(group)
+    if num_experts % world_size:
+        raise ValueError(
+            f"{num_experts} experts cannot be split evenly over"
+            f" {world_size} ranks."
+        )
+    return num_experts // world_size
+
+
+def moe_dispatch(
+    tokens: Tensor,
+    expert_indices: Tensor,
+    num_experts: int,
+    group=None,
+) -> Tuple[Tensor, List[int], MoEDispatchState]:
+    """
+    Send every token to the ranks owning its top-k experts. Expert e
+    lives on rank e // experts_per_rank. Each (token, expert) pair is
+    one row: rows are packed by destination rank into one buffer,
+    exchanged with all_to_all_v, and the received rows are grouped by
+    local expert so each expert runs on one contiguous slice.
+
+    Args:
+        tokens (Tensor): Tokens on this rank, shaped (num_tokens, hidden).
+        expert_indices (Tensor): Top-k expert ids per token, shaped (num_tokens, k).
+        num_experts (int): Total number of experts across all ranks.
+        group (ProcessGroup, optional): The expert-parallel group. Default is the world group.
+
+    Returns:
+        Tuple[Tensor, List[int], MoEDispatchState]: The received rows sorted by local
+        expert, the number of rows for each local expert, and the state for moe_combine.
+    """
+    world_size = dist.get_world_size(group)
+    local_experts = experts_per_rank(num_experts, group)
+    num_tokens, k = expert_indices.shape
+
+    experts = expert_indices.reshape(-1)
+    # Stable sort keeps each destination's rows in token order
+    weight_order = torch.sort(experts, stable=True).indices
+    experts = experts[weight_order]
+    token_ids = weight_order // k
+    destinations = experts // local_experts
+    send_splits = torch.bincount(
+        destinations, minlength=world_size
+    ).tolist()
+
+    # The gather is the pack: one contiguous buffer in send order
+    send_rows = tokens.index_select(0, token_ids)
+    recv_splits = exchange_splits(
+        send_splits, group=group, device=tokens.device
+    )
+    received = tokens.new_empty(sum(recv_splits), *tokens.shape[1:])
+    local_ids = experts.new_empty(sum(recv_splits), 1)
+    all_to_all_v(
+        send_rows,
+        send_splits,
+        output=received,
+        recv_splits=recv_splits,
+        group=group,
+    )
+    all_to_all_v(
+        (experts % local_experts).unsqueeze(1),
+        send_splits,
+        output=local_ids,
+        recv_splits=recv_splits,
+        group=group,
+    )
+
+    local_ids = local_ids.view(-1)
+    recv_order = torch.sort(local_ids, stable=True).indices
+    tokens_per_expert = torch.bincount(
+        local_ids, minlength=local_experts
+    ).tolist()
+
+    state = MoEDispatchState(
+        num_tokens,
+        token_ids,
+        send_splits,
+        recv_splits,
+        recv_order,
+        weight_order,
+    )
+    return received[recv_order], tokens_per_expert, state
+
+
+def moe_combine(
+    expert_outputs: Tensor,
+    weights: Tensor,
+    state: MoEDispatchState,
+    group=None,
+) -> Tensor:
+    """
+    Inverse of moe_dispatch: return expert outputs to the ranks their
+    tokens came from and sum each token's top-k outputs, weighted by
+    its gate weights.
+
+    Args:
+        expert_outputs (Tensor): Outputs in the order moe_dispatch returned the
+            inputs, shaped (rows, hidden).
+        weights (Tensor): Top-k gate weights per token, shaped (num_tokens, k).
+        state (MoEDispatchState): The state returned by moe_dispatch.
+        group (ProcessGroup, optional): The expert-parallel group. Default is the world group.
+
+    Returns:
+        Tensor: Combined outputs shaped (num_tokens, hidden).
+    """
+    # Undo the per-expert grouping so rows are back in receive order
+    unsorted = torch.empty_like(expert_outputs)
+    unsorted[state.recv_order] = expert_outputs
+
+    rows = expert_outputs.new_empty(
+        sum(state.send_splits), *expert_outputs.shape[1:]
+    )
+    all_to_all_v(
+        unsorted,
+        state.recv_splits,
+        output=rows,
+        recv_splits=state.send_splits,
+        group=group,
+    )
+
+    row_weights = weights.reshape(-1)[state.weight_order]
+    combined = torch.zeros(
+        state.num_tokens,
+        *expert_outputs.shape[1:],
+        dtype=expert_outputs.dtype,
+        device=expert_outputs.device,
+    )
+    scale = row_weights.to(rows.dtype).view(
+        -1, *[1] * (rows.dim() - 1)
+    )
+    combined.index_add_(0, state.token_ids, rows * scale)
+    return combined
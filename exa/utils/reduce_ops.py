@@ -0,0 +1,26 @@
+import torch
+from torch import Tensor
+import torch.distributed as dist
+
+
+def reduce_inplace(
+    accum: Tensor, other: Tensor, op=dist.ReduceOp.SUM
+):
+    """
+    Reduce `other` into `accum` in place with the given reduction op.
+
+    Args:
+    - accum (torch.Tensor): The tensor that receives the result.
+    - other (torch.Tensor): The tensor to fold into `accum`.
+    - op (dist.ReduceOp): One of SUM, PRODUCT, MAX or MIN.
+    """
+    if op == dist.ReduceOp.SUM:
+        accum.add_(other)
+    elif op == dist.ReduceOp.PRODUCT:
+        accum.mul_(other)
+    elif op == dist.ReduceOp.MAX:
+        torch.maximum(accum, other, out=accum)
+    elif op == dist.ReduceOp.MIN:
+        torch.minimum(accum, other, out=accum)
+    else:
+        raise ValueError(f"Unsupported reduction op: {op}")
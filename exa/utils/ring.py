@@ -0,0 +1,195 @@
+from typing import Callable, List, Optional
+
+import torch
+from torch import Tensor
+import torch.distributed as dist
+
+from exa.utils.buffer_pool import get_buffer_pool
+from exa.utils.reduce_ops import reduce_inplace
+from exa.utils.topology import global_rank
+
+# Sub-chunks smaller than this are not worth a separate message
+_MIN_PIPELINE_NUMEL = 4096
+
+
+def _split_pipeline(chunk: Tensor, pipeline_depth: int):
+    """
+    Split a ring chunk into contiguous sub-chunks so that sending one
+    piece can overlap with reducing the previous one. Every rank splits
+    chunks of the same size identically, so the messages always match.
+    """
+    if chunk.numel() == 0:
+        return []
+    pieces = max(
+        1,
+        min(pipeline_depth, chunk.numel() // _MIN_PIPELINE_NUMEL),
+    )
+    return list(torch.tensor_split(chunk, pieces))
+
+
+class Ring:
+    """
+    Pipelined point-to-point ring over the ranks of a group, the engine
+    behind fused_all_reduce_v1 and the other ring collectives.
+
+    The data is given as one contiguous chunk per rank; every rank must
+    pass chunks of the same sizes. `reduce_scatter` leaves rank r with
+    the fully reduced chunks[r], and `all_gather` circulates each rank's
+    chunks[r] to everyone, in N - 1 steps each. Chunks are cut into
+    sub-chunks that are forwarded as soon as they arrive, so sends
+    overlap the local work, and sends are only waited on before the
+    chunk they read from is overwritten.
+
+    Args:
+        chunks (List[Tensor]): One contiguous 1-D chunk per rank, updated in place.
+        group (ProcessGroup, optional): The process group. Default is the world group.
+        pipeline_depth (int): Maximum number of sub-chunks per chunk. Default is 4.
+    """
+
+    def __init__(
+        self,
+        chunks: List[Tensor],
+        group=None,
+        pipeline_depth: int = 4,
+    ):
+        self.group = group
+        self.rank = dist.get_rank(group)
+        self.world_size = dist.get_world_size(group)
+        if len(chunks) != self.world_size:
+            raise ValueError("Ring needs exactly one chunk per rank.")
+        self.chunks = chunks
+        self.pieces = [
+            _split_pipeline(c, pipeline_depth) for c in chunks
+        ]
+        self.left = global_rank(
+            group, (self.rank - 1) % self.world_size
+        )
+        self.right = global_rank(
+            group, (self.rank + 1) % self.world_size
+        )
+        # Outstanding sends per chunk, waited on before it is overwritten
+        self.pending = {}
+        self._recv_buff = None
+
+    def _isend(self, idx: int, piece: Tensor):
+        self.pending.setdefault(idx, []).append(
+            dist.isend(piece, self.right, group=self.group)
+        )
+
+    def _send_chunk(self, idx: int):
+        for piece in self.pieces[idx]:
+            self._isend(idx, piece)
+
+    def _recv_buffer(self, numel: int) -> Tensor:
+        largest = max(c.numel() for c in self.chunks)
+        if self._recv_buff is None:
+            self._recv_buff = get_buffer_pool().acquire(
+                largest, self.chunks[0].dtype, self.chunks[0].device
+            )
+        return self._recv_buff[:numel]
+
+    def reduce_scatter(
+        self,
+        op=dist.ReduceOp.SUM,
+        prepare: Optional[Callable] = None,
+    ):
+        """
+        Reduce every chunk across the ring; afterwards chunks[rank] holds
+        the fully reduced values on each rank.
+
+        Args:
+            op (dist.ReduceOp): The reduction operation. Default is SUM.
+            prepare (Callable, optional): Called as `prepare(idx)` right
+                before chunks[idx] is first read, to fill it lazily. The
+                partial sum for it is already being received, so producing
+                the chunk overlaps the transfer.
+        """
+        n, rank = self.world_size, self.rank
+        if n == 1:
+            if prepare is not None:
+                prepare(rank)
+            return
+        first = (rank - 1) % n
+        if prepare is not None:
+            prepare(first)
+        self._send_chunk(first)
+        for step in range(n - 1):
+            idx = (rank - step - 2) % n
+            if not self.pieces[idx]:
+                if prepare is not None:
+                    prepare(idx)
+                continue
+            recv_pieces = torch.split(
+                self._recv_buffer(self.chunks[idx].numel()),
+                [p.numel() for p in self.pieces[idx]],
+            )
+            reqs = [
+                dist.irecv(buf, self.left, group=self.group)
+                for buf in recv_pieces
+            ]
+            if prepare is not None:
+                prepare(idx)
+            for piece, buf, req in zip(
+                self.pieces[idx], recv_pieces, reqs
+            ):
+                req.wait()
+                reduce_inplace(piece, buf, op)
+                # The reduced piece is exactly what the next step sends
+                if step < n - 2:
+                    self._isend(idx, piece)
+
+    def _post_recv(self, step: int):
+        """Post the receives of all-gather step `step`."""
+        idx = (self.rank - step - 1) % self.world_size
+        # Sends still reading this chunk must finish before overwriting
+        for req in self.pending.pop(idx, []):
+            req.wait()
+        reqs = [
+            dist.irecv(piece, self.left, group=self.group)
+            for piece in self.pieces[idx]
+        ]
+        return idx, reqs
+
+    def all_gather(self, on_chunk: Optional[Callable] = None):
+        """
+        Circulate every rank's chunks[rank] so all chunks are complete on
+        every rank.
+
+        Args:
+            on_chunk (Callable, optional): Called as `on_chunk(idx)` as soon
+                as chunks[idx] is complete, starting with our own. The next
+                chunk is already being received, so work on it overlaps the
+                remaining transfers.
+        """
+        n, rank = self.world_size, self.rank
+        if n == 1:
+            if on_chunk is not None:
+                on_chunk(rank)
+            return
+        self._send_chunk(rank)
+        posted = self._post_recv(0)
+        if on_chunk is not None:
+            on_chunk(rank)
+        for step in range(n - 1):
+            idx, reqs = posted
+            for piece, req in zip(self.pieces[idx], reqs):
+                req.wait()
+                if step < n - 2:
+                    self._isend(idx, piece)
+            if step < n - 2:
+                posted = self._post_recv(step + 1)
+            if on_chunk is not None:
+                on_chunk(idx)
+
+    def wait(self):
+        """
+        Wait for every outstanding send and return the receive buffer
+        to the pool.
+        """
+        for reqs in self.pending.values():
+            for req in reqs:
+                req.wait()
+        self.pending.clear()
+        if self._recv_buff is not None:
+            get_buffer_pool().release(self._recv_buff)
+            self._recv_buff = None
@@ -0,0 +1,150 @@
+import math
+from typing import Optional
+
+import torch
+from torch import Tensor
+import torch.distributed as dist
+
+from exa.utils.async_work import run_in_order
+from exa.utils.buffer_pool import get_buffer_pool
+from exa.utils.topology import global_rank
+from exa.utils.tracing import traced
+
+
+@traced
+def ring_attention(
+    q: Tensor,
+    k: Tensor,
+    v: Tensor,
+    causal: bool = False,
+    scale: Optional[float] = None,
+    group=None,
+) -> Tensor:
+    """
+    Scaled dot-product attention over a sequence sharded across the
+    ranks of a group. Every rank keeps its queries and passes its K/V
+    block around the ring, one neighbour per step, like the ring of
+    fused_all_reduce_v1. While the next block is in flight, the queries
+    attend to the current one. The partial results are merged with an
+    online softmax, so no rank ever holds more than two K/V blocks and
+    memory scales with sequence length / N. Forward only.
+
+    Args:
+        q (Tensor): This rank's queries, shaped (*batch, seq_local, head_dim).
+        k (Tensor): This rank's keys, shaped (*batch, seq_local, head_dim).
+        v (Tensor): This rank's values, shaped (*batch, seq_local, head_dim_v).
+        causal (bool): Mask future positions. Rank r must hold the r-th contiguous
+            slice of the sequence. Default is False.
+        scale (float, optional): Score scale. Defaults to 1 / sqrt(head_dim).
+        group (ProcessGroup, optional): The sequence-parallel group. Default is the world group.
+
+    Returns:
+        Tensor: Attention output for this rank's queries, shaped (*batch, seq_local, head_dim_v).
+    """
+    if k.shape[:-1] != v.shape[:-1] or q.shape[:-2] != k.shape[:-2]:
+        raise ValueError("q, k and v shapes do not match.")
+    if causal and q.shape[-2] != k.shape[-2]:
+        raise ValueError(
+            "Causal ring attention needs as many queries as keys per"
+            " rank."
+        )
+    if scale is None:
+        scale = 1.0 / math.sqrt(q.shape[-1])
+    return run_in_order(
+        _ring_attention, q, k, v, causal, scale, group
+    )
+
+
+def _attend_block(q, k, v, scale, diagonal):
+    """
+    Attention of the queries to one K/V block, returning the unnormalized
+    output with the row maxima and row sums of its softmax.
+    """
+    scores = torch.matmul(q, k.transpose(-2, -1)).mul_(scale)
+    if diagonal:
+        mask = torch.ones(
+            scores.shape[-2:], dtype=torch.bool, device=scores.device
+        ).triu_(1)
+        scores.masked_fill_(mask, float("-inf"))
+    row_max = scores.amax(dim=-1, keepdim=True)
+    probs = torch.exp_(scores.sub_(row_max))
+    return (
+        torch.matmul(probs, v.to(probs.dtype)),
+        row_max,
+        probs.sum(dim=-1, keepdim=True),
+    )
+
+
+def _ring_attention(q, k, v, causal, scale, group):
+    """Blocking body of ring_attention."""
+    world_size = dist.get_world_size(group)
+    rank = dist.get_rank(group)
+    left = global_rank(group, (rank - 1) % world_size)
+    right = global_rank(group, (rank + 1) % world_size)
+
+    # Accumulate in fp32 so low-precision inputs merge stably
+    acc_dtype = torch.promote_types(q.dtype, torch.float32)
+    q = q.to(acc_dtype)
+    out = torch.zeros(
+        *v.shape[:-2],
+        q.shape[-2],
+        v.shape[-1],
+        dtype=acc_dtype,
+        device=q.device,
+    )
+    row_max = torch.full(
+        (*q.shape[:-1], 1),
+        float("-inf"),
+        dtype=acc_dtype,
+        device=q.device,
+    )
+    row_sum = torch.zeros_like(row_max)
+
+    # K and V travel together, one message per step
+    pool = get_buffer_pool()
+    numel = k.numel() + v.numel()
+    current = pool.acquire(numel, k.dtype, k.device)
+    incoming = pool.acquire(numel, k.dtype, k.device)
+    current[: k.numel()].copy_(k.reshape(-1))
+    current[k.numel() :].copy_(v.reshape(-1).to(k.dtype))
+
+    try:
+        for step in range(world_size):
+            # Rank that this block of the sequence came from
+            src = (rank - step) % world_size
+            works = []
+            if step < world_size - 1:
+                works = [
+                    dist.isend(current, right, group=group),
+                    dist.irecv(incoming, left, group=group),
+                ]
+
+            # Blocks after this rank's queries are fully masked
+            if not (causal and src > rank):
+                block_k = current[: k.numel()].view(k.shape)
+                block_v = current[k.numel() :].view(v.shape)
+                block_out, block_max, block_sum = _attend_block(
+                    q,
+                    block_k.to(acc_dtype),
+                    block_v,
+                    scale,
+                    causal and src == rank,
+                )
+                # Online softmax: rescale both sides to the new max
+                new_max = torch.maximum(row_max, block_max)
+                old_scale = torch.exp(row_max - new_max)
+                new_scale = torch.exp(block_max - new_max)
+                out.mul_(old_scale).add_(block_out.mul_(new_scale))
+                row_sum.mul_(old_scale).add_(
+                    block_sum.mul_(new_scale)
+                )
+                row_max = new_max
+
+            for work in works:
+                work.wait()
+            current, incoming = incoming, current
+    finally:
+        pool.release(current)
+        pool.release(incoming)
+
+    return out.div_(row_sum).to(v.dtype)
@@ -0,0 +1,130 @@
+from typing import List, Optional, Union
+
+import torch
+from torch import Tensor
+import torch.distributed as dist
+
+from exa.utils.all_reduce import (
+    DEFAULT_BUCKET_SIZE_BYTES,
+    _build_buckets,
+    _pack_bucket,
+    _unpack_bucket,
+)
+from exa.utils.async_work import CollectiveWork, dist_async
+from exa.utils.buffer_pool import get_buffer_pool
+from exa.utils.fused_all_gather import _gather_output
+from exa.utils.topology import global_rank
+from exa.utils.tracing import traced
+
+
+@traced
+def fused_reduce(
+    tensors: Union[Tensor, List[Tensor]],
+    dst: int = 0,
+    op=dist.ReduceOp.SUM,
+    group=None,
+    bucket_size_bytes: int = DEFAULT_BUCKET_SIZE_BYTES,
+    async_op: bool = False,
+):
+    """
+    Reduce tensors onto the single rank `dst`. Only `dst` receives the
+    result, so no rank pays for the all-gather half of an all-reduce. A
+    list of tensors is packed into buckets of at most
+    `bucket_size_bytes` with one reduce per bucket.
+
+    Args:
+        tensors (Tensor or List[Tensor]): The tensor(s) to reduce. Reduced in place on `dst`,
+            left in an unspecified state on the other ranks.
+        dst (int, optional): Rank within `group` that receives the result. Defaults to 0.
+        op (dist.ReduceOp, optional): The reduction operation to apply. Defaults to dist.ReduceOp.SUM.
+        group (ProcessGroup, optional): The process group to work on. Defaults to the world group.
+        bucket_size_bytes (int, optional): Maximum payload of one bucket for a list. Defaults to 25 MiB.
+        async_op (bool, optional): Return a CollectiveWork handle instead of blocking. Defaults to False.
+
+    Returns:
+        Tensor, List[Tensor] or CollectiveWork: The reduced tensor(s) on `dst` and None
+        elsewhere, or a handle completed with that.
+    """
+    is_dst = dist.get_rank(group) == dst
+    root = global_rank(group, dst)
+    single = isinstance(tensors, Tensor)
+    tensor_list = [tensors] if single else list(tensors)
+
+    pool = get_buffer_pool()
+    works, unpacks = [], []
+    for bucket in _build_buckets(tensor_list, bucket_size_bytes):
+        if len(bucket) == 1 and bucket[0].is_contiguous():
+            buffer = bucket[0]
+        else:
+            buffer = pool.acquire(
+                sum(t.numel() for t in bucket),
+                bucket[0].dtype,
+                bucket[0].device,
+            )
+            _pack_bucket(bucket, buffer)
+            unpacks.append((bucket, buffer))
+        if async_op:
+            works.append(
+                dist_async(dist.reduce, buffer, root, op, group=group)
+            )
+        else:
+            dist.reduce(buffer, root, op, group=group)
+
+    def finish(_=None):
+        for bucket, buffer in unpacks:
+            if is_dst:
+                _unpack_bucket(bucket, buffer)
+            pool.release(buffer)
+        return tensors if is_dst else None
+
+    if async_op:
+        futures = [w.get_future() for w in works]
+        return CollectiveWork(
+            torch.futures.collect_all(futures)
+        ).then(finish)
+    return finish()
+
+
+@traced
+def fused_gather(
+    tensor: Tensor,
+    dst: int = 0,
+    output: Optional[Tensor] = None,
+    group=None,
+    async_op: bool = False,
+):
+    """
+    Gather `tensor` from every rank onto the single rank `dst`, straight
+    into one contiguous output. Other ranks only send, and allocate
+    nothing.
+
+    Args:
+        tensor (Tensor): This rank's tensor, the same shape on every rank.
+        dst (int, optional): Rank within `group` that receives the result. Defaults to 0.
+        output (Tensor, optional): Contiguous buffer of world_size * tensor.numel()
+            elements used on `dst`. Allocated when not given.
+        group (ProcessGroup, optional): The process group to work on. Defaults to the world group.
+        async_op (bool, optional): Return a CollectiveWork handle instead of blocking. Defaults to False.
+
+    Returns:
+        List[Tensor] or CollectiveWork: On `dst`, one view per rank into the output
+        buffer, shaped like `tensor`; None on the other ranks. Or a handle completed with that.
+    """
+    world_size = dist.get_world_size(group)
+    is_dst = dist.get_rank(group) == dst
+    send = tensor.contiguous()
+
+    views = None
+    if is_dst:
+        flat = _gather_output(
+            output, tensor, world_size * tensor.numel()
+        )
+        views = list(flat.view(world_size, *tensor.shape).unbind(0))
+
+    args = (send, views, global_rank(group, dst))
+    if async_op:
+        return dist_async(
+            dist.gather, *args, group=group, result=views
+        )
+    dist.gather(*args, group=group)
+    return views
@@ -0,0 +1,337 @@
+import atexit
+import os
+import socket
+import time
+import uuid
+from multiprocessing import resource_tracker, shared_memory
+from typing import List, Optional
+
+import torch
+from torch import Tensor
+import torch.distributed as dist
+from loguru import logger
+
+from exa.utils.async_work import dist_async, run_async, run_in_order
+from exa.utils.atomic_flags import AtomicFlags, atomic_flags_supported
+from exa.utils.reduce_ops import reduce_inplace
+from exa.utils.topology import global_rank
+from exa.utils.tracing import traced
+
+# Slot capacity; larger tensors go through the slots in chunks
+DEFAULT_SLOT_BYTES = 4 * 1024 * 1024
+
+# One barrier flag per cache line so ranks never share one
+_FLAG_STRIDE = 8
+
+# Seconds a rank waits at a barrier before assuming a peer died
+BARRIER_TIMEOUT = 300.0
+
+# Communicators per process group, None when the group spans hosts
+_communicators = {}
+
+
+def _align(nbytes: int, alignment: int = 64) -> int:
+    return (nbytes + alignment - 1) // alignment * alignment
+
+
+class ShmCommunicator:
+    """
+    Collectives between ranks on one host through a
+    `multiprocessing.shared_memory` segment instead of loopback sockets.
+
+    The segment holds one barrier flag per rank, one data slot per rank
+    and a result slot. A collective is: every rank copies its input into
+    its slot, a barrier, every rank works on its own part (for
+    all-reduce, 1 / N of the elements across all slots), a barrier, and
+    every rank copies the result out. Barriers spin on per-rank
+    generation counters, each written by a single rank. The counters
+    are stored with release and loaded with acquire semantics
+    (AtomicFlags), so every slot written before a barrier is visible to
+    the peers after it.
+
+    The segment is sized once, at construction, which is the only step
+    that talks to the process group. Tensors larger than a slot go
+    through it in slot-sized chunks, so the collectives themselves can
+    run on the communication thread.
+
+    Args:
+        group (ProcessGroup, optional): The process group. Default is the world group.
+        slot_bytes (int): Capacity of each slot in bytes.
+    """
+
+    def __init__(
+        self, group=None, slot_bytes: int = DEFAULT_SLOT_BYTES
+    ):
+        self.group = group
+        self.rank = dist.get_rank(group)
+        self.world_size = dist.get_world_size(group)
+        self.generation = 0
+        self.shm = None
+        self.slot_bytes = 0
+        self._map(_align(slot_bytes))
+        atexit.register(self.close)
+
+    def _map(self, slot_bytes: int):
+        """Collectively create (rank 0) or attach to a new segment."""
+        self.close()
+        header = self.world_size * _FLAG_STRIDE * 8
+        size = header + (self.world_size + 1) * slot_bytes
+
+        name = [None]
+        if self.rank == 0:
+            name[0] = f"exa_{os.getpid()}_{uuid.uuid4().hex[:12]}"
+            shm = shared_memory.SharedMemory(
+                name=name[0], create=True, size=size
+            )
+        dist.broadcast_object_list(
+            name, src=global_rank(self.group, 0), group=self.group
+        )
+        if self.rank != 0:
+            shm = shared_memory.SharedMemory(name=name[0])
+            # Only the creator owns the segment's lifetime
+            resource_tracker.unregister(shm._name, "shared_memory")
+        dist.barrier(group=self.group)
+        if self.rank == 0:
+            # Every rank is attached, the name is no longer needed
+            shm.unlink()
+
+        self.shm = shm
+        self.slot_bytes = slot_bytes
+        self.flags = AtomicFlags(
+            shm.buf, self.world_size, stride=_FLAG_STRIDE
+        )
+        self.flags.fill(0)
+        self.data = torch.frombuffer(
+            shm.buf,
+            dtype=torch.uint8,
+            count=(self.world_size + 1) * slot_bytes,
+            offset=header,
+        )
+        self.generation = 0
+        dist.barrier(group=self.group)
+
+    def close(self):
+        """Release this rank's mapping of the segment."""
+        if self.shm is None:
+            return
+        # Views into the buffer must go before the mapping can close
+        self.flags = None
+        self.data = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+        self.shm = None
+
+    def _slots(self, dtype, numel: int) -> List[Tensor]:
+        """Views of the N rank slots and the result slot as `dtype`."""
+        view = self.data.view(dtype)
+        stride = self.slot_bytes // view.element_size()
+        return [
+            view[i * stride : i * stride + numel]
+            for i in range(self.world_size + 1)
+        ]
+
+    def barrier(self):
+        """Wait until every rank on the segment reaches this point."""
+        self.generation += 1
+        self.flags.store(self.rank, self.generation)
+        deadline = time.monotonic() + BARRIER_TIMEOUT
+        spins = 0
+        while self.flags.min() < self.generation:
+            spins += 1
+            if spins > 1000:
+                # Yield the core to the peers we are waiting on
+                time.sleep(0)
+                if time.monotonic() > deadline:
+                    raise RuntimeError(
+                        "Timed out in shared-memory barrier."
+                    )
+
+    def _chunks(self, numel: int, element_size: int):
+        """(start, end) element ranges that each fit in a slot."""
+        step = self.slot_bytes // element_size
+        for start in range(0, numel, step):
+            yield start, min(start + step, numel)
+
+    def all_reduce(self, tensor: Tensor, op=dist.ReduceOp.SUM):
+        """All-reduce `tensor` in place across the ranks of the segment."""
+        work = (
+            tensor if tensor.is_contiguous() else tensor.contiguous()
+        )
+        flat = work.view(-1)
+        # Every rank sees the same size, so they all take the same steps
+        for start, end in self._chunks(
+            flat.numel(), flat.element_size()
+        ):
+            self._all_reduce_chunk(flat[start:end], op)
+        if work is not tensor:
+            tensor.copy_(work)
+        return tensor
+
+    def _all_reduce_chunk(self, flat: Tensor, op):
+        slots = self._slots(flat.dtype, flat.numel())
+        result = slots[-1]
+
+        slots[self.rank].copy_(flat)
+        self.barrier()
+
+        # Chunked parallel reduction: each rank reduces its own range
+        chunk = -(-flat.numel() // self.world_size)
+        start = min(self.rank * chunk, flat.numel())
+        end = min(start + chunk, flat.numel())
+        if end > start:
+            out = result[start:end]
+            out.copy_(slots[0][start:end])
+            for peer in range(1, self.world_size):
+                reduce_inplace(out, slots[peer][start:end], op)
+        self.barrier()
+
+        flat.copy_(result)
+
+    def all_gather(self, tensor: Tensor, output: Tensor) -> Tensor:
+        """
+        Gather `tensor` from every rank into the flat `output`, which
+        must hold world_size * tensor.numel() elements.
+        """
+        flat = tensor.reshape(-1)
+        out = output.view(self.world_size, flat.numel())
+        for start, end in self._chunks(
+            flat.numel(), flat.element_size()
+        ):
+            slots = self._slots(flat.dtype, end - start)
+            slots[self.rank].copy_(flat[start:end])
+            self.barrier()
+            for peer in range(self.world_size):
+                out[peer, start:end].copy_(slots[peer])
+            self.barrier()
+        return output
+
+
+def get_shm_communicator(group=None) -> Optional[ShmCommunicator]:
+    """
+    Return the shared-memory communicator for `group`, creating it on
+    first use. Returns None when the group spans several hosts, when
+    shared memory is disabled with EXA_DISABLE_SHM=1, when the segment
+    cannot be created, or when neither libatomic nor x86 store ordering
+    is there to order the barrier flags. Must be called on every rank of
+    the group the first time.
+    """
+    if group in _communicators:
+        return _communicators[group]
+
+    hosts = [None] * dist.get_world_size(group)
+    dist.all_gather_object(hosts, socket.gethostname(), group=group)
+    usable = (
+        len(set(hosts)) == 1
+        and os.getenv("EXA_DISABLE_SHM", "0") != "1"
+        and atomic_flags_supported()
+    )
+
+    communicator = None
+    if usable:
+        try:
+            communicator = ShmCommunicator(group)
+        except OSError as e:
+            logger.warning(
+                "Shared-memory collectives unavailable, using the"
+                f" process group instead: {e}"
+            )
+    _communicators[group] = communicator
+    return communicator
+
+
+def shm_available(group=None) -> bool:
+    """Return True if `group` can use shared-memory collectives."""
+    return get_shm_communicator(group) is not None
+
+
+@traced
+def shm_all_reduce(
+    tensor: Tensor,
+    op=dist.ReduceOp.SUM,
+    group=None,
+    async_op: bool = False,
+):
+    """
+    All-reduce CPU tensors through a shared-memory segment when every
+    rank of the group is on the same host, falling back to the process
+    group's own all_reduce otherwise.
+
+    Args:
+        tensor (Tensor): The tensor to be reduced. Reduced in place.
+        op (dist.ReduceOp, optional): The reduction operation to apply. Defaults to dist.ReduceOp.SUM.
+        group (ProcessGroup, optional): The process group to work on. Defaults to the world group.
+        async_op (bool, optional): Return a CollectiveWork handle instead of blocking. Defaults to False.
+
+    Returns:
+        Tensor or CollectiveWork: The reduced tensor, or a handle completed with it.
+    """
+    communicator = get_shm_communicator(group)
+    if communicator is None or tensor.device.type != "cpu":
+        if async_op:
+            return dist_async(
+                dist.all_reduce,
+                tensor,
+                op,
+                group=group,
+                result=tensor,
+            )
+        dist.all_reduce(tensor, op, group=group)
+        return tensor
+
+    if async_op:
+        return run_async(communicator.all_reduce, tensor, op)
+    return run_in_order(communicator.all_reduce, tensor, op)
+
+
+@traced
+def shm_all_gather(
+    tensor_list: List[Tensor], tensor: Tensor, async_op: bool = False
+):
+    """
+    All-gather CPU tensors through a shared-memory segment when every
+    rank is on the same host, falling back to dist.all_gather otherwise.
+    On return `tensor_list[i]` is a view of rank i's tensor inside one
+    contiguous buffer.
+
+    Args:
+    - tensor_list (List[torch.Tensor]): List to store the gathered tensors from all processes.
+    - tensor (torch.Tensor): Tensor to be gathered across all processes.
+    - async_op (bool): Return a CollectiveWork handle completed with `tensor_list`
+      instead of blocking. Default is False.
+    """
+    world_size = dist.get_world_size()
+    if len(tensor_list) != world_size:
+        raise ValueError(
+            "tensor_list must have length equal to the world size."
+        )
+    output = torch.empty(
+        world_size * tensor.numel(),
+        dtype=tensor.dtype,
+        device=tensor.device,
+    )
+
+    def finish(_=None):
+        for i, piece in enumerate(output.view(world_size, -1)):
+            tensor_list[i] = piece.view(tensor.shape)
+        return tensor_list
+
+    communicator = get_shm_communicator()
+    if communicator is None or tensor.device.type != "cpu":
+        # Gather straight into views of the output buffer
+        views = list(output.view(world_size, *tensor.shape).unbind(0))
+        if async_op:
+            return dist_async(
+                dist.all_gather, views, tensor.contiguous()
+            ).then(finish)
+        dist.all_gather(views, tensor.contiguous())
+        return finish()
+
+    def gather():
+        communicator.all_gather(tensor, output)
+        return finish()
+
+    if async_op:
+        return run_async(gather)
+    return run_in_order(gather)
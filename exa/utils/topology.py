@@ -0,0 +1,127 @@
+import os
+from typing import List, Optional, Sequence
+
+import torch.distributed as dist
+
+# Topologies already built, keyed by their node layout
+_topologies = {}
+
+
+def global_rank(group, rank: int) -> int:
+    """Translate a rank inside `group` to its global rank."""
+    if group is None:
+        return rank
+    return dist.get_global_rank(group, rank)
+
+
+class NodeTopology:
+    """
+    Node layout of the world group with the subgroups needed for
+    two-level collectives: one group per node and one group holding the
+    leader (lowest rank) of every node.
+
+    Args:
+        nodes (List[List[int]]): Global ranks on each node.
+
+    Attributes:
+        nodes (List[List[int]]): Global ranks on each node.
+        node_index (int): Index of this rank's node.
+        local_rank (int): Position of this rank within its node.
+        leader (int): Global rank of this node's leader.
+        is_leader (bool): Whether this rank is its node's leader.
+        local_group (ProcessGroup): Group of the ranks on this node.
+        leader_group (ProcessGroup): Group of all node leaders, only
+            usable on leader ranks.
+    """
+
+    def __init__(self, nodes: List[List[int]]):
+        rank = dist.get_rank()
+        self.nodes = nodes
+        self.node_index = next(
+            i for i, node in enumerate(nodes) if rank in node
+        )
+        node = nodes[self.node_index]
+        self.local_rank = node.index(rank)
+        self.leader = node[0]
+        self.is_leader = rank == self.leader
+
+        # new_group is collective, every rank creates every group
+        self.local_group = None
+        for i, ranks in enumerate(nodes):
+            pg = dist.new_group(ranks)
+            if i == self.node_index:
+                self.local_group = pg
+        self.leader_group = dist.new_group([n[0] for n in nodes])
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def is_flat(self) -> bool:
+        """True when a two-level collective would gain nothing."""
+        return self.num_nodes == 1 or all(
+            len(node) == 1 for node in self.nodes
+        )
+
+
+def _contiguous_nodes(
+    world_size: int, local_world_size: int
+) -> List[List[int]]:
+    if world_size % local_world_size:
+        raise ValueError(
+            f"World size {world_size} is not a multiple of the local"
+            f" world size {local_world_size}."
+        )
+    return [
+        list(range(start, start + local_world_size))
+        for start in range(0, world_size, local_world_size)
+    ]
+
+
+def local_world_size_from_env() -> Optional[int]:
+    """Return LOCAL_WORLD_SIZE as set by torchrun, or None."""
+    value = os.getenv("LOCAL_WORLD_SIZE")
+    return int(value) if value else None
+
+
+def get_node_topology(
+    local_world_size: Optional[int] = None,
+    nodes: Optional[Sequence[Sequence[int]]] = None,
+) -> NodeTopology:
+    """
+    Build, or fetch from cache, the node topology of the world group.
+    Must be called on every rank the first time, because it creates
+    process groups.
+
+    Args:
+        local_world_size (int, optional): Ranks per node, with nodes
+            holding contiguous ranks. Defaults to $LOCAL_WORLD_SIZE.
+        nodes (Sequence[Sequence[int]], optional): Explicit global ranks
+            per node, overriding `local_world_size`.
+
+    Returns:
+        NodeTopology: The cached topology.
+    """
+    world_size = dist.get_world_size()
+    if nodes is None:
+        local_world_size = (
+            local_world_size
+            or local_world_size_from_env()
+            or world_size
+        )
+        nodes = _contiguous_nodes(world_size, local_world_size)
+
+    nodes = [sorted(int(r) for r in node) for node in nodes]
+    if sorted(r for node in nodes for r in node) != list(
+        range(world_size)
+    ):
+        raise ValueError(
+            "nodes must cover every rank of the world group exactly"
+            " once."
+        )
+
+    key = tuple(tuple(node) for node in nodes)
+    if key not in _topologies:
+        _topologies[key] = NodeTopology(nodes)
+    return _topologies[key]
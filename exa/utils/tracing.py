@@ -0,0 +1,343 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from typing import Callable, List, Optional
+
+from torch import Tensor
+import torch.distributed as dist
+from loguru import logger
+
+# The active tracer, None while tracing is off
+_tracer = None
+
+# The event of the collective currently running on this thread, so
+# collectives called from inside another one are not traced twice
+_current_event = contextvars.ContextVar(
+    "exa_current_event", default=None
+)
+
+
+class CollectiveTracer:
+    """
+    Records one event per top-level collective call on this rank: the
+    op, payload size, algorithm, and enqueue/start/end times.
+    `enqueue` is when the caller invoked it, `start` when it began
+    running (later for collectives queued behind others on the
+    communication thread) and `end` when its result was ready.
+
+    Times are wall-clock seconds, measured with a monotonic clock and
+    shifted by a per-process offset, so timelines of different ranks
+    line up as well as the hosts' clocks do.
+
+    Attributes:
+        events (List[dict]): Recorded events in call order.
+    """
+
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+        self._offset = time.time() - time.perf_counter()
+
+    def now(self) -> float:
+        return self._offset + time.perf_counter()
+
+    def begin(self, op: str, nbytes: int) -> dict:
+        now = self.now()
+        with self._lock:
+            event = {
+                "seq": len(self.events),
+                "op": op,
+                "nbytes": nbytes,
+                "algorithm": None,
+                "enqueue": now,
+                "start": now,
+                "end": None,
+            }
+            self.events.append(event)
+        return event
+
+    def end(self, event: dict):
+        event["end"] = self.now()
+
+
+def _payload_bytes(args) -> int:
+    """Bytes of the tensor or tensor list a collective works on."""
+    if not args:
+        return 0
+    first = args[0]
+    if isinstance(first, Tensor):
+        return first.numel() * first.element_size()
+    if isinstance(first, (list, tuple)):
+        if len(args) > 1 and isinstance(args[1], Tensor):
+            # (tensor_list, tensor) all-gather signature
+            return args[1].numel() * args[1].element_size()
+        return sum(
+            t.numel() * t.element_size()
+            for t in first
+            if isinstance(t, Tensor)
+        )
+    return 0
+
+
+def traced(fn: Callable) -> Callable:
+    """
+    Decorate a collective so that, while tracing is enabled, each
+    top-level call records an event. Asynchronous calls end when their
+    CollectiveWork completes. With tracing off the wrapper only checks
+    a global and calls through.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        tracer = _tracer
+        if tracer is None or _current_event.get() is not None:
+            return fn(*args, **kwargs)
+
+        event = tracer.begin(fn.__name__, _payload_bytes(args))
+        token = _current_event.set(event)
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            _current_event.reset(token)
+
+        future = getattr(result, "get_future", None)
+        if future is not None:
+            future().add_done_callback(lambda _: tracer.end(event))
+        else:
+            tracer.end(event)
+        return result
+
+    return wrapper
+
+
+def annotate(algorithm: str):
+    """Record which algorithm the running traced collective picked."""
+    event = _current_event.get()
+    if event is not None and event["algorithm"] is None:
+        event["algorithm"] = algorithm
+
+
+def bind(fn: Callable) -> Callable:
+    """
+    Carry the running traced collective over to another thread: the
+    returned function marks the event as started when it runs and
+    suppresses tracing of the collectives it calls.
+    """
+    event = _current_event.get()
+    if event is None:
+        return fn
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        if _tracer is not None:
+            event["start"] = _tracer.now()
+        token = _current_event.set(event)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current_event.reset(token)
+
+    return run
+
+
+def enable_tracing() -> CollectiveTracer:
+    """Start recording collectives, returning the new tracer."""
+    global _tracer
+    _tracer = CollectiveTracer()
+    return _tracer
+
+
+def disable_tracing() -> Optional[CollectiveTracer]:
+    """Stop recording collectives, returning the active tracer."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def get_tracer() -> Optional[CollectiveTracer]:
+    """Return the active tracer, or None when tracing is off."""
+    return _tracer
+
+
+def gather_traces(
+    tracer: Optional[CollectiveTracer] = None, group=None
+) -> List[List[dict]]:
+    """
+    Collect every rank's events. Must be called on every rank.
+
+    Returns:
+        List[List[dict]]: The events of each rank, indexed by rank.
+    """
+    tracer = tracer or _tracer
+    events = list(tracer.events) if tracer else []
+    traces = [None] * dist.get_world_size(group)
+    dist.all_gather_object(traces, events, group=group)
+    return traces
+
+
+class StragglerReport:
+    """
+    Who arrived last at the collectives traced on every rank, and how
+    long the others waited for them.
+
+    Attributes:
+        collectives (int): Collectives matched across all ranks.
+        late_counts (dict): Rank -> number of collectives it arrived last at.
+        wait_caused (dict): Rank -> seconds the other ranks spent waiting
+            for it, summed over the collectives it arrived last at.
+        stragglers (List[int]): Ranks that were last at more than the
+            threshold fraction of collectives.
+    """
+
+    def __init__(
+        self, collectives, late_counts, wait_caused, stragglers
+    ):
+        self.collectives = collectives
+        self.late_counts = late_counts
+        self.wait_caused = wait_caused
+        self.stragglers = stragglers
+
+    def __repr__(self):
+        return (
+            f"StragglerReport(collectives={self.collectives},"
+            f" stragglers={self.stragglers},"
+            f" wait_caused={self.wait_caused})"
+        )
+
+
+def straggler_report(
+    traces: List[List[dict]],
+    threshold: float = 0.5,
+    min_lag: float = 1e-4,
+) -> StragglerReport:
+    """
+    Find consistently late ranks. The i-th traced collective of every
+    rank is the same collective, so comparing enqueue times shows who
+    the others waited for.
+
+    Args:
+        traces (List[List[dict]]): Per-rank events, as from gather_traces.
+        threshold (float): Fraction of collectives a rank must arrive last
+            at to count as a straggler. Default is 0.5.
+        min_lag (float): Seconds the last rank must trail the second to
+            last by before it counts as late, so noise is ignored.
+            Default is 1e-4.
+
+    Returns:
+        StragglerReport: The late counts, wait caused and stragglers.
+    """
+    count = min((len(events) for events in traces), default=0)
+    late_counts = {rank: 0 for rank in range(len(traces))}
+    wait_caused = {rank: 0.0 for rank in range(len(traces))}
+
+    for i in range(count):
+        arrivals = [events[i]["enqueue"] for events in traces]
+        last = max(range(len(arrivals)), key=arrivals.__getitem__)
+        others = [a for r, a in enumerate(arrivals) if r != last]
+        if not others or arrivals[last] - max(others) < min_lag:
+            continue
+        late_counts[last] += 1
+        wait_caused[last] += sum(arrivals[last] - a for a in others)
+
+    stragglers = [
+        rank
+        for rank, late in late_counts.items()
+        if count and late / count > threshold
+    ]
+    return StragglerReport(
+        count, late_counts, wait_caused, stragglers
+    )
+
+
+def export_chrome_trace(traces: List[List[dict]], path: str):
+    """
+    Write per-rank timelines as a Chrome trace (chrome://tracing or
+    Perfetto), one process per rank. Time queued behind other
+    collectives shows up as a separate "queued" slice.
+    """
+    trace_events = []
+    for rank, events in enumerate(traces):
+        trace_events.append(
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": rank,
+                "args": {"name": f"rank {rank}"},
+            }
+        )
+        for event in events:
+            if event["end"] is None:
+                continue
+            args = {
+                "seq": event["seq"],
+                "nbytes": event["nbytes"],
+                "algorithm": event["algorithm"],
+            }
+            if event["start"] > event["enqueue"]:
+                trace_events.append(
+                    {
+                        "name": "queued",
+                        "cat": "queue",
+                        "ph": "X",
+                        "pid": rank,
+                        "tid": 0,
+                        "ts": event["enqueue"] * 1e6,
+                        "dur": (
+                            event["start"] - event["enqueue"]
+                        ) * 1e6,
+                        "args": args,
+                    }
+                )
+            trace_events.append(
+                {
+                    "name": event["op"],
+                    "cat": "collective",
+                    "ph": "X",
+                    "pid": rank,
+                    "tid": 0,
+                    "ts": event["start"] * 1e6,
+                    "dur": (event["end"] - event["start"]) * 1e6,
+                    "args": args,
+                }
+            )
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"traceEvents": trace_events}, f)
+
+
+def finish_tracing(
+    trace_path: Optional[str] = None, group=None
+) -> Optional[StragglerReport]:
+    """
+    End tracing at job end: gather every rank's timeline, log the
+    straggler report on rank 0 and optionally export a Chrome trace
+    there. Must be called on every rank.
+
+    Args:
+        trace_path (str, optional): Where rank 0 writes the Chrome trace.
+        group (ProcessGroup, optional): The process group. Default is the world group.
+
+    Returns:
+        StragglerReport or None: The report on rank 0, None elsewhere.
+    """
+    tracer = disable_tracing()
+    traces = gather_traces(tracer, group=group)
+    if dist.get_rank(group) != 0:
+        return None
+
+    report = straggler_report(traces)
+    for rank in report.stragglers:
+        logger.warning(
+            f"Rank {rank} arrived last at"
+            f" {report.late_counts[rank]} of"
+            f" {report.collectives} collectives, costing the other"
+            f" ranks {report.wait_caused[rank]:.3f}s of waiting."
+        )
+    if trace_path:
+        export_chrome_trace(traces, trace_path)
+        logger.info(f"Wrote collective trace to {trace_path}")
+    return report
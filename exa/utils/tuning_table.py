@@ -0,0 +1,156 @@
+import json
+import os
+from typing import Optional
+
+from loguru import logger
+
+# Where the tuning table lives unless EXA_TUNING_TABLE says otherwise
+DEFAULT_TUNING_TABLE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "exa", "collective_tuning.json"
+)
+
+TUNING_TABLE_VERSION = 1
+
+
+def size_bucket(nbytes: int) -> int:
+    """
+    Map a message size to its power-of-two bucket, i.e. the exponent of
+    the smallest power of two that is >= nbytes.
+    """
+    return max(0, int(nbytes) - 1).bit_length()
+
+
+class TuningTable:
+    """
+    Winning collective implementations per (collective, backend, world
+    size, dtype, size bucket), persisted as JSON so later job starts can
+    reuse them instead of re-tuning.
+
+    Args:
+        path (str, optional): JSON file backing the table. Defaults to
+            $EXA_TUNING_TABLE or ~/.cache/exa/collective_tuning.json.
+
+    Attributes:
+        entries (dict): Maps "collective|backend|world_size|dtype" to a
+            dict of {size bucket: choice}.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv(
+            "EXA_TUNING_TABLE", DEFAULT_TUNING_TABLE_PATH
+        )
+        self.entries = {}
+        self._cache = {}
+
+    @staticmethod
+    def _prefix(collective, backend, world_size, dtype) -> str:
+        return f"{collective}|{backend}|{world_size}|{dtype}"
+
+    def record(
+        self, collective, backend, world_size, dtype, nbytes, choice
+    ):
+        """Store the winning `choice` for one size bucket."""
+        prefix = self._prefix(collective, backend, world_size, dtype)
+        buckets = self.entries.setdefault(prefix, {})
+        buckets[size_bucket(nbytes)] = choice
+        self._cache.clear()
+
+    def lookup(
+        self,
+        collective,
+        backend,
+        world_size,
+        dtype,
+        nbytes,
+        default=None,
+    ):
+        """
+        Return the tuned choice for a message, using the nearest tuned
+        size bucket when the exact one was not measured.
+
+        Returns:
+            The stored choice, or `default` if nothing was tuned for
+            this collective, backend, world size and dtype.
+        """
+        bucket = size_bucket(nbytes)
+        key = (collective, backend, world_size, str(dtype), bucket)
+        if key in self._cache:
+            return self._cache[key]
+
+        choice = default
+        buckets = self.entries.get(
+            self._prefix(collective, backend, world_size, dtype)
+        )
+        if buckets:
+            nearest = min(buckets, key=lambda b: abs(b - bucket))
+            choice = buckets[nearest]
+        self._cache[key] = choice
+        return choice
+
+    def has(self, backend, world_size) -> bool:
+        """Return True if anything was tuned for this backend/world size."""
+        marker = f"|{backend}|{world_size}|"
+        return any(marker in prefix for prefix in self.entries)
+
+    def load(self) -> "TuningTable":
+        """Load the table from `path` if the file exists."""
+        if not os.path.exists(self.path):
+            return self
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable tuning table: {e}")
+            return self
+        if data.get("version") != TUNING_TABLE_VERSION:
+            logger.warning(
+                f"Ignoring tuning table {self.path} with version"
+                f" {data.get('version')}"
+            )
+            return self
+        self.entries = {
+            prefix: {int(b): choice for b, choice in buckets.items()}
+            for prefix, buckets in data.get("entries", {}).items()
+        }
+        self._cache.clear()
+        return self
+
+    def save(self):
+        """Write the table to `path`, replacing it atomically."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "version": TUNING_TABLE_VERSION,
+                    "entries": self.entries,
+                },
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+        os.replace(tmp_path, self.path)
+        logger.info(f"Saved collective tuning table to {self.path}")
+
+
+_tuning_table = None
+
+
+def get_tuning_table() -> TuningTable:
+    """
+    Return the process-wide tuning table. It starts empty and is never
+    read from disk here: every rank must pick the same algorithm, and
+    on hosts without a shared home directory each rank would read a
+    different file. ensure_tuned installs rank 0's persisted table on
+    every rank.
+    """
+    global _tuning_table
+    if _tuning_table is None:
+        _tuning_table = TuningTable()
+    return _tuning_table
+
+
+def set_tuning_table(table: Optional[TuningTable]):
+    """Replace the process-wide tuning table, or reset it with None."""
+    global _tuning_table
+    _tuning_table = table
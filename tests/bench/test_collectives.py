@@ -0,0 +1,79 @@
+import subprocess
+import sys
+
+import pytest
+
+from exa.bench.collectives import (
+    bus_bandwidth_factor,
+    compare_results,
+    launch,
+    percentile,
+)
+
+
+def test_bus_bandwidth_factor():
+    assert bus_bandwidth_factor("all_reduce", 4) == 1.5
+    assert bus_bandwidth_factor("all_gather", 4) == 0.75
+    assert bus_bandwidth_factor("reduce_scatter", 2) == 0.5
+    with pytest.raises(ValueError):
+        bus_bandwidth_factor("broadcast", 4)
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 90) == 3.0
+
+
+def _record(impl, p50):
+    return {
+        "collective": "all_reduce",
+        "implementation": impl,
+        "dtype": "float32",
+        "op": "sum",
+        "nbytes": 1024,
+        "p50_us": p50,
+    }
+
+
+def test_compare_results():
+    baseline = [_record("ring", 100.0), _record("tree", 100.0)]
+    current = [_record("ring", 150.0), _record("tree", 105.0)]
+    regressions = compare_results(baseline, current, tolerance=0.1)
+    assert [r["case"][1] for r in regressions] == ["ring"]
+
+
+def test_launch_reports_every_implementation():
+    results = launch(
+        2,
+        collectives=["all_reduce", "all_gather"],
+        sizes=[4096],
+        warmup=1,
+        iters=3,
+    )
+    impls = {(r["collective"], r["implementation"]) for r in results}
+    assert ("all_reduce", "torch") in impls
+    assert ("all_reduce", "ring") in impls
+    assert ("all_gather", "into") in impls
+    for r in results:
+        assert r["p50_us"] <= r["p99_us"]
+        assert r["busbw_gbps"] > 0
+
+
+def test_module_runs_as_main_without_warnings():
+    # The package must not import the module before runpy does
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-W",
+            "error::RuntimeWarning",
+            "-m",
+            "exa.bench.collectives",
+            "--help",
+        ],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert "RuntimeWarning" not in result.stderr
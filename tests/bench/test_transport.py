@@ -0,0 +1,19 @@
+from exa.bench.transport import (
+    format_transport_results,
+    run_transport_benchmark,
+)
+
+
+def test_run_transport_benchmark():
+    results = run_transport_benchmark(
+        sizes=[1024, 65536], warmup=1, iters=4
+    )
+    assert [(r["transport"], r["nbytes"]) for r in results] == [
+        ("queue", 1024),
+        ("queue", 65536),
+        ("shm", 1024),
+        ("shm", 65536),
+    ]
+    assert all(r["p50_us"] > 0 for r in results)
+    assert all(r["throughput_gbps"] > 0 for r in results)
+    assert "shm" in format_transport_results(results)
@@ -0,0 +1,43 @@
+import socket
+
+import pytest
+import torch.distributed as dist
+import torch.multiprocessing as mp
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _worker(rank, world_size, port, fn, args):
+    dist.init_process_group(
+        "gloo",
+        init_method=f"tcp://127.0.0.1:{port}",
+        rank=rank,
+        world_size=world_size,
+    )
+    try:
+        fn(rank, world_size, *args)
+    finally:
+        dist.destroy_process_group()
+
+
+def _run_distributed(fn, world_size, *args):
+    mp.spawn(
+        _worker,
+        args=(world_size, _free_port(), fn, args),
+        nprocs=world_size,
+        join=True,
+    )
+
+
+@pytest.fixture
+def run_distributed():
+    """
+    Launcher for `fn(rank, world_size, *args)` on `world_size` spawned
+    processes joined in a gloo group, called as
+    `run_distributed(fn, world_size, *args)`.
+    """
+    return _run_distributed
@@ -0,0 +1,188 @@
+import pytest
+import torch
+from torch import nn
+
+from exa.structs.hive_model import HivePool, mmap_model, share_model
+
+
+class Scale(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.weight = nn.Parameter(torch.ones(4))
+        self.register_buffer("offset", torch.zeros(4))
+
+    def forward(self, x):
+        return x * self.weight + self.offset
+
+
+class Doubler(nn.Module):
+    def forward(self, x):
+        if x.numel() == 0:
+            raise ValueError("empty input")
+        return x * 2
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = HivePool(Doubler, num_models_per_gpu=2, devices=["cpu"])
+    with pool:
+        yield pool
+
+
+def test_map_returns_results_in_input_order(pool):
+    inputs = [torch.full((3,), float(i)) for i in range(10)]
+    results = pool.map(inputs)
+    for data, result in zip(inputs, results):
+        torch.testing.assert_close(result, data * 2)
+
+
+def test_replicas_stay_resident(pool):
+    pids = [process.pid for process in pool.workers]
+    pool.map([torch.ones(1)] * 4)
+    pool.map([torch.ones(1)] * 4)
+    assert [process.pid for process in pool.workers] == pids
+    assert all(process.is_alive() for process in pool.workers)
+
+
+def test_imap_unordered_tags_results(pool):
+    inputs = [torch.full((2,), float(i)) for i in range(6)]
+    seen = {}
+    for index, result in pool.imap_unordered(inputs):
+        seen[index] = result
+    assert sorted(seen) == list(range(6))
+    for index, result in seen.items():
+        torch.testing.assert_close(result, inputs[index] * 2)
+
+
+def test_errors_reach_the_caller(pool):
+    with pytest.raises(RuntimeError, match="empty input"):
+        pool.submit(torch.empty(0)).result(timeout=30)
+    # The worker survives the failed request
+    result = pool.submit(torch.ones(1)).result(timeout=30)
+    torch.testing.assert_close(result, torch.full((1,), 2.0))
+
+
+def test_submitted_requests_cannot_be_cancelled(pool):
+    future = pool.submit(torch.ones(1))
+    assert not future.cancel()
+    torch.testing.assert_close(
+        future.result(timeout=30), torch.full((1,), 2.0)
+    )
+
+
+def test_stray_results_are_dropped(pool):
+    # As sent by a worker after it was found dead
+    pool.output_queue.put((-1, torch.ones(1), None))
+    result = pool.submit(torch.ones(1)).result(timeout=30)
+    torch.testing.assert_close(result, torch.full((1,), 2.0))
+
+
+class _BrokenQueue:
+    def put(self, message):
+        raise OSError("queue closed")
+
+
+def test_failed_send_is_rolled_back():
+    with HivePool(Doubler, devices=["cpu"]) as pool:
+        input_queue = pool.input_queues[0]
+        pool.input_queues[0] = _BrokenQueue()
+        with pytest.raises(OSError):
+            pool.submit(torch.ones(1))
+        assert pool._pending == {}
+        assert pool._outstanding == [0]
+        pool.input_queues[0] = input_queue
+        result = pool.submit(torch.ones(1)).result(timeout=30)
+    torch.testing.assert_close(result, torch.full((1,), 2.0))
+
+
+def test_closed_pool_rejects_work():
+    pool = HivePool(Doubler, devices=["cpu"])
+    pool.close()
+    assert not any(process.is_alive() for process in pool.workers)
+    with pytest.raises(RuntimeError):
+        pool.submit(torch.ones(1))
+
+
+def test_shared_memory_transport_matches_queues():
+    inputs = [torch.randn(64, 8) for _ in range(12)]
+    # The last input does not fit a slot and falls back to the queues
+    inputs.append(torch.randn(1024, 8))
+    pool = HivePool(
+        Doubler, devices=["cpu"], shm_slots=2, shm_slot_bytes=4096
+    )
+    with pool:
+        results = pool.map(inputs)
+        with pytest.raises(RuntimeError, match="empty input"):
+            pool.submit(torch.empty(0)).result(timeout=30)
+    for data, result in zip(inputs, results):
+        torch.testing.assert_close(result, data * 2)
+
+
+class Pair(nn.Module):
+    def forward(self, x):
+        return x, x * 2
+
+
+def test_queued_outputs_do_not_alias_input_slots():
+    # Tuples go through the queue, and the first element is the input
+    inputs = [torch.full((16,), float(i)) for i in range(20)]
+    pool = HivePool(
+        Pair, devices=["cpu"], shm_slots=1, shm_slot_bytes=4096
+    )
+    with pool:
+        results = pool.map(inputs)
+    for data, (same, double) in zip(inputs, results):
+        torch.testing.assert_close(same, data)
+        torch.testing.assert_close(double, data * 2)
+
+
+def test_replicas_share_one_copy_of_the_weights():
+    model = share_model(Scale())
+    assert model.weight.is_shared() and model.offset.is_shared()
+    assert not model.weight.requires_grad
+    pool = HivePool(model, num_models_per_gpu=2, devices=["cpu"])
+    with pool:
+        torch.testing.assert_close(
+            pool.map([torch.ones(4)] * 2), [torch.ones(4)] * 2
+        )
+        # Every replica reads the parent's storage, not a copy
+        with torch.no_grad():
+            model.weight.fill_(3.0)
+        torch.testing.assert_close(
+            pool.map([torch.ones(4)] * 4), [torch.full((4,), 3.0)] * 4
+        )
+
+
+def test_mmap_model_loads_weights_from_a_checkpoint(tmp_path):
+    reference = Scale()
+    with torch.no_grad():
+        reference.weight.copy_(torch.arange(4.0))
+        reference.offset.fill_(1.0)
+    path = str(tmp_path / "scale.pt")
+    torch.save(reference.state_dict(), path)
+
+    factory = mmap_model(Scale, path)
+    loaded = factory()
+    torch.testing.assert_close(loaded.weight, reference.weight)
+    with HivePool(factory, devices=["cpu"]) as pool:
+        result = pool.submit(torch.ones(4)).result(timeout=30)
+    torch.testing.assert_close(result, torch.arange(4.0) + 1)
+
+
+class Rotary(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.weight = nn.Parameter(torch.ones(4))
+        self.register_buffer(
+            "cache", torch.arange(4.0), persistent=False
+        )
+
+    def forward(self, x):
+        return x * self.weight + self.cache
+
+
+def test_mmap_model_rejects_non_persistent_buffers(tmp_path):
+    path = str(tmp_path / "rotary.pt")
+    torch.save(Rotary().state_dict(), path)
+    with pytest.raises(ValueError, match="cache"):
+        mmap_model(Rotary, path)()
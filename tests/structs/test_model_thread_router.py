@@ -0,0 +1,296 @@
+import asyncio
+import inspect
+import time
+from queue import Queue
+
+import pytest
+import torch
+
+from exa.structs.model_thread_router import (
+    EWMALatencyPolicy,
+    LeastOutstandingPolicy,
+    ModelThreadWorker,
+    PowerOfTwoChoicesPolicy,
+    Router,
+)
+
+
+class CountingModel:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, x):
+        self.calls.append(x.shape[0])
+        return x * 2
+
+
+def _submit(queue, tasks):
+    responses = []
+    for task in tasks:
+        response = Queue()
+        queue.put((task, response, time.perf_counter()))
+        responses.append(response)
+    return responses
+
+
+def test_worker_batches_queued_requests():
+    model = CountingModel()
+    queue = Queue()
+    tasks = [torch.full((1, 3), float(i)) for i in range(6)]
+    # Queue everything before the worker starts so it sees one backlog
+    responses = _submit(queue, tasks)
+    worker = ModelThreadWorker(
+        0,
+        0,
+        queue,
+        model=model,
+        max_batch_size=4,
+        batch_dim=0,
+        max_wait_ms=50,
+    )
+
+    for task, response in zip(tasks, responses):
+        torch.testing.assert_close(response.get(timeout=5), task * 2)
+    queue.put(None)
+    worker.thread.join(timeout=5)
+
+    assert model.calls == [4, 2]
+    stats = worker.stats()
+    assert stats["requests"] == 6
+    assert stats["batches"] == 2
+    assert stats["batch_sizes"] == {2: 1, 4: 1}
+    assert stats["mean_queue_delay_ms"] >= 0.0
+
+
+def test_batching_parameters_are_keyword_only():
+    parameters = inspect.signature(ModelThreadWorker).parameters
+    for name in ("max_batch_size", "batch_dim", "max_wait_ms"):
+        assert parameters[name].kind is inspect.Parameter.KEYWORD_ONLY
+
+
+def test_worker_without_batching_runs_one_by_one():
+    model = CountingModel()
+    queue = Queue()
+    tasks = [torch.ones(2, 3) for _ in range(3)]
+    responses = _submit(queue, tasks)
+    worker = ModelThreadWorker(0, 0, queue, model=model)
+    for response in responses:
+        assert response.get(timeout=5).shape == (2, 3)
+    queue.put(None)
+    worker.thread.join(timeout=5)
+    assert model.calls == [2, 2, 2]
+
+
+def test_worker_returns_errors_to_requesters():
+    def failing(x):
+        raise ValueError("bad input")
+
+    queue = Queue()
+    responses = _submit(queue, [torch.ones(1), torch.ones(1)])
+    worker = ModelThreadWorker(
+        0, 0, queue, model=failing, max_batch_size=2, batch_dim=0
+    )
+    for response in responses:
+        assert isinstance(response.get(timeout=5), ValueError)
+    queue.put(None)
+    worker.thread.join(timeout=5)
+
+
+def test_batching_needs_batch_dim():
+    with pytest.raises(ValueError):
+        ModelThreadWorker(0, 0, Queue(), max_batch_size=2)
+
+
+def test_worker_batches_along_batch_dim():
+    model = CountingModel()
+    queue = Queue()
+    tasks = [torch.full((3, 1), float(i)) for i in range(2)]
+    responses = _submit(queue, tasks)
+    worker = ModelThreadWorker(
+        0,
+        0,
+        queue,
+        model=model,
+        max_batch_size=2,
+        batch_dim=1,
+        max_wait_ms=50,
+    )
+    for task, response in zip(tasks, responses):
+        torch.testing.assert_close(response.get(timeout=5), task * 2)
+    queue.put(None)
+    worker.thread.join(timeout=5)
+    # One forward pass over both requests, concatenated along dim 1
+    assert model.calls == [3]
+
+
+def test_failed_batch_falls_back_to_single_requests():
+    def picky(x):
+        if (x < 0).any():
+            raise ValueError("negative input")
+        return x + 1
+
+    queue = Queue()
+    tasks = [torch.ones(1), -torch.ones(1), torch.zeros(1)]
+    responses = _submit(queue, tasks)
+    worker = ModelThreadWorker(
+        0,
+        0,
+        queue,
+        model=picky,
+        max_batch_size=3,
+        batch_dim=0,
+        max_wait_ms=50,
+    )
+    results = [response.get(timeout=5) for response in responses]
+    queue.put(None)
+    worker.thread.join(timeout=5)
+    # Only the bad request fails, the others still get their output
+    torch.testing.assert_close(results[0], torch.full((1,), 2.0))
+    assert isinstance(results[1], ValueError)
+    torch.testing.assert_close(results[2], torch.ones(1))
+
+
+class FakeWorker:
+    def __init__(self, in_flight, ewma_latency=None):
+        self.in_flight = in_flight
+        self.ewma_latency = ewma_latency
+
+    def expected_latency(self):
+        return (self.in_flight + 1) * (self.ewma_latency or 0.0)
+
+
+def test_least_outstanding_policy():
+    policy = LeastOutstandingPolicy()
+    busy, idle = FakeWorker(3), FakeWorker(1)
+    assert policy.select([busy, idle]) is idle
+
+    # Ties rotate instead of always picking the first worker
+    workers = [FakeWorker(0) for _ in range(3)]
+    picked = {id(policy.select(workers)) for _ in range(3)}
+    assert len(picked) == 3
+
+
+def test_power_of_two_choices_policy():
+    policy = PowerOfTwoChoicesPolicy(seed=0)
+    busy, idle = FakeWorker(5), FakeWorker(0)
+    assert all(policy.select([busy, idle]) is idle for _ in range(10))
+
+
+def test_ewma_latency_policy():
+    policy = EWMALatencyPolicy()
+    slow = FakeWorker(1, ewma_latency=1.0)
+    fast = FakeWorker(3, ewma_latency=0.1)
+    assert policy.select([slow, fast]) is fast
+    new = FakeWorker(0)
+    assert policy.select([slow, fast, new]) is new
+
+
+class SlowModel:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def __call__(self, x):
+        time.sleep(self.delay)
+        return x + 1
+
+
+@pytest.mark.parametrize(
+    "policy", ["least_outstanding", "power_of_two", "ewma_latency"]
+)
+def test_router_spreads_and_never_refuses(policy):
+    router = Router(
+        num_workers_per_gpu=2,
+        model=SlowModel(0.01),
+        policy=policy,
+        max_queue_size=1,
+    )
+    try:
+        responses = [
+            router.route_task(torch.tensor([float(i)]))
+            for i in range(10)
+        ]
+        assert all(r is not None for r in responses)
+        results = [r.get(timeout=5) for r in responses]
+        expected = [i + 1 for i in range(10)]
+        assert [float(r) for r in results] == expected
+        stats = router.stats()
+        assert all(s["requests"] > 0 for s in stats.values())
+        assert all(s["in_flight"] == 0 for s in stats.values())
+    finally:
+        router.shutdown()
+
+
+def test_route_task_times_out_when_full():
+    router = Router(
+        num_workers_per_gpu=1, model=SlowModel(0.2), max_queue_size=1
+    )
+    try:
+        first = router.route_task(torch.ones(1))
+        # Wait until the worker holds the first request
+        while router.workers[0].queue.qsize():
+            time.sleep(0.001)
+        assert router.route_task(torch.ones(1)) is not None
+        assert router.route_task(torch.ones(1), timeout=0.01) is None
+        assert first.get(timeout=5) is not None
+    finally:
+        router.shutdown()
+
+
+def test_router_rejects_unknown_policy():
+    with pytest.raises(ValueError):
+        Router(model=SlowModel(0), policy="random")
+
+
+def test_submit_returns_future():
+    with Router(model=SlowModel(0)) as router:
+        future = router.submit(torch.zeros(2))
+        torch.testing.assert_close(
+            future.result(timeout=5), torch.ones(2)
+        )
+
+
+def test_submit_propagates_errors():
+    def failing(x):
+        raise ValueError("bad input")
+
+    with Router(model=failing) as router:
+        with pytest.raises(ValueError):
+            router.submit(torch.zeros(1)).result(timeout=5)
+
+
+def test_asubmit_from_one_event_loop():
+    async def run(router):
+        return await asyncio.gather(
+            *(
+                router.asubmit(torch.tensor([float(i)]))
+                for i in range(20)
+            )
+        )
+
+    router = Router(
+        num_workers_per_gpu=2,
+        model=SlowModel(0.001),
+        max_queue_size=2,
+    )
+    with router:
+        results = asyncio.run(run(router))
+    assert [float(r) for r in results] == [i + 1 for i in range(20)]
+
+
+def test_map_keeps_order_and_bounds_in_flight():
+    model = SlowModel(0.001)
+    with Router(num_workers_per_gpu=2, model=model) as router:
+        submitted = []
+
+        def tasks():
+            for i in range(12):
+                submitted.append(i)
+                yield torch.tensor([float(i)])
+
+        results = router.map(tasks(), max_in_flight=3)
+        first = next(results)
+        assert float(first) == 1
+        # Only the first window was submitted before the first result
+        assert len(submitted) <= 4
+        rest = [float(r) for r in results]
+    assert rest == [i + 1 for i in range(1, 12)]
@@ -0,0 +1,94 @@
+import pytest
+import torch
+from torch import nn
+
+from exa.structs.pipeline_parallel import (
+    PipelineRunner,
+    PipelineStats,
+    balance_costs,
+    partition_sequential,
+)
+
+
+def _model():
+    torch.manual_seed(0)
+    return nn.Sequential(
+        nn.Linear(8, 16),
+        nn.ReLU(),
+        nn.Linear(16, 16),
+        nn.ReLU(),
+        nn.Linear(16, 6),
+        nn.Linear(6, 4),
+    )
+
+
+def test_balance_costs_minimizes_bottleneck():
+    assert balance_costs([1, 1, 1, 1], 2) == [2, 2]
+    assert balance_costs([4, 1, 1, 1, 1], 2) == [1, 4]
+    assert balance_costs([1, 2, 3], 3) == [1, 1, 1]
+
+
+def test_partition_sequential():
+    model = _model()
+    stages = partition_sequential(model, 3, balance=[2, 2, 2])
+    assert [len(s) for s in stages] == [2, 2, 2]
+    x = torch.randn(5, 8)
+    y = x
+    for stage in stages:
+        y = stage(y)
+    assert torch.equal(y, model(x))
+
+    assert sum(len(s) for s in partition_sequential(model, 3)) == 6
+    with pytest.raises(ValueError):
+        partition_sequential(model, 2, balance=[3, 2])
+
+
+def test_pipeline_stats():
+    stats = PipelineStats([1.0, 0.5], [2.0, 2.0], micro_batches=3)
+    assert stats.stage_utilization == [0.5, 0.25]
+    assert stats.bubble_fraction == pytest.approx(0.625)
+    assert stats.ideal_bubble_fraction == pytest.approx(0.25)
+
+
+def _check_pipeline(rank, world_size, balance):
+    model = _model()
+    x = torch.randn(10, 8)
+    with torch.no_grad():
+        expected = model(x)
+
+    runner = PipelineRunner(model, balance=balance)
+    outputs = runner.run(
+        x if rank == 0 else None, num_micro_batches=4
+    )
+    if runner.is_last:
+        assert len(outputs) == 4
+        torch.testing.assert_close(torch.cat(outputs), expected)
+    else:
+        assert outputs is None
+
+    stats = runner.stats()
+    assert stats.micro_batches == 4
+    assert len(stats.stage_utilization) == world_size
+    assert all(0.0 <= u <= 1.0 for u in stats.stage_utilization)
+    assert 0.0 <= stats.bubble_fraction <= 1.0
+
+
+def test_pipeline_matches_sequential(run_distributed):
+    run_distributed(_check_pipeline, 3, None)
+    run_distributed(_check_pipeline, 2, [4, 2])
+
+
+def _check_micro_batch_list(rank, world_size):
+    model = _model()
+    inputs = [torch.randn(n, 8) for n in (3, 1, 2)]
+    runner = PipelineRunner(model)
+    outputs = runner.run(inputs if rank == 0 else None)
+    if runner.is_last:
+        with torch.no_grad():
+            expected = [model(x) for x in inputs]
+        for out, ref in zip(outputs, expected):
+            torch.testing.assert_close(out, ref)
+
+
+def test_pipeline_micro_batch_list(run_distributed):
+    run_distributed(_check_micro_batch_list, 2)
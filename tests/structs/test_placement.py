@@ -0,0 +1,107 @@
+import pytest
+import torch
+from torch import nn
+
+from exa.structs.pipeline_parallel import partition_sequential
+from exa.structs.placement import (
+    LayerProfile,
+    apply_device_map,
+    auto_partition,
+    plan_partition,
+    profile_layers,
+)
+
+
+class Stack(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.embed = nn.Linear(4, 8)
+        self.layers = nn.ModuleList(nn.Linear(8, 8) for _ in range(4))
+        self.head = nn.Linear(8, 2)
+
+    def forward(self, x):
+        x = self.embed(x)
+        for layer in self.layers:
+            x = torch.relu(layer(x))
+        return self.head(x)
+
+
+def test_profile_layers_in_execution_order():
+    torch.manual_seed(0)
+    model = Stack()
+    profiles = profile_layers(model, torch.randn(3, 4))
+    assert [p.name for p in profiles] == [
+        "embed",
+        "layers.0",
+        "layers.1",
+        "layers.2",
+        "layers.3",
+        "head",
+    ]
+    assert profiles[0].param_bytes == (4 * 8 + 8) * 4
+    assert profiles[0].input_bytes == 3 * 4 * 4
+    assert profiles[0].activation_bytes == 3 * 8 * 4
+    assert all(
+        p.latency is not None and p.latency >= 0 for p in profiles
+    )
+
+
+def test_profile_layers_on_meta():
+    with torch.device("meta"):
+        model = Stack()
+    profiles = profile_layers(model, torch.randn(3, 4))
+    assert profiles[-1].activation_bytes == 3 * 2 * 4
+    assert all(p.latency is None for p in profiles)
+
+
+def test_plan_partition_minimizes_slowest_stage():
+    profiles = [
+        LayerProfile(str(i), 10, 0, 0, latency)
+        for i, latency in enumerate([4.0, 1.0, 1.0, 1.0, 1.0])
+    ]
+    plan = plan_partition(profiles, {"a": 100, "b": 100})
+    assert plan.balance == [1, 4]
+    assert plan.stage_cost == [4.0, 4.0]
+    assert plan.device_map["0"] == "a"
+    assert plan.device_map["4"] == "b"
+
+
+def test_plan_partition_respects_budgets():
+    profiles = [LayerProfile(str(i), 10, 1, 1, 1.0) for i in range(6)]
+    # Balanced would be 3 + 3, but "a" only holds two layers
+    plan = plan_partition(profiles, {"a": 22, "b": 100})
+    assert plan.balance == [2, 4]
+    assert plan.stage_memory == [22, 42]
+
+    with pytest.raises(RuntimeError):
+        plan_partition(profiles, {"a": 22, "b": 22})
+
+
+def test_plan_partition_skips_unneeded_devices():
+    profiles = [LayerProfile("only", 10, 0, 0, 1.0)]
+    plan = plan_partition(profiles, {"a": 100, "b": 100})
+    assert plan.devices == ["a"] or plan.devices == ["b"]
+    assert plan.balance == [1]
+
+
+def test_apply_device_map_keeps_outputs():
+    torch.manual_seed(0)
+    model = Stack()
+    x = torch.randn(3, 4)
+    with torch.no_grad():
+        expected = model(x)
+    plan = auto_partition(model, x, budgets={"cpu": 2**20})
+    apply_device_map(model, plan.device_map)
+    with torch.no_grad():
+        torch.testing.assert_close(model(x), expected)
+
+
+def test_plan_balance_splits_sequential():
+    model = nn.Sequential(*[nn.Linear(8, 8) for _ in range(4)])
+    plan = auto_partition(
+        model, torch.randn(2, 8), budgets={0: 2**20, 1: 2**20}
+    )
+    stages = partition_sequential(
+        model, len(plan.balance), plan.balance
+    )
+    assert sum(len(s) for s in stages) == 4
@@ -0,0 +1,50 @@
+import pickle
+
+import pytest
+import torch
+
+from exa.structs.shm_transport import ShmTensorRing, SlotRef
+
+
+@pytest.fixture
+def rings():
+    writer = ShmTensorRing(num_slots=2, slot_bytes=1024)
+    reader = ShmTensorRing.attach(writer.handle())
+    yield writer, reader
+    reader.close()
+    writer.close()
+
+
+def test_put_get_release_roundtrip(rings):
+    writer, reader = rings
+    tensor = torch.arange(12, dtype=torch.float32).view(3, 4)
+    ref = pickle.loads(pickle.dumps(writer.put(tensor.t())))
+    view = reader.get(ref)
+    torch.testing.assert_close(view, tensor.t())
+    assert view.shape == (4, 3)
+    reader.release(ref)
+
+
+def test_slots_are_reused_after_release(rings):
+    writer, reader = rings
+    first = writer.put(torch.ones(4))
+    second = writer.put(torch.zeros(4, dtype=torch.int64))
+    assert {first.slot, second.slot} == {0, 1}
+    with pytest.raises(RuntimeError):
+        writer.put(torch.ones(4), timeout=0.01)
+    reader.release(first)
+    assert writer.put(torch.ones(4)).slot == first.slot
+
+
+def test_put_rejects_oversized_tensors(rings):
+    writer, _ = rings
+    big = torch.zeros(1024, dtype=torch.float32)
+    assert not writer.fits(big)
+    with pytest.raises(ValueError):
+        writer.put(big)
+
+
+def test_slot_ref_repr():
+    ref = SlotRef(1, torch.float16, torch.Size([2, 3]))
+    assert ref.shape == (2, 3)
+    assert "slot=1" in repr(ref)
@@ -0,0 +1,107 @@
+import torch
+from torch import nn
+
+from exa.structs.tensor_parallel import (
+    ColumnParallelLinear,
+    RowParallelLinear,
+    load_sharded_state_dict,
+    tensor_parallelize,
+)
+
+
+class MLP(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.up_proj = nn.Linear(8, 16)
+        self.down_proj = nn.Linear(16, 6)
+        self.head = nn.Linear(6, 4)
+
+    def forward(self, x):
+        return self.head(self.down_proj(torch.relu(self.up_proj(x))))
+
+
+def _reference():
+    torch.manual_seed(0)
+    model = MLP()
+    x = torch.randn(3, 5, 8)
+    with torch.no_grad():
+        return model, x, model(x)
+
+
+def _check_parallelize(rank, world_size):
+    model, x, expected = _reference()
+    tensor_parallelize(model)
+    assert isinstance(model.up_proj, ColumnParallelLinear)
+    assert isinstance(model.down_proj, RowParallelLinear)
+    assert isinstance(model.head, nn.Linear)
+    assert model.up_proj.weight.shape == (16 // world_size, 8)
+    assert model.down_proj.weight.shape == (6, 16 // world_size)
+    with torch.no_grad():
+        torch.testing.assert_close(model(x), expected)
+
+    gathered = tensor_parallelize(
+        _reference()[0], {"up_proj": "column_gather"}
+    )
+    with torch.no_grad():
+        torch.testing.assert_close(
+            gathered.up_proj(x), _reference()[0].up_proj(x)
+        )
+
+
+def test_tensor_parallel_matches_reference(run_distributed):
+    run_distributed(_check_parallelize, 2)
+
+
+def _check_sequence_parallel(rank, world_size):
+    model, x, _ = _reference()
+    x = x.reshape(-1, 8)[:14]
+    with torch.no_grad():
+        expected = model.down_proj(torch.relu(model.up_proj(x)))
+    tensor_parallelize(model, sequence_parallel=True)
+
+    # Every rank starts with its own rows of the activations
+    rows = x.shape[0] // world_size
+    local = x[rank * rows : (rank + 1) * rows]
+    with torch.no_grad():
+        out = model.down_proj(torch.relu(model.up_proj(local)))
+    torch.testing.assert_close(
+        out, torch.tensor_split(expected, world_size)[rank]
+    )
+
+    # Row counts that do not divide the group size
+    local = torch.tensor_split(x[:13], world_size)[rank]
+    with torch.no_grad():
+        out = model.down_proj(torch.relu(model.up_proj(local)))
+    torch.testing.assert_close(
+        out, torch.tensor_split(expected[:13], world_size)[rank]
+    )
+
+
+def test_sequence_parallel_matches_reference(run_distributed):
+    run_distributed(_check_sequence_parallel, 2)
+
+
+def _check_sharded_load(rank, world_size, path):
+    _, x, expected = _reference()
+    with torch.device("meta"):
+        model = MLP()
+    tensor_parallelize(model)
+    load_sharded_state_dict(model, path)
+
+    # Loading shards a copy, the full checkpoint dict is reusable
+    state_dict = _reference()[0].state_dict()
+    full_shapes = {k: v.shape for k, v in state_dict.items()}
+    with torch.device("meta"):
+        other = tensor_parallelize(MLP())
+    other.load_state_dict(state_dict, assign=True)
+    assert {k: v.shape for k, v in state_dict.items()} == full_shapes
+    assert model.up_proj.weight.shape == (16 // world_size, 8)
+    assert all(p.device.type == "cpu" for p in model.parameters())
+    with torch.no_grad():
+        torch.testing.assert_close(model(x), expected)
+
+
+def test_load_sharded_state_dict(tmp_path, run_distributed):
+    path = str(tmp_path / "mlp.pt")
+    torch.save(_reference()[0].state_dict(), path)
+    run_distributed(_check_sharded_load, 2, path)
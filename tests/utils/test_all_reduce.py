@@ -0,0 +1,289 @@
+import pytest
+import torch
+import torch.distributed as dist
+
+from exa.utils.all_reduce import (
+    fused_all_reduce,
+    fused_all_reduce_coalesced,
+    fused_all_reduce_v1,
+    fused_all_reduce_v2,
+    hierarchical_all_reduce,
+    select_all_reduce_algorithm,
+)
+from exa.utils.compression import (
+    CastCompressor,
+    Compressor,
+    PowerSGDCompressor,
+    TopKCompressor,
+    compressed_all_reduce,
+)
+from exa.utils.shm_collectives import (
+    get_shm_communicator,
+    shm_all_gather,
+    shm_all_reduce,
+)
+from exa.utils.topology import get_node_topology
+
+
+def _inputs(world_size, numel):
+    return [
+        torch.arange(numel, dtype=torch.float64) + r + 1
+        for r in range(world_size)
+    ]
+
+
+def _expected(inputs, op):
+    stacked = torch.stack(inputs)
+    if op == dist.ReduceOp.SUM:
+        return stacked.sum(0)
+    if op == dist.ReduceOp.PRODUCT:
+        return stacked.prod(0)
+    if op == dist.ReduceOp.MAX:
+        return stacked.max(0).values
+    return stacked.min(0).values
+
+
+def _check_ring(rank, world_size, numel, op_name):
+    op = getattr(dist.ReduceOp, op_name)
+    inputs = _inputs(world_size, numel)
+    tensor = inputs[rank].clone()
+    fused_all_reduce_v1(tensor, op)
+    torch.testing.assert_close(tensor, _expected(inputs, op))
+
+
+@pytest.mark.parametrize("world_size", [2, 3])
+@pytest.mark.parametrize("numel", [1, 7, 50_000])
+@pytest.mark.parametrize("op_name", ["SUM", "PRODUCT", "MAX", "MIN"])
+def test_fused_all_reduce_v1_matches_reference(
+    world_size, numel, op_name, run_distributed
+):
+    run_distributed(_check_ring, world_size, numel, op_name)
+
+
+def _check_ring_non_contiguous(rank, world_size):
+    inputs = [
+        torch.full((4, 6), float(r + 1)) for r in range(world_size)
+    ]
+    tensor = inputs[rank].clone().t()
+    fused_all_reduce_v1(tensor)
+    total = float(sum(range(1, world_size + 1)))
+    expected = torch.full((6, 4), total)
+    torch.testing.assert_close(tensor, expected)
+
+
+def test_fused_all_reduce_v1_non_contiguous(run_distributed):
+    run_distributed(_check_ring_non_contiguous, 2)
+
+
+def _check_coalesced(rank, world_size):
+    shapes = [(3,), (2, 5), (1,), (7, 3), (64,)]
+    dtypes = [torch.float32, torch.float64, torch.int64]
+    tensors = [
+        torch.full(shape, rank + 1, dtype=dtypes[i % len(dtypes)])
+        for i, shape in enumerate(shapes)
+    ]
+    # Tiny buckets force several buckets per dtype
+    fused_all_reduce_coalesced(tensors, bucket_size_bytes=64)
+    total = sum(range(1, world_size + 1))
+    for i, (shape, tensor) in enumerate(zip(shapes, tensors)):
+        expected = torch.full(shape, total, dtype=dtypes[i % 3])
+        torch.testing.assert_close(tensor, expected)
+
+
+def test_fused_all_reduce_coalesced(run_distributed):
+    run_distributed(_check_coalesced, 3)
+
+
+def _check_async(rank, world_size):
+    first = torch.full((10_000,), float(rank + 1))
+    second = torch.full((5,), float(rank + 1))
+    work = fused_all_reduce_v1(first, async_op=True)
+    doubled = work.then(lambda t: t * 2)
+    builtin = fused_all_reduce_v2(second, async_op=True)
+    # A blocking ring issued meanwhile must queue behind the async one
+    third = fused_all_reduce_v1(torch.ones(3))
+    coalesced = fused_all_reduce_coalesced(
+        [torch.ones(2), torch.ones(3, dtype=torch.int64)],
+        bucket_size_bytes=1024,
+        all_reduce_fn=fused_all_reduce_v1,
+        async_op=True,
+    )
+
+    total = float(sum(range(1, world_size + 1)))
+    assert work.wait() is first
+    torch.testing.assert_close(first, torch.full((10_000,), total))
+    torch.testing.assert_close(
+        doubled.wait(), torch.full((10_000,), 2 * total)
+    )
+    torch.testing.assert_close(
+        builtin.wait(), torch.full((5,), total)
+    )
+    expected = float(world_size)
+    torch.testing.assert_close(third, torch.full((3,), expected))
+    ones, ints = coalesced.wait()
+    torch.testing.assert_close(ones, torch.full((2,), expected))
+    assert ints.tolist() == [world_size] * 3
+
+
+def test_async_all_reduce(run_distributed):
+    run_distributed(_check_async, 2)
+
+
+def _check_algorithm(rank, world_size, algorithm, numel, op_name):
+    op = getattr(dist.ReduceOp, op_name)
+    inputs = _inputs(world_size, numel)
+    tensor = inputs[rank].clone()
+    fused_all_reduce(tensor, op, algorithm=algorithm)
+    torch.testing.assert_close(tensor, _expected(inputs, op))
+
+
+@pytest.mark.parametrize("world_size", [2, 3, 4, 5])
+@pytest.mark.parametrize(
+    "algorithm", ["tree", "halving_doubling", "builtin", "auto"]
+)
+@pytest.mark.parametrize("numel", [1, 3, 1001])
+def test_fused_all_reduce_algorithms(
+    world_size, algorithm, numel, run_distributed
+):
+    run_distributed(
+        _check_algorithm, world_size, algorithm, numel, "SUM"
+    )
+
+
+@pytest.mark.parametrize("op_name", ["PRODUCT", "MAX", "MIN"])
+def test_halving_doubling_ops(op_name, run_distributed):
+    run_distributed(
+        _check_algorithm, 6, "halving_doubling", 17, op_name
+    )
+
+
+def test_select_all_reduce_algorithm():
+    assert select_all_reduce_algorithm(4, 8, "gloo") == "tree"
+    assert (
+        select_all_reduce_algorithm(64 * 1024, 8, "gloo")
+        == "halving_doubling"
+    )
+    assert (
+        select_all_reduce_algorithm(64 * 1024 * 1024, 8, "gloo")
+        == "ring"
+    )
+    assert select_all_reduce_algorithm(4, 8, "nccl") == "builtin"
+    assert select_all_reduce_algorithm(4, 1, "gloo") == "builtin"
+    assert (
+        select_all_reduce_algorithm(
+            4, 8, "gloo", thresholds={"tree_max_bytes": 0}
+        )
+        == "halving_doubling"
+    )
+
+
+def _check_hierarchical(rank, world_size, nodes):
+    topology = get_node_topology(nodes=nodes)
+    assert topology.num_nodes == len(nodes)
+    assert get_node_topology(nodes=nodes) is topology
+
+    inputs = _inputs(world_size, 1000)
+    tensor = inputs[rank].clone()
+    hierarchical_all_reduce(tensor, topology=topology)
+    torch.testing.assert_close(
+        tensor, _expected(inputs, dist.ReduceOp.SUM)
+    )
+
+
+@pytest.mark.parametrize(
+    "nodes", [[[0, 1], [2, 3]], [[0, 2], [1, 3]], [[0, 1, 2], [3]]]
+)
+def test_hierarchical_all_reduce_two_simulated_nodes(
+    nodes, run_distributed
+):
+    run_distributed(_check_hierarchical, 4, nodes)
+
+
+def test_select_hierarchical_for_multi_node():
+    assert (
+        select_all_reduce_algorithm(1 << 20, 8, "gloo", num_nodes=2)
+        == "hierarchical"
+    )
+    assert (
+        select_all_reduce_algorithm(4, 8, "gloo", num_nodes=2)
+        == "tree"
+    )
+
+
+def _check_shm(rank, world_size, op_name):
+    op = getattr(dist.ReduceOp, op_name)
+    communicator = get_shm_communicator()
+    assert communicator is not None
+
+    # Larger than a slot so it goes through in chunks
+    slot_bytes = communicator.slot_bytes
+    for numel in [1, 5, 2_000_000]:
+        inputs = _inputs(world_size, numel)
+        tensor = inputs[rank].clone()
+        shm_all_reduce(tensor, op)
+        torch.testing.assert_close(tensor, _expected(inputs, op))
+    # The segment keeps the size it was created with
+    assert communicator.slot_bytes == slot_bytes
+
+    for shape in [(2, 3), (3, 1_000_000)]:
+        tensor = torch.full(shape, float(rank))
+        gathered = shm_all_gather([None] * world_size, tensor)
+        for peer, piece in enumerate(gathered):
+            torch.testing.assert_close(
+                piece, torch.full(shape, float(peer))
+            )
+
+    work = shm_all_reduce(torch.ones(4), async_op=True)
+    torch.testing.assert_close(
+        work.wait(), torch.full((4,), float(world_size))
+    )
+
+
+@pytest.mark.parametrize("op_name", ["SUM", "MAX"])
+def test_shm_collectives(op_name, run_distributed):
+    run_distributed(_check_shm, 3, op_name)
+
+
+def test_compressor_requires_all_reduce():
+    class Incomplete(Compressor):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def _check_compression(rank, world_size):
+    torch.manual_seed(rank)
+    dense = torch.randn(64, 32)
+    reference = dense.clone()
+    dist.all_reduce(reference)
+
+    cast = dense.clone()
+    stats = compressed_all_reduce(
+        cast, CastCompressor(torch.bfloat16)
+    )
+    assert stats.ratio == 2
+    assert stats.bytes_saved == dense.numel() * 2
+    torch.testing.assert_close(cast, reference, rtol=2e-2, atol=5e-2)
+
+    # Error feedback: summed over calls nothing is lost
+    for compressor in [
+        TopKCompressor(ratio=0.1),
+        TopKCompressor(ratio=0.1, random=True),
+        PowerSGDCompressor(rank=2),
+    ]:
+        total = torch.zeros_like(dense)
+        for _ in range(200):
+            step = dense.clone()
+            stats = compressed_all_reduce(step, compressor, key="w")
+            total += step
+        assert stats.ratio > 1
+        residual = compressor.feedback.residuals["w"].clone()
+        dist.all_reduce(residual)
+        torch.testing.assert_close(
+            total + residual, 200 * reference, rtol=1e-3, atol=1e-2
+        )
+
+
+def test_compressed_all_reduce(run_distributed):
+    run_distributed(_check_compression, 2)
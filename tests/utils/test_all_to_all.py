@@ -0,0 +1,77 @@
+import torch
+
+from exa.utils.all_to_all import all_to_all_v
+from exa.utils.moe import moe_combine, moe_dispatch
+
+
+def _check_all_to_all_v(rank, world_size):
+    # Rank r sends r + d + 1 rows of value 10 * r + d to rank d
+    send_splits = [rank + d + 1 for d in range(world_size)]
+    tensor = torch.cat(
+        [
+            torch.full((n, 2), float(10 * rank + d))
+            for d, n in enumerate(send_splits)
+        ]
+    )
+    views = all_to_all_v(tensor, send_splits)
+    base = views[0].data_ptr()
+    offset = 0
+    for src, view in enumerate(views):
+        assert view.shape == (src + rank + 1, 2)
+        assert view.data_ptr() == base + offset * 2 * 4
+        torch.testing.assert_close(
+            view, torch.full_like(view, float(10 * src + rank))
+        )
+        offset += view.shape[0]
+
+    pieces = [
+        torch.full((d, 3), float(rank)) for d in range(world_size)
+    ]
+    work = all_to_all_v(pieces, async_op=True)
+    for src, view in enumerate(work.wait()):
+        assert view.shape == (rank, 3)
+        torch.testing.assert_close(
+            view, torch.full_like(view, float(src))
+        )
+
+
+def test_all_to_all_v(run_distributed):
+    run_distributed(_check_all_to_all_v, 3)
+
+
+def _check_moe_round_trip(rank, world_size):
+    num_experts, k = 2 * world_size, 2
+    generator = torch.Generator().manual_seed(rank)
+    tokens = torch.randn(7, 4, generator=generator)
+    expert_indices = torch.stack(
+        [
+            torch.randperm(num_experts, generator=generator)[:k]
+            for _ in range(tokens.shape[0])
+        ]
+    )
+    weights = torch.rand(tokens.shape[0], k, generator=generator)
+
+    inputs, tokens_per_expert, state = moe_dispatch(
+        tokens, expert_indices, num_experts
+    )
+    assert sum(tokens_per_expert) == inputs.shape[0]
+    assert len(tokens_per_expert) == 2
+
+    # Expert j on this rank scales its tokens by (global id + 1)
+    scales = torch.cat(
+        [
+            torch.full((n,), float(2 * rank + j + 1))
+            for j, n in enumerate(tokens_per_expert)
+        ]
+    )
+    outputs = inputs * scales.unsqueeze(1)
+    combined = moe_combine(outputs, weights, state)
+
+    expected = tokens * (
+        weights * (expert_indices + 1).to(weights.dtype)
+    ).sum(dim=1, keepdim=True)
+    torch.testing.assert_close(combined, expected)
+
+
+def test_moe_dispatch_combine(run_distributed):
+    run_distributed(_check_moe_round_trip, 2)
@@ -0,0 +1,32 @@
+from multiprocessing import shared_memory
+
+import pytest
+
+from exa.utils.atomic_flags import AtomicFlags, atomic_flags_supported
+
+pytestmark = pytest.mark.skipif(
+    not atomic_flags_supported(),
+    reason="needs libatomic or x86",
+)
+
+
+def test_store_and_load_one_flag_per_stride():
+    shm = shared_memory.SharedMemory(create=True, size=4 * 8 * 8)
+    try:
+        flags = AtomicFlags(shm.buf, 4)
+        flags.fill(0)
+        flags.store(2, 7)
+        assert [flags.load(i) for i in range(4)] == [0, 0, 7, 0]
+        assert flags.min() == 0
+        flags.fill(5)
+        assert flags.min() == 5
+
+        # A second mapping sees the same flags
+        other = AtomicFlags(shm.buf, 4)
+        other.store(0, 9)
+        assert flags.load(0) == 9
+        assert flags.tensor[0] == 9 and flags.tensor[1] == 5
+        del flags, other
+    finally:
+        shm.close()
+        shm.unlink()
@@ -0,0 +1,59 @@
+import pytest
+import torch
+
+from exa.utils.buffer_pool import BufferPool, size_class
+
+
+def test_size_class():
+    assert size_class(1) == 256
+    assert size_class(256) == 256
+    assert size_class(257) == 512
+    assert size_class(5000) == 8192
+
+
+def test_steady_state_reuses_buffers():
+    pool = BufferPool(max_bytes=1 << 20)
+    first = pool.acquire(1000, torch.float32, "cpu")
+    assert first.numel() == 1000
+    pool.release(first)
+
+    second = pool.acquire(900, torch.float32, "cpu")
+    assert second.data_ptr() == first.data_ptr()
+    pool.release(second)
+
+    stats = pool.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["in_use"] == 0
+
+
+def test_keys_on_dtype():
+    pool = BufferPool()
+    with pool.borrow(100, torch.float32, "cpu"):
+        pass
+    with pool.borrow(100, torch.float64, "cpu") as buffer:
+        assert buffer.dtype == torch.float64
+    assert pool.stats()["misses"] == 2
+
+
+def test_cap_evicts_least_recently_used():
+    # 4096 + 2048 bytes fit, adding another 1024 does not
+    pool = BufferPool(max_bytes=6144)
+    a = pool.acquire(1024, torch.float32, "cpu")
+    b = pool.acquire(300, torch.float32, "cpu")
+    c = pool.acquire(200, torch.float32, "cpu")
+    pool.release(a)
+    pool.release(b)
+    pool.release(c)
+    assert pool.evictions == 1
+    assert pool.idle_bytes <= pool.max_bytes
+
+    # The 1024 class was released first and evicted
+    pool.acquire(1024, torch.float32, "cpu")
+    assert pool.misses == 4
+
+
+def test_release_unknown_tensor():
+    pool = BufferPool()
+    with pytest.raises(ValueError):
+        pool.release(torch.empty(4))
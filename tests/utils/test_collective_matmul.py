@@ -0,0 +1,74 @@
+import pytest
+import torch
+import torch.nn.functional as F
+
+from exa.utils.collective_matmul import (
+    all_gather_matmul,
+    matmul_reduce_scatter,
+)
+
+
+def _check_all_gather_matmul(rank, world_size):
+    generator = torch.Generator().manual_seed(0)
+    full = torch.randn(world_size * 3, 2, 8, generator=generator)
+    weight = torch.randn(5, 8, generator=generator)
+    bias = torch.randn(5, generator=generator)
+
+    x = full[rank * 3 : (rank + 1) * 3]
+    output, gathered = all_gather_matmul(x, weight, bias)
+    torch.testing.assert_close(gathered, full)
+    torch.testing.assert_close(output, F.linear(full, weight, bias))
+
+
+def test_all_gather_matmul(run_distributed):
+    run_distributed(_check_all_gather_matmul, 3)
+
+
+def _check_matmul_reduce_scatter(rank, world_size):
+    generator = torch.Generator().manual_seed(0)
+    x = torch.randn(7, 4 * world_size, generator=generator)
+    weight = torch.randn(6, 4 * world_size, generator=generator)
+    bias = torch.randn(6, generator=generator)
+    expected = torch.tensor_split(
+        F.linear(x, weight, bias), world_size, dim=0
+    )[rank]
+
+    cols = slice(rank * 4, (rank + 1) * 4)
+    result = matmul_reduce_scatter(x[:, cols], weight[:, cols], bias)
+    torch.testing.assert_close(result, expected)
+
+
+def test_matmul_reduce_scatter(run_distributed):
+    run_distributed(_check_matmul_reduce_scatter, 3)
+
+
+def _check_uneven_rows_round_trip(rank, world_size):
+    generator = torch.Generator().manual_seed(0)
+    # 7 rows do not split evenly over the ranks
+    x = torch.randn(7, 4 * world_size, generator=generator)
+    row_weight = torch.randn(6, 4 * world_size, generator=generator)
+    col_weight = torch.randn(5, 6, generator=generator)
+
+    cols = slice(rank * 4, (rank + 1) * 4)
+    hidden = matmul_reduce_scatter(x[:, cols], row_weight[:, cols])
+    sizes = [
+        part.shape[0] for part in torch.tensor_split(x, world_size)
+    ]
+    assert hidden.shape[0] == sizes[rank]
+
+    # The row counts are exchanged, or taken from sizes
+    output, gathered = all_gather_matmul(hidden, col_weight)
+    expected = F.linear(x, row_weight)
+    torch.testing.assert_close(gathered, expected)
+    torch.testing.assert_close(output, F.linear(expected, col_weight))
+    output, _ = all_gather_matmul(hidden, col_weight, sizes=sizes)
+    torch.testing.assert_close(output, F.linear(expected, col_weight))
+
+    with pytest.raises(ValueError, match="rows"):
+        all_gather_matmul(
+            hidden, col_weight, sizes=[s + 1 for s in sizes]
+        )
+
+
+def test_uneven_rows_round_trip(run_distributed):
+    run_distributed(_check_uneven_rows_round_trip, 3)
@@ -0,0 +1,66 @@
+import pytest
+import torch
+
+from exa.utils.fused_all_gather import (
+    all_gather_v,
+    fused_all_gather,
+    fused_all_gather_into,
+    fused_all_gather_v1,
+)
+
+
+def _check_gather_into(rank, world_size):
+    tensor = torch.full((2, 3), float(rank))
+    output = torch.empty(world_size * 6)
+    views = fused_all_gather_into(tensor, output)
+    for peer, view in enumerate(views):
+        assert view.shape == (2, 3)
+        assert view.data_ptr() == output.data_ptr() + peer * 6 * 4
+        expected = torch.full((2, 3), float(peer))
+        torch.testing.assert_close(view, expected)
+
+    tensor_list = [None] * world_size
+    fused_all_gather_v1(tensor_list, tensor)
+    for peer, piece in enumerate(tensor_list):
+        expected = torch.full((2, 3), float(peer))
+        torch.testing.assert_close(piece, expected)
+
+    work = fused_all_gather_into(tensor, async_op=True)
+    gathered = fused_all_gather([None] * world_size, tensor)
+    torch.testing.assert_close(
+        torch.stack(work.wait()), torch.stack(gathered)
+    )
+
+
+def test_fused_all_gather_into(run_distributed):
+    run_distributed(_check_gather_into, 3)
+
+
+def _check_all_gather_v(rank, world_size):
+    sizes = [r % 3 for r in range(world_size)]
+    tensor = torch.full((sizes[rank], 4), float(rank))
+    views = all_gather_v(tensor)
+    assert [v.shape[0] for v in views] == sizes
+    for peer, view in enumerate(views):
+        torch.testing.assert_close(
+            view, torch.full((sizes[peer], 4), float(peer))
+        )
+
+    output = torch.empty(sum(sizes) * 4)
+    work = all_gather_v(tensor, output, sizes=sizes, async_op=True)
+    async_views = work.wait()
+    assert async_views[0].data_ptr() == output.data_ptr()
+    torch.testing.assert_close(output.view(-1, 4), torch.cat(views))
+
+    # Caught on every rank before any broadcast starts
+    wrong = [s + 1 for s in sizes]
+    with pytest.raises(ValueError, match="rows"):
+        all_gather_v(tensor, sizes=wrong)
+    with pytest.raises(ValueError, match="trailing"):
+        all_gather_v(
+            tensor, torch.empty(sum(sizes), 2, 2), sizes=sizes
+        )
+
+
+def test_all_gather_v_ragged(run_distributed):
+    run_distributed(_check_all_gather_v, 4)
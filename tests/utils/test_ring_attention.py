@@ -0,0 +1,42 @@
+import pytest
+import torch
+import torch.nn.functional as F
+
+from exa.utils.ring_attention import ring_attention
+
+
+def _check_ring_attention(rank, world_size, causal):
+    generator = torch.Generator().manual_seed(0)
+    seq_local = 5
+    shape = (2, 3, world_size * seq_local, 8)
+    q, k, v = (
+        torch.randn(*shape, generator=generator) for _ in range(3)
+    )
+    expected = F.scaled_dot_product_attention(
+        q, k, v, is_causal=causal
+    )
+
+    rows = slice(rank * seq_local, (rank + 1) * seq_local)
+    out = ring_attention(
+        q[:, :, rows], k[:, :, rows], v[:, :, rows], causal=causal
+    )
+    torch.testing.assert_close(out, expected[:, :, rows])
+
+
+@pytest.mark.parametrize("causal", [False, True])
+def test_ring_attention_matches_full_attention(
+    causal, run_distributed
+):
+    run_distributed(_check_ring_attention, 3, causal)
+
+
+def _check_single_rank(rank, world_size):
+    q, k, v = (torch.randn(4, 6, 8) for _ in range(3))
+    torch.testing.assert_close(
+        ring_attention(q, k, v),
+        F.scaled_dot_product_attention(q, k, v),
+    )
+
+
+def test_ring_attention_single_rank(run_distributed):
+    run_distributed(_check_single_rank, 1)
@@ -0,0 +1,86 @@
+import torch
+
+from exa.utils.buffer_pool import get_buffer_pool
+from exa.utils.fused_reduce_scatter import fused_reduce_scatter
+from exa.utils.rooted_collectives import fused_gather, fused_reduce
+
+
+def _check_reduce_scatter(rank, world_size):
+    total = sum(range(world_size))
+    tensor = torch.arange(10, dtype=torch.float32) + rank
+    expected = torch.tensor_split(
+        torch.arange(10, dtype=torch.float32) * world_size + total,
+        world_size,
+    )[rank]
+    # With an output the input is left as it was
+    original = tensor.clone()
+    output = torch.empty_like(expected)
+    assert fused_reduce_scatter(tensor, output=output) is output
+    torch.testing.assert_close(output, expected)
+    torch.testing.assert_close(tensor, original)
+
+    shard = fused_reduce_scatter(tensor)
+    torch.testing.assert_close(shard, expected)
+
+    tensors = [
+        torch.full((3, 2), float(rank)),
+        torch.full((5,), float(rank), dtype=torch.float64),
+        torch.full((4,), float(rank)),
+    ]
+    shards = fused_reduce_scatter(tensors, bucket_size_bytes=64)
+    for tensor, shard in zip(tensors, shards):
+        size = torch.tensor_split(
+            torch.empty(tensor.numel()), world_size
+        )[rank].numel()
+        assert shard.dtype == tensor.dtype
+        expected = torch.full(
+            (size,), float(total), dtype=shard.dtype
+        )
+        torch.testing.assert_close(shard, expected)
+    # Bucket buffers come from the pool and go back to it
+    assert get_buffer_pool().stats()["in_use"] == 0
+
+    work = fused_reduce_scatter(torch.ones(8), async_op=True)
+    shard = work.wait()
+    torch.testing.assert_close(
+        shard, torch.full_like(shard, world_size)
+    )
+
+
+def test_fused_reduce_scatter(run_distributed):
+    run_distributed(_check_reduce_scatter, 3)
+
+
+def _check_rooted(rank, world_size):
+    total = float(sum(range(world_size)))
+    tensors = [torch.full((2, 2), float(rank)), torch.full((3,), 1.0)]
+    result = fused_reduce(tensors, dst=1)
+    if rank == 1:
+        torch.testing.assert_close(
+            result[0], torch.full((2, 2), total)
+        )
+        torch.testing.assert_close(
+            result[1], torch.full((3,), float(world_size))
+        )
+    else:
+        assert result is None
+
+    views = fused_gather(torch.full((2,), float(rank)), dst=0)
+    if rank == 0:
+        for peer, view in enumerate(views):
+            torch.testing.assert_close(
+                view, torch.full((2,), float(peer))
+            )
+    else:
+        assert views is None
+
+    work = fused_reduce(torch.ones(4), dst=0, async_op=True)
+    result = work.wait()
+    if rank == 0:
+        torch.testing.assert_close(
+            result, torch.full((4,), float(world_size))
+        )
+
+
+def test_rooted_collectives(run_distributed):
+    run_distributed(_check_rooted, 3)
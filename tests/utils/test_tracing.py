@@ -0,0 +1,94 @@
+import json
+
+import torch
+
+from exa.utils.all_reduce import (
+    fused_all_reduce,
+    hierarchical_all_reduce,
+)
+from exa.utils.tracing import (
+    disable_tracing,
+    enable_tracing,
+    export_chrome_trace,
+    finish_tracing,
+    get_tracer,
+    straggler_report,
+)
+
+
+def _event(seq, enqueue, start=None, end=None):
+    start = enqueue if start is None else start
+    return {
+        "seq": seq,
+        "op": "fused_all_reduce",
+        "nbytes": 64,
+        "algorithm": "ring",
+        "enqueue": enqueue,
+        "start": start,
+        "end": start + 0.001 if end is None else end,
+    }
+
+
+def test_straggler_report_names_late_rank():
+    # Rank 2 arrives 10 ms late at every collective
+    traces = [
+        [_event(i, i * 1.0) for i in range(4)],
+        [_event(i, i * 1.0 + 0.001) for i in range(4)],
+        [_event(i, i * 1.0 + 0.010) for i in range(4)],
+    ]
+    report = straggler_report(traces)
+    assert report.collectives == 4
+    assert report.stragglers == [2]
+    assert report.late_counts[2] == 4
+    assert abs(report.wait_caused[2] - 4 * (0.010 + 0.009)) < 1e-9
+
+
+def test_export_chrome_trace(tmp_path):
+    traces = [[_event(0, 1.0, start=1.5)], [_event(0, 1.0)]]
+    path = tmp_path / "trace.json"
+    export_chrome_trace(traces, str(path))
+    events = json.loads(path.read_text())["traceEvents"]
+    names = [e["name"] for e in events if e["ph"] == "X"]
+    assert names.count("fused_all_reduce") == 2
+    assert names.count("queued") == 1
+
+
+def test_tracing_off_records_nothing():
+    disable_tracing()
+    assert get_tracer() is None
+
+
+def _check_tracing(rank, world_size, path):
+    tracer = enable_tracing()
+    tensor = torch.ones(16)
+    fused_all_reduce(tensor, algorithm="ring")
+    fused_all_reduce(tensor, algorithm="tree", async_op=True).wait()
+    # Nested collectives are folded into the outer event
+    hierarchical_all_reduce(tensor)
+
+    assert [e["op"] for e in tracer.events] == [
+        "fused_all_reduce",
+        "fused_all_reduce",
+        "hierarchical_all_reduce",
+    ]
+    assert tracer.events[0]["algorithm"] == "ring"
+    assert tracer.events[1]["algorithm"] == "tree"
+    for event in tracer.events:
+        assert event["nbytes"] == 64
+        assert event["enqueue"] <= event["start"]
+    for event in (tracer.events[0], tracer.events[2]):
+        assert event["start"] <= event["end"]
+
+    report = finish_tracing(path)
+    assert get_tracer() is None
+    if rank == 0:
+        assert report.collectives == 3
+    else:
+        assert report is None
+
+
+def test_collective_tracing(tmp_path, run_distributed):
+    path = str(tmp_path / "trace.json")
+    run_distributed(_check_tracing, 2, path)
+    events = json.loads(open(path).read())["traceEvents"]
+    assert {e["pid"] for e in events} == {0, 1}
@@ -0,0 +1,74 @@
+import torch
+
+from exa.utils.tuning_table import (
+    TuningTable,
+    get_tuning_table,
+    set_tuning_table,
+    size_bucket,
+)
+
+
+def test_size_bucket():
+    assert size_bucket(0) == 0
+    assert size_bucket(1) == 0
+    assert size_bucket(4) == 2
+    assert size_bucket(5) == 3
+    assert size_bucket(1024) == 10
+
+
+def test_lookup_uses_nearest_bucket():
+    table = TuningTable(path="unused.json")
+    table.record("all_reduce", "gloo", 4, torch.float32, 16, "tree")
+    table.record(
+        "all_reduce", "gloo", 4, torch.float32, 1 << 20, "ring"
+    )
+
+    assert (
+        table.lookup("all_reduce", "gloo", 4, torch.float32, 8)
+        == "tree"
+    )
+    assert (
+        table.lookup("all_reduce", "gloo", 4, torch.float32, 1 << 22)
+        == "ring"
+    )
+    assert (
+        table.lookup(
+            "all_reduce", "gloo", 8, torch.float32, 8, default="x"
+        )
+        == "x"
+    )
+    assert table.has("gloo", 4)
+    assert not table.has("nccl", 4)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "tuning.json")
+    table = TuningTable(path=path)
+    table.record(
+        "all_reduce_coalesced", "gloo", 2, torch.float16, 4096, 1024
+    )
+    table.save()
+
+    loaded = TuningTable(path=path).load()
+    assert loaded.entries == table.entries
+    assert (
+        loaded.lookup(
+            "all_reduce_coalesced", "gloo", 2, torch.float16, 4096
+        )
+        == 1024
+    )
+
+
+def test_process_table_ignores_the_local_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "tuning.json")
+    table = TuningTable(path=path)
+    table.record("all_reduce", "gloo", 2, torch.float32, 64, "tree")
+    table.save()
+    monkeypatch.setenv("EXA_TUNING_TABLE", path)
+
+    # Only ensure_tuned may install a table every rank agrees on
+    set_tuning_table(None)
+    try:
+        assert get_tuning_table().entries == {}
+    finally:
+        set_tuning_table(None)